@@ -0,0 +1,228 @@
+"""Run anonymous Apex scripts (scripts/apex/...) with bounded parallelism.
+
+Scripts run concurrently unless their leading comment block says otherwise:
+
+    // @order: 10                      scripts with a higher order start after all lower ones succeeded
+    // @depends: feature-1300.apex     start after these scripts succeeded (comma separated)
+    // @timeout: 900                   seconds before the run is killed (default APEX_SCRIPT_TIMEOUT)
+
+A script whose dependency failed, timed out or is part of a cycle is skipped.
+Results are written to apexScriptResults.json and rendered as a markdown
+table in $GITHUB_STEP_SUMMARY; the exit code is 1 if any script did not succeed.
+
+Usage:
+    python devops/apexScriptRunner.py --folder scripts/apex/sandbox --added-between <base> <head>
+    python devops/apexScriptRunner.py scripts/apex/a.apex scripts/apex/b.apex
+
+SF_CLI overrides the CLI command, e.g. SF_CLI="python3 devops/fakeSfCli.py" to run without an org.
+"""
+import os
+import re
+import sys
+import json
+import time
+import shlex
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import phaseProfile
+
+MAX_PARALLEL = int(os.environ.get('APEX_SCRIPT_MAX_PARALLEL', 4))
+DEFAULT_TIMEOUT = int(os.environ.get('APEX_SCRIPT_TIMEOUT', 600))
+RESULTS_FILE = "apexScriptResults.json"
+
+HEADER = re.compile(r'^//\s*@(order|depends|timeout)\s*:?\s*(.*?)\s*$', re.IGNORECASE)
+
+GREEN_TEXT = '\033[32m'
+YELLOW_TEXT = '\033[33m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+STATUS_ICONS = {"success": "✅", "failed": "❌", "timeout": "⏱️", "skipped": "⏭️"}
+
+
+def script_name(path):
+    return os.path.basename(path)
+
+
+def read_headers(path):
+    """(order, depends, timeout) from the comment lines at the top of the script"""
+    order, depends, timeout = 0, [], DEFAULT_TIMEOUT
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if not line.startswith("//"):
+                break
+            match = HEADER.match(line)
+            if not match:
+                continue
+            key, value = match.group(1).lower(), match.group(2)
+            if key in ("order", "timeout") and not re.fullmatch(r'-?\d+', value):
+                print(f"{YELLOW_TEXT}⚠️ {script_name(path)}: ignoring @{key} '{value}', a whole number is expected{RESET}")
+            elif key == "order":
+                order = int(value)
+            elif key == "timeout":
+                timeout = int(value)
+            else:
+                depends += [name.strip() for name in value.split(",") if name.strip()]
+    # Dependencies may be written with or without the .apex extension
+    depends = [name if name.endswith(".apex") else f"{name}.apex" for name in depends]
+    return order, depends, timeout
+
+
+def discover(folder=None, added_between=None, files=None):
+    """Scripts to run: explicit files, the scripts added to folder between two commits, or every script in folder"""
+    if files:
+        return list(files)
+    if added_between:
+        base, head = added_between
+        output = subprocess.run(["git", "diff", "--diff-filter=A", "--name-only", base, head, "--", folder],
+                                capture_output=True, text=True, check=True)
+        return sorted(path for path in output.stdout.splitlines() if path.endswith(".apex"))
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".apex"))
+
+
+def build_plan(paths):
+    """{name: {'path', 'timeout', 'requires'}} where requires holds every script that must succeed first"""
+    scripts = {}
+    for path in paths:
+        order, depends, timeout = read_headers(path)
+        scripts[script_name(path)] = {"path": path, "order": order, "depends": depends, "timeout": timeout}
+
+    for name, script in scripts.items():
+        missing = [dep for dep in script["depends"] if dep not in scripts]
+        for dep in missing:
+            # Not part of this run, assumed to have run with an earlier merge
+            print(f"{YELLOW_TEXT}⚠️ {name} depends on {dep}, which is not part of this run{RESET}")
+        script["requires"] = {dep for dep in script["depends"] if dep in scripts} | \
+            {other for other, o in scripts.items() if o["order"] < script["order"]}
+    return scripts
+
+
+def sf_command():
+    return shlex.split(os.environ.get('SF_CLI', "sf"))
+
+
+def run_script(path, timeout, target_org=None):
+    """Run one script with `sf apex run --json`; returns a result dict"""
+    command = sf_command() + ["apex", "run", "--file", path, "--json"]
+    if target_org:
+        command += ["--target-org", target_org]
+
+    start = time.perf_counter()
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout", "duration": round(time.perf_counter() - start, 2),
+                "message": f"Killed after {timeout}s"}
+    duration = round(time.perf_counter() - start, 2)
+
+    try:
+        result = json.loads(output.stdout).get("result") or {}
+    except json.JSONDecodeError:
+        result = {}
+    if output.returncode == 0 and result.get("success"):
+        return {"status": "success", "duration": duration, "message": ""}
+
+    if result and not result.get("compiled", True):
+        message = f"Compile error line {result.get('line')}: {result.get('compileProblem')}"
+    elif result.get("exceptionMessage"):
+        message = result["exceptionMessage"]
+    else:
+        lines = (output.stderr or output.stdout).strip().splitlines()
+        message = lines[-1] if lines else f"exit code {output.returncode}"
+    return {"status": "failed", "duration": duration, "message": message}
+
+
+def run_all(scripts, max_parallel=MAX_PARALLEL, target_org=None, runner=run_script):
+    """Run the plan, starting each script as soon as everything it requires has succeeded"""
+    results = {}
+    pending = dict(scripts)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as pool:
+        while pending or running:
+            # Skip scripts whose requirements cannot succeed any more, following chains of skips
+            skipped = True
+            while skipped:
+                skipped = False
+                for name, script in list(pending.items()):
+                    blocked = [dep for dep in script["requires"] if dep in results and results[dep]["status"] != "success"]
+                    if blocked:
+                        results[name] = {"status": "skipped", "duration": 0,
+                                         "message": f"{', '.join(sorted(blocked))} did not succeed"}
+                        del pending[name]
+                        skipped = True
+                        print(f"{YELLOW_TEXT}⏭️ {name} skipped{RESET}")
+
+            ready = [name for name, script in pending.items() if all(dep in results for dep in script["requires"])]
+            for name in sorted(ready, key=lambda n: (pending[n]["order"], n)):
+                script = pending.pop(name)
+                print(f"🚀 Executing {script['path']}")
+                running[pool.submit(runner, script["path"], script["timeout"], target_org)] = name
+
+            if not running:
+                # Nothing can start: what is left waits on a dependency cycle
+                for name in pending:
+                    results[name] = {"status": "skipped", "duration": 0, "message": "Dependency cycle"}
+                    print(f"{RED_TEXT}❌ {name} skipped: dependency cycle{RESET}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                colour = GREEN_TEXT if results[name]["status"] == "success" else RED_TEXT
+                print(f"{colour}{STATUS_ICONS[results[name]['status']]} {name}: {results[name]['status']} "
+                      f"in {results[name]['duration']}s {results[name]['message']}{RESET}")
+
+    return [{"script": scripts[name]["path"], **results[name]} for name in sorted(results, key=lambda n: (scripts[n]["order"], n))]
+
+
+def summary_markdown(results, title="⚙️ Apex Scripts"):
+    summary = f"### {title}\n| Script | Status | Time (s) | Message |\n|--------|--------|----------|---------|\n"
+    for result in results:
+        message = str(result["message"]).replace("|", "\\|").replace("\n", " ")
+        summary += (f"| `{result['script']}` | {STATUS_ICONS[result['status']]} {result['status']} | "
+                    f"{result['duration']} | {message} |\n")
+    return summary
+
+
+def main():
+    phaseProfile.install()
+    parser = argparse.ArgumentParser(description="Run anonymous Apex scripts with bounded parallelism")
+    parser.add_argument("files", nargs="*", help="scripts to run (default: discovered from --folder)")
+    parser.add_argument("--folder", default="scripts/apex")
+    parser.add_argument("--added-between", nargs=2, metavar=("BASE", "HEAD"),
+                        help="only run scripts added to the folder between two commits")
+    parser.add_argument("--target-org")
+    parser.add_argument("--max-parallel", type=int, default=MAX_PARALLEL)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    paths = discover(args.folder, args.added_between, args.files)
+    if not paths:
+        print(f"{GREEN_TEXT}✅ No new Apex scripts found in {args.folder}{RESET}")
+        return
+
+    results = run_all(build_plan(paths), args.max_parallel, args.target_org)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    summary_file = os.environ.get('GITHUB_STEP_SUMMARY')
+    if summary_file:
+        with open(summary_file, "a") as f:
+            f.write(summary_markdown(results) + "\n")
+
+    failed = [result for result in results if result["status"] != "success"]
+    if failed:
+        print(f"{RED_TEXT}❌ {len(failed)} of {len(results)} Apex script(s) did not succeed{RESET}")
+        sys.exit(1)
+    print(f"{GREEN_TEXT}✅ {len(results)} Apex script(s) executed{RESET}")
+
+
+if __name__ == "__main__":
+    main()
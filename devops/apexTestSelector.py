@@ -0,0 +1,234 @@
+"""Select the Apex tests a delta needs instead of running every local test.
+
+    python devops/apexTestSelector.py --manifest changed-sources/package/package.xml
+
+The indexer reads every class and trigger under force-app/main/default once
+and keeps the identifiers each file uses in $APEX_TEST_INDEX_DIR/index.json
+(default .apex-test-index/, persisted with actions/cache). Entries are keyed
+by git blob SHA, so later runs only re-read files that changed.
+
+From the index a reverse reference graph (class -> classes referencing it) is
+built. The tests selected for a changed class are the test classes that reach
+it through that graph; a changed trigger is covered by tests referencing its
+sObject. RunLocalTests is kept whenever the selection cannot guarantee the
+per-class coverage a deploy needs:
+
+- a changed Apex class or trigger is not reached by any test
+- Apex classes or triggers are deleted
+- the selection would run most of the tests anyway (APEX_TEST_MAX_SHARE)
+- a production deploy (--production) without any Apex change
+
+TEST_LEVEL and TEST_ARGS are written to $GITHUB_ENV for the deploy command.
+"""
+import os
+import re
+import json
+import argparse
+import subprocess
+from collections import deque
+from xml.etree import ElementTree
+
+import phaseProfile
+
+INDEX_DIR = os.environ.get('APEX_TEST_INDEX_DIR', ".apex-test-index")
+INDEX_VERSION = 1
+SOURCE_DIRS = ["force-app/main/default/classes", "force-app/main/default/triggers"]
+MAX_SHARE = float(os.environ.get('APEX_TEST_MAX_SHARE', 0.8))
+SELECTION_FILE = "apexTestSelection.json"
+
+NS = {"md": "http://soap.sforce.com/2006/04/metadata"}
+COMMENTS_AND_STRINGS = re.compile(r"//[^\n]*|/\*.*?\*/|'(?:\\.|[^'\\])*'", re.DOTALL)
+IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+TEST_CLASS = re.compile(r"@istest\b(?:\s*\([^)]*\))?\s+(?:(?:public|private|global|virtual|abstract|with|without|"
+                        r"inherited|sharing)\s+)*class\s+([a-z_][a-z0-9_]*)")
+TRIGGER = re.compile(r"\btrigger\s+([a-z_][a-z0-9_]*)\s+on\s+([a-z_][a-z0-9_]*)")
+
+GREEN_TEXT = '\033[32m'
+YELLOW_TEXT = '\033[33m'
+RESET = '\033[0m'
+
+
+def parse_source(path, text):
+    """Index entry of one class or trigger. Apex is case-insensitive, so everything is lowercased."""
+    code = COMMENTS_AND_STRINGS.sub(" ", text.lower())
+    name = os.path.basename(path).rsplit(".", 1)[0].lower()
+    entry = {"name": name, "kind": "trigger" if path.endswith(".trigger") else "class", "is_test": False,
+             # Identifiers rather than resolved references: a class added later may match a name used here
+             "tokens": sorted(set(IDENTIFIER.findall(code)))}
+    if entry["kind"] == "trigger":
+        match = TRIGGER.search(code)
+        entry["sobject"] = match.group(2) if match else None
+    else:
+        match = TEST_CLASS.search(code)
+        entry["is_test"] = bool(match and match.group(1) == name)
+    return entry
+
+
+def blob_shas(source_dirs):
+    """{path: blob SHA} of the tracked Apex sources, from one `git ls-files -s` call"""
+    output = subprocess.run(["git", "ls-files", "-s", "--"] + source_dirs, capture_output=True, text=True, check=True)
+    shas = {}
+    for line in output.stdout.splitlines():
+        meta, path = line.split("\t", 1)
+        if path.endswith((".cls", ".trigger")):
+            shas[path] = meta.split()[1]
+    return shas
+
+
+def load_index(index_dir=INDEX_DIR):
+    try:
+        with open(os.path.join(index_dir, "index.json")) as f:
+            index = json.load(f)
+        if index.get("version") == INDEX_VERSION:
+            return index
+    except (OSError, json.JSONDecodeError):
+        pass
+    return {"version": INDEX_VERSION, "files": {}}
+
+
+def save_index(index, index_dir=INDEX_DIR):
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, "index.json"), "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+
+def update_index(index, shas):
+    """Re-read only files whose blob SHA changed and drop deleted ones; returns the number re-read"""
+    files = index["files"]
+    for path in set(files) - set(shas):
+        del files[path]
+    reread = 0
+    for path, sha in shas.items():
+        if files.get(path, {}).get("sha") == sha:
+            continue
+        with open(path, encoding="utf-8", errors="replace") as f:
+            files[path] = {"sha": sha, **parse_source(path, f.read())}
+        reread += 1
+    return reread
+
+
+def reverse_graph(index):
+    """{class name: {names of classes and triggers referencing it}}"""
+    entries = list(index["files"].values())
+    class_names = {entry["name"] for entry in entries if entry["kind"] == "class"}
+    referenced_by = {}
+    for entry in entries:
+        for token in class_names.intersection(entry["tokens"]):
+            if token != entry["name"]:
+                referenced_by.setdefault(token, set()).add(entry["name"])
+    return referenced_by
+
+
+def covering_tests(name, referenced_by, test_names):
+    """Test classes that reach name through the reverse reference graph"""
+    seen, queue, tests = {name}, deque([name]), set()
+    while queue:
+        for referrer in referenced_by.get(queue.popleft(), ()):
+            if referrer in seen:
+                continue
+            seen.add(referrer)
+            if referrer in test_names:
+                tests.add(referrer)
+            queue.append(referrer)
+    return tests
+
+
+def manifest_members(path, type_name):
+    """Members of one type in a package.xml"""
+    try:
+        root = ElementTree.parse(path).getroot()
+    except (OSError, ElementTree.ParseError):
+        return []
+    members = []
+    for types in root.findall("md:types", NS):
+        if types.findtext("md:name", namespaces=NS) == type_name:
+            members += [m.text for m in types.findall("md:members", NS) if m.text]
+    return members
+
+
+def select_tests(index, changed_classes, changed_triggers, deleted_apex=(), production=False, max_share=MAX_SHARE):
+    """Return (test_level, tests, reason)"""
+    entries = index["files"].values()
+    test_names = {entry["name"] for entry in entries if entry["is_test"]}
+    if deleted_apex:
+        return "RunLocalTests", [], f"Apex deleted: {', '.join(sorted(deleted_apex))}"
+    if not changed_classes and not changed_triggers:
+        if production:
+            return "RunLocalTests", [], "production deploy without Apex changes"
+        return "NoTestRun", [], "no Apex changes"
+
+    referenced_by = reverse_graph(index)
+    selected, uncovered = set(), []
+    for name in changed_classes:
+        key = name.lower()
+        if key in test_names:
+            selected.add(key)
+            continue
+        tests = covering_tests(key, referenced_by, test_names)
+        if not tests:
+            uncovered.append(name)
+        selected |= tests
+
+    triggers = {entry["name"]: entry for entry in entries if entry["kind"] == "trigger"}
+    for name in changed_triggers:
+        sobject = (triggers.get(name.lower()) or {}).get("sobject")
+        tests = {entry["name"] for entry in entries if entry["is_test"] and sobject and sobject in entry["tokens"]}
+        if not tests:
+            uncovered.append(name)
+        selected |= tests
+
+    if uncovered:
+        return "RunLocalTests", [], f"no test references {', '.join(sorted(uncovered))}"
+    if test_names and len(selected) > max_share * len(test_names):
+        return "RunLocalTests", [], f"{len(selected)} of {len(test_names)} tests selected"
+    return "RunSpecifiedTests", sorted(selected), \
+        f"{len(selected)} of {len(test_names)} tests cover the changed Apex"
+
+
+def original_names(index, names):
+    """Map lowercased names back to the file names, which keep the declared case"""
+    by_key = {os.path.basename(path).rsplit(".", 1)[0].lower(): os.path.basename(path).rsplit(".", 1)[0]
+              for path in index["files"]}
+    return [by_key.get(name, name) for name in names]
+
+
+def main():
+    phaseProfile.install()
+    parser = argparse.ArgumentParser(description="Select the Apex tests needed for a delta package")
+    parser.add_argument("--manifest", default="changed-sources/package/package.xml")
+    parser.add_argument("--destructive", default="changed-sources/destructiveChanges/destructiveChanges.xml")
+    parser.add_argument("--production", action="store_true", help="target org is production")
+    parser.add_argument("--source-dir", action="append", dest="source_dirs",
+                        help=f"repeatable, default: {', '.join(SOURCE_DIRS)}")
+    parser.add_argument("--output", default=SELECTION_FILE)
+    args = parser.parse_args()
+
+    with phaseProfile.span("load"):
+        index = load_index()
+    with phaseProfile.span("parse"):
+        reread = update_index(index, blob_shas(args.source_dirs or SOURCE_DIRS))
+        save_index(index)
+    print(f"Apex index: {len(index['files'])} file(s), {reread} re-read")
+
+    with phaseProfile.span("match"):
+        deleted = manifest_members(args.destructive, "ApexClass") + manifest_members(args.destructive, "ApexTrigger")
+        level, tests, reason = select_tests(index, manifest_members(args.manifest, "ApexClass"),
+                                            manifest_members(args.manifest, "ApexTrigger"), deleted, args.production)
+        tests = original_names(index, tests)
+
+    with open(args.output, "w") as f:
+        json.dump({"test_level": level, "tests": tests, "reason": reason}, f, indent=2)
+    env_file = os.environ.get('GITHUB_ENV')
+    if env_file:
+        with open(env_file, "a") as f:
+            f.write(f"TEST_LEVEL={level}\n")
+            f.write(f"TEST_ARGS={' '.join(f'--tests {test}' for test in tests)}\n")
+
+    colour = GREEN_TEXT if level != "RunLocalTests" else YELLOW_TEXT
+    print(f"{colour}🧪 {level}: {reason}{RESET}")
+    for test in tests:
+        print(f"  - {test}")
+
+
+if __name__ == "__main__":
+    main()
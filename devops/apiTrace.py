@@ -0,0 +1,213 @@
+"""HTTP call tracing and API-cost accounting for the devops scripts.
+
+Call install() once at the top of a script. Every request sent through
+`requests` (module-level helpers and sessions alike) is then recorded with
+endpoint, method, status, latency, payload bytes, the X-RateLimit-* quota
+headers and the GraphQL `rateLimit.cost` when the query asks for it.
+
+At exit a JSON trace is written to $API_TRACE_DIR/<script>.json (default
+.api-trace/) and a per-endpoint table is appended to $GITHUB_STEP_SUMMARY.
+Set API_TRACE=false to disable.
+"""
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+TRACE_DIR = os.environ.get("API_TRACE_DIR", ".api-trace")
+ENABLED = os.environ.get("API_TRACE", "true").lower() != "false"
+
+_records = []
+_lock = threading.Lock()
+_state = {"installed": False, "script": None, "start": None}
+
+_PATH_RULES = [
+    (re.compile(r"^/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"/git/refs/heads/.+$"), "/git/refs/heads/{branch}"),
+    (re.compile(r"/[0-9a-f]{40}(?=/|$)"), "/{sha}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{id}"),
+    (re.compile(r"/deployRequest/[A-Za-z0-9]+"), "/deployRequest/{id}"),
+    (re.compile(r"/v\d+\.\d+/"), "/v{version}/"),
+]
+
+
+def endpoint_of(url):
+    """Normalise a URL to a low-cardinality endpoint name"""
+    parsed = urlparse(url)
+    path = parsed.path
+    for pattern, replacement in _PATH_RULES:
+        path = pattern.sub(replacement, path)
+    if parsed.hostname and not parsed.hostname.startswith("api.github.com"):
+        return f"{parsed.hostname}{path}"
+    return path
+
+
+def _graphql_cost(response):
+    if b'"rateLimit"' not in response.content:
+        return None
+    try:
+        return response.json().get("data", {}).get("rateLimit", {}).get("cost")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _record(request, response, latency, error=None, stream=False):
+    body = request.body or b""
+    entry = {
+        "time": round(time.time(), 3),
+        "method": request.method,
+        "endpoint": endpoint_of(request.url),
+        "status": response.status_code if response is not None else error,
+        "latency_ms": round(latency * 1000, 1),
+        "bytes_sent": len(body.encode("utf-8") if isinstance(body, str) else body),
+        "bytes_received": 0,
+    }
+    if response is not None:
+        if stream:
+            # Do not consume a streamed body, trust the declared length instead
+            entry["bytes_received"] = int(response.headers.get("Content-Length") or 0)
+        else:
+            entry["bytes_received"] = len(response.content or b"")
+        headers = response.headers
+        if "X-RateLimit-Used" in headers:
+            entry["ratelimit"] = {
+                "resource": headers.get("X-RateLimit-Resource", "core"),
+                "used": int(headers.get("X-RateLimit-Used", 0)),
+                "remaining": int(headers.get("X-RateLimit-Remaining", 0)),
+                "limit": int(headers.get("X-RateLimit-Limit", 0)),
+            }
+        if entry["endpoint"].endswith("/graphql") and not stream:
+            cost = _graphql_cost(response)
+            if cost is not None:
+                entry["graphql_cost"] = cost
+    with _lock:
+        _records.append(entry)
+
+
+def install(script_name=None):
+    """Start tracing every outgoing request of this process"""
+    if _state["installed"] or not ENABLED:
+        return
+    _state.update({"installed": True, "start": time.time(),
+                   "script": script_name or os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"})
+
+    original_send = requests.Session.send
+
+    def traced_send(session, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = original_send(session, request, **kwargs)
+        except requests.RequestException as e:
+            _record(request, None, time.perf_counter() - start, type(e).__name__)
+            raise
+        _record(request, response, time.perf_counter() - start, stream=kwargs.get("stream", False))
+        return response
+
+    requests.Session.send = traced_send
+    atexit.register(write_report)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(records=None):
+    """Aggregate records per endpoint plus quota consumption per rate-limit resource"""
+    records = list(_records if records is None else records)
+    endpoints = {}
+    for entry in records:
+        key = f"{entry['method']} {entry['endpoint']}"
+        stats = endpoints.setdefault(key, {"calls": 0, "errors": 0, "latencies": [], "bytes_sent": 0,
+                                           "bytes_received": 0, "graphql_cost": 0})
+        stats["calls"] += 1
+        stats["errors"] += 0 if isinstance(entry["status"], int) and entry["status"] < 400 else 1
+        stats["latencies"].append(entry["latency_ms"])
+        stats["bytes_sent"] += entry["bytes_sent"]
+        stats["bytes_received"] += entry["bytes_received"]
+        stats["graphql_cost"] += entry.get("graphql_cost") or 0
+
+    for stats in endpoints.values():
+        latencies = stats.pop("latencies")
+        stats["p50_ms"] = percentile(latencies, 50)
+        stats["p95_ms"] = percentile(latencies, 95)
+
+    quota = {}
+    for entry in records:
+        limit = entry.get("ratelimit")
+        if not limit:
+            continue
+        resource = quota.setdefault(limit["resource"], {"first_used": limit["used"], "last_used": limit["used"],
+                                                         "remaining": limit["remaining"], "limit": limit["limit"]})
+        resource["first_used"] = min(resource["first_used"], limit["used"])
+        resource["last_used"] = max(resource["last_used"], limit["used"])
+        resource["remaining"] = min(resource["remaining"], limit["remaining"])
+    for resource in quota.values():
+        # The first observed response already includes its own cost
+        resource["used_by_step"] = resource.pop("last_used") - resource.pop("first_used") + 1
+
+    latencies = [entry["latency_ms"] for entry in records]
+    return {
+        "calls": len(records),
+        "errors": sum(stats["errors"] for stats in endpoints.values()),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "bytes_sent": sum(entry["bytes_sent"] for entry in records),
+        "bytes_received": sum(entry["bytes_received"] for entry in records),
+        "graphql_cost": sum(entry.get("graphql_cost") or 0 for entry in records),
+        "endpoints": endpoints,
+        "quota": quota,
+    }
+
+
+def summary_markdown(script, summary):
+    lines = [
+        f"### 📡 API usage: `{script}`",
+        "",
+        f"**{summary['calls']}** calls, **{summary['errors']}** errors, p50 {summary['p50_ms']:.0f} ms, "
+        f"p95 {summary['p95_ms']:.0f} ms, {summary['bytes_sent'] / 1024:.1f} KB sent, "
+        f"{summary['bytes_received'] / 1024:.1f} KB received, GraphQL cost {summary['graphql_cost']}",
+        "",
+        "| Endpoint | Calls | Errors | p50 (ms) | p95 (ms) | KB sent | KB received | GraphQL cost |",
+        "|----------|-------|--------|----------|----------|---------|-------------|--------------|",
+    ]
+    for key, stats in sorted(summary["endpoints"].items(), key=lambda item: -item[1]["calls"]):
+        lines.append(f"| `{key}` | {stats['calls']} | {stats['errors']} | {stats['p50_ms']:.0f} | {stats['p95_ms']:.0f} | "
+                     f"{stats['bytes_sent'] / 1024:.1f} | {stats['bytes_received'] / 1024:.1f} | {stats['graphql_cost']} |")
+    if summary["quota"]:
+        lines += ["", "| Rate limit | Used by step | Remaining | Limit |", "|------------|--------------|-----------|-------|"]
+        for name, quota in summary["quota"].items():
+            lines.append(f"| {name} | {quota['used_by_step']} | {quota['remaining']} | {quota['limit']} |")
+    return "\n".join(lines) + "\n\n"
+
+
+def write_report():
+    """Write the JSON trace and the job summary table (registered with atexit by install())"""
+    if not _records:
+        return
+    script = _state["script"]
+    summary = summarize()
+    trace = {"script": script, "started_at": _state["start"], "summary": summary, "calls": list(_records)}
+    try:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        with open(os.path.join(TRACE_DIR, f"{script}.json"), "w") as f:
+            json.dump(trace, f, indent=2)
+    except OSError as e:
+        print(f"Could not write API trace: {e}")
+
+    summary_file = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_file:
+        with open(summary_file, "a") as f:
+            f.write(summary_markdown(script, summary))
+
+    print(f"📡 API usage: {summary['calls']} calls, p50 {summary['p50_ms']:.0f} ms, "
+          f"p95 {summary['p95_ms']:.0f} ms, GraphQL cost {summary['graphql_cost']}")
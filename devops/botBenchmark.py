@@ -0,0 +1,279 @@
+"""Scale benchmark for the PR bots against the offline GitHub stand-in (fakeGitHubServer.py).
+
+Generates a synthetic PR (3000 changed files, 20k violations, 500 stale PMD
+comments, 10k test results by default), then runs each bot as a subprocess
+against a fresh copy of the scenario and records wall time, API call counts,
+bytes transferred and peak RSS per script.
+
+    python devops/botBenchmark.py                       # full scale
+    python devops/botBenchmark.py --scale 0.1 --latency-ms 30 --scripts pmdCommentor prUpdated
+    python devops/botBenchmark.py --output bench.json --history bench-history.jsonl
+
+--history appends one JSON line per run so results can be tracked over time.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import hashlib
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+import fakeGitHubServer
+
+DEVOPS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO = "bench/org"
+BOT = "github-actions[bot]"
+SCRIPTS = ["prDeployPreProcessor", "prUpdated", "pmdCommentor", "promotion_handler"]
+
+DEFAULT_SIZES = {
+    "files": 3000,
+    "violations": 20000,
+    "stale_comments": 500,
+    "test_results": 10000,
+    "validation_reviews": 250,
+}
+
+
+def sha(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def scaled_sizes(scale):
+    return {key: max(1, int(value * scale)) for key, value in DEFAULT_SIZES.items()}
+
+
+def generate_patch(rng, lines_in_file):
+    """Unified diff with a couple of hunks; returns (patch, new line numbers in hunks)"""
+    hunks = []
+    lines = set()
+    start = 1
+    for _ in range(rng.randint(1, 3)):
+        start += rng.randint(0, 40)
+        added = rng.randint(2, 12)
+        context = 3
+        body = [f" context line {start + i}" for i in range(context)]
+        body += [f"+    added line {start + context + i};" for i in range(added)]
+        hunks.append(f"@@ -{start},{context} +{start},{context + added} @@\n" + "\n".join(body))
+        lines.update(range(start, start + context + added))
+        start += context + added
+    return "\n".join(hunks), sorted(lines)
+
+
+def generate_scenario(sizes, seed=1):
+    """Return (scenario, files) where files maps working-dir file names to their JSON content"""
+    rng = random.Random(seed)
+    head_sha = sha("head")
+
+    pr_files = []
+    changed_lines = {}
+    for index in range(sizes["files"]):
+        extension, folder = rng.choice([(".cls", "classes"), (".trigger", "triggers"), (".js", "lwc/cmp")])
+        filename = f"force-app/main/default/{folder}/Bench{index}{extension}"
+        patch, lines = generate_patch(rng, 200)
+        pr_files.append({"filename": filename, "status": rng.choice(["added", "modified", "modified"]),
+                         "additions": len(lines), "deletions": 0, "changes": len(lines), "patch": patch})
+        changed_lines[filename] = lines
+
+    rules = [("ApexDoc", "Missing ApexDoc comment"), ("EmptyStatementBlock", "Avoid empty block statements."),
+             ("no-unused-vars", "'x' is defined but never used."), ("AvoidGlobalModifier", "Avoid using global modifier"),
+             ("NoHardcodedIds", "Hardcoded Salesforce ID found")]
+    violations = []
+    filenames = list(changed_lines)
+    for index in range(sizes["violations"]):
+        filename = rng.choice(filenames)
+        in_diff = rng.random() < 0.3
+        line = rng.choice(changed_lines[filename]) if in_diff else rng.randint(300, 2000)
+        rule, message = rng.choice(rules)
+        violations.append({
+            "rule": rule, "engine": rng.choice(["pmd", "eslint", "regex"]), "severity": rng.randint(1, 5),
+            "tags": ["Recommended"], "primaryLocationIndex": 0,
+            "locations": [{"file": f"changed-sources/{filename}", "startLine": line, "startColumn": 1}],
+            "message": message, "resources": [f"https://docs.example.com/rules/{rule}"],
+        })
+    scan_results = {"runDir": "/bench", "violationCounts": {"total": len(violations)}, "versions": {}, "violations": violations}
+
+    # Stale bot output: PMD reviews with inline comments plus overflow issue comments
+    stale = sizes["stale_comments"]
+    reviews = []
+    review_count = max(1, stale // 10)
+    comments_per_review = max(0, (stale // 2) // review_count)
+    for index in range(review_count):
+        reviews.append({"login": BOT, "body": "🔍 **PMD Analysis Results**\n\nFound issues.",
+                        "comments": [{"body": "🔍 **PMD Analysis**\n\n| Detail | Value |", "path": rng.choice(filenames),
+                                      "position": 1} for _ in range(comments_per_review)]})
+    issue_comments = [{"login": BOT, "body": "⚠️ **PMD Analysis Results**\n\n| File | Line |\n🔍 **PMD Analysis**"}
+                      for _ in range(max(0, stale - review_count - review_count * comments_per_review))]
+
+    # Validation summaries, newest last, so the deploy pre-processor has to page
+    for index in range(sizes["validation_reviews"]):
+        reviews.append({"login": BOT, "body": (
+            f"### 🚀 Deployment/Validation Summary\n- **Name:** Validation{index}\n"
+            f"- **Deployment ID:** 0Af{index:012d}\n- **Artifact URL:** https://example.com/a/{index}\n"
+            f"- **Artifact ID:** {1000 + index}\n- **Run Id:** {5000 + index}\n")})
+        if index % 5 == 0:
+            reviews.append({"login": "reviewer", "body": "LGTM"})
+
+    tests = sizes["test_results"]
+    failures = max(1, tests // 100)
+    deployment_result = {"status": 1, "name": "Deploy", "result": {
+        "id": "0AfBENCH00000001", "success": False, "status": "Failed", "deployUrl": "https://example.com/deploy",
+        "startDate": "2025-01-01T00:00:00.000Z", "completedDate": "2025-01-01T00:30:00.000Z",
+        "numberComponentsDeployed": sizes["files"], "numberComponentsTotal": sizes["files"],
+        "numberComponentErrors": 0, "numberTestsCompleted": tests, "numberTestsTotal": tests,
+        "numberTestErrors": failures,
+        "details": {"componentFailures": [], "runTestResult": {
+            "numTestsRun": tests, "numFailures": failures,
+            "successes": [{"name": f"BenchTest{i // 10}", "methodName": f"test{i}", "time": rng.randint(1, 5000)}
+                          for i in range(tests - failures)],
+            "failures": [{"name": f"BenchTest{i}", "methodName": f"testFail{i}", "message": "Assertion failed",
+                          "stackTrace": "Class.BenchTest.testFail: line 1"} for i in range(failures)],
+            "codeCoverage": [{"name": f"Bench{i}", "numLocations": 100, "numLocationsNotCovered": rng.randint(0, 60)}
+                             for i in range(max(1, sizes["files"] // 2))],
+            "flowCoverage": [], "codeCoverageWarnings": [], "flowCoverageWarnings": []}}}}
+
+    scenario = {"repos": {REPO: {
+        "refs": {"develop": sha("develop"), "feature/bench": head_sha},
+        "pulls": [
+            {"number": 1, "head": "feature/bench", "base": "develop", "head_sha": head_sha,
+             "files": pr_files, "reviews": reviews, "issue_comments": issue_comments},
+            {"number": 2, "head": "feature/bench", "base": "uat", "head_sha": head_sha},
+            {"number": 3, "head": "promotions/feature-bench-to-develop", "base": "develop", "head_sha": sha("old")},
+        ]}}}
+    files = {"apexScanResults.json": scan_results, "deploymentResult.json": deployment_result}
+    return scenario, files
+
+
+def script_env(script, base_url, work_dir):
+    env = dict(os.environ)
+    env.update({
+        "GITHUB_API_URL": base_url,
+        "GITHUB_GRAPHQL_URL": f"{base_url}/graphql",
+        "GITHUB_REPOSITORY": REPO,
+        "TOKEN_GITHUB": "bench-token",
+        "PR_NUMBER": "1",
+        "COMMIT_ID": sha("head"),
+        "GITHUB_ENV": os.path.join(work_dir, "github_env"),
+        "GITHUB_OUTPUT": os.path.join(work_dir, "github_output"),
+        "GITHUB_STEP_SUMMARY": os.path.join(work_dir, "step_summary.md"),
+        "DEPLOY_METADATA_DIR": os.path.join(work_dir, ".deploy-metadata"),
+        "PYTHONUNBUFFERED": "1",
+    })
+    if script == "promotion_handler":
+        env.update({"REPO": REPO, "PROMO_BRANCH": "promotions/feature-bench-to-develop", "BASE_BRANCH": "develop",
+                    "SOURCE_PR": "2", "FEATURE_BRANCH": "feature/bench", "GH_PAT": "bench-token"})
+    return env
+
+
+def run_script(script, base_url, work_dir, timeout):
+    """Run one bot; returns (exit_code, wall_seconds, peak_rss_mb)"""
+    log_path = os.path.join(work_dir, f"{script}.log")
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen([sys.executable, os.path.join(DEVOPS_DIR, f"{script}.py")], cwd=work_dir,
+                                   env=script_env(script, base_url, work_dir), stdout=log, stderr=subprocess.STDOUT)
+        deadline = start + timeout
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() > deadline:
+                process.kill()
+                pid, status, usage = os.wait4(process.pid, 0)
+                break
+            time.sleep(0.01)
+        wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss_mb = usage.ru_maxrss / (1024 * 1024 if platform.system() == "Darwin" else 1024)
+    return process.returncode, wall, peak_rss_mb
+
+
+def run_benchmark(scripts, sizes, latency_ms=0.0, jitter_ms=0.0, secondary_limit=None, timeout=1800, keep=False):
+    scenario, files = generate_scenario(sizes)
+    results = []
+    root = tempfile.mkdtemp(prefix="bot-bench-")
+    try:
+        for script in scripts:
+            work_dir = os.path.join(root, script)
+            os.makedirs(work_dir)
+            for name, content in files.items():
+                with open(os.path.join(work_dir, name), "w") as f:
+                    json.dump(content, f)
+
+            github = fakeGitHubServer.FakeGitHub(latency_ms=latency_ms, jitter_ms=jitter_ms,
+                                                 secondary_limit=secondary_limit)
+            github.load_scenario(scenario)
+            server, github, base_url = fakeGitHubServer.start_server(github)
+            try:
+                print(f"▶ {script} ...", flush=True)
+                exit_code, wall, peak_rss_mb = run_script(script, base_url, work_dir, timeout)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+            stats = github.stats()
+            results.append({"script": script, "exit_code": exit_code, "wall_seconds": round(wall, 3),
+                            "peak_rss_mb": round(peak_rss_mb, 1), "api": stats})
+    finally:
+        if keep:
+            print(f"Working directories kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def print_report(results):
+    print()
+    print(f"{'Script':<24}{'Exit':>5}{'Wall (s)':>11}{'RSS (MB)':>10}{'Calls':>8}{'REST':>7}{'GraphQL':>9}{'KB out':>10}{'403/429':>9}")
+    for r in results:
+        api = r["api"]
+        print(f"{r['script']:<24}{r['exit_code']:>5}{r['wall_seconds']:>11.2f}{r['peak_rss_mb']:>10.1f}"
+              f"{api['total_calls']:>8}{api['rest_calls']:>7}{api['graphql_calls']:>9}"
+              f"{api['bytes_out'] / 1024:>10.0f}{api['rate_limited']:>9}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=DEVOPS_DIR, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PR bots against a local fake GitHub API")
+    parser.add_argument("--scripts", nargs="+", default=SCRIPTS, choices=SCRIPTS)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for every synthetic size")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--secondary-limit", type=int, help="mutating calls allowed per minute")
+    parser.add_argument("--timeout", type=float, default=1800, help="per-script timeout in seconds")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--history", help="append results to a JSON-lines history file")
+    parser.add_argument("--keep", action="store_true", help="keep working directories and script logs")
+    args = parser.parse_args()
+
+    sizes = scaled_sizes(args.scale)
+    print(f"Synthetic PR: {sizes}")
+    results = run_benchmark(args.scripts, sizes, args.latency_ms, args.jitter_ms, args.secondary_limit,
+                            args.timeout, args.keep)
+    print_report(results)
+
+    record = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "revision": git_revision(),
+              "sizes": sizes, "latency_ms": args.latency_ms, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(record, f, indent=2)
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
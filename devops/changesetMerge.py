@@ -0,0 +1,203 @@
+"""Merge a retrieved change set into force-app, copying and staging only real changes.
+
+    python devops/changesetMerge.py "<change set>/main/default" force-app/main/default --stage
+
+Every retrieved file is compared with the file it would overwrite, in
+parallel: a different size or SHA-256 is a change, except for XML, where both
+sides are compared in a normalised form first. Normalising drops whitespace
+between elements and attribute order, and for metadata whose top-level
+elements carry no order (profiles, permission sets, labels, ...) sorts them,
+because a retrieve returns them in a different order than the repository
+keeps them. Such files are reported as unchanged and left alone.
+
+Only added and modified files are written, and with --stage they are the only
+paths passed to `git add`, so git does not rehash the whole tree. The
+added/modified/unchanged manifest goes to changesetMerge.json and
+$GITHUB_STEP_SUMMARY; the number of changed files to $GITHUB_OUTPUT (changed).
+
+Standard library only: the change set workflow does not install the devops
+requirements.
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+MAX_WORKERS = int(os.environ.get('CHANGESET_MERGE_MAX_WORKERS', 8))
+REPORT_FILE = "changesetMerge.json"
+CHUNK_SIZE = 1024 * 1024
+XML_SUFFIXES = (".xml",)
+
+# Root elements whose top-level children are keyed by name, so their order is not meaningful.
+# Layouts, applications and the like are left out: there the order is what the user sees.
+UNORDERED_ROOTS = {
+    "Profile", "PermissionSet", "PermissionSetGroup", "MutingPermissionSet", "CustomObject", "CustomLabels",
+    "Translations", "CustomObjectTranslation", "GlobalValueSetTranslation", "StandardValueSetTranslation",
+    "Workflow", "SharingRules", "Flow", "AssignmentRules", "AutoResponseRules", "EscalationRules",
+    "MatchingRules", "CustomMetadata",
+}
+
+GREEN_TEXT = '\033[32m'
+YELLOW_TEXT = '\033[33m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def canonical(element):
+    """Order-stable text of an element: whitespace-only text dropped, attributes sorted"""
+    attributes = "".join(f' {name}="{value}"' for name, value in sorted(element.attrib.items()))
+    text = (element.text or "").strip()
+    children = "".join(canonical(child) + (child.tail or "").strip() for child in element)
+    return f"<{element.tag}{attributes}>{text}{children}</{element.tag}>"
+
+
+def normalized_xml(path):
+    """Canonical bytes of an XML file, with unordered top-level elements sorted; None if it does not parse"""
+    try:
+        root = ElementTree.parse(path).getroot()
+    except (ElementTree.ParseError, OSError):
+        return None
+    children = [canonical(child) for child in root]
+    if local_name(root.tag) in UNORDERED_ROOTS:
+        children.sort()
+    attributes = "".join(f' {name}="{value}"' for name, value in sorted(root.attrib.items()))
+    return f"<{root.tag}{attributes}>{(root.text or '').strip()}{''.join(children)}</{root.tag}>".encode("utf-8")
+
+
+def compare(source, target):
+    """'added', 'modified', 'unchanged' or 'normalized' (bytes differ, normalised XML does not)"""
+    try:
+        target_size = os.path.getsize(target)
+    except OSError:
+        return "added"
+    is_xml = source.endswith(XML_SUFFIXES)
+    if os.path.getsize(source) == target_size and file_digest(source) == file_digest(target):
+        return "unchanged"
+    if is_xml:
+        retrieved, existing = normalized_xml(source), normalized_xml(target)
+        if retrieved is not None and retrieved == existing:
+            return "normalized"
+    return "modified"
+
+
+def retrieved_files(source_dir):
+    """Paths below source_dir, relative to it"""
+    files = []
+    for folder, _, names in os.walk(source_dir):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(folder, name), source_dir))
+    return sorted(files)
+
+
+def copy_file(source, target):
+    # Replace rather than write into the file: it may be hard-linked elsewhere (deltaBuilder.py)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    shutil.copyfile(source, f"{target}.tmp")
+    os.replace(f"{target}.tmp", target)
+
+
+def merge(source_dir, target_dir, workers=MAX_WORKERS, dry_run=False):
+    """Compare every retrieved file and copy the changed ones; returns {status: [relative paths]}"""
+    files = retrieved_files(source_dir)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        statuses = list(pool.map(lambda path: compare(os.path.join(source_dir, path), os.path.join(target_dir, path)),
+                                 files))
+    result = {"added": [], "modified": [], "unchanged": [], "normalized": []}
+    for path, status in zip(files, statuses):
+        result[status].append(path)
+    if not dry_run:
+        changed = result["added"] + result["modified"]
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(lambda path: copy_file(os.path.join(source_dir, path), os.path.join(target_dir, path)),
+                          changed))
+    return result
+
+
+def stage(paths):
+    """git add exactly these paths, in one call"""
+    if not paths:
+        return
+    subprocess.run(["git", "add", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                   input="\0".join(paths).encode("utf-8"), check=True)
+
+
+def summary_markdown(source_dir, target_dir, result, limit=50):
+    lines = [f"### 📥 Change set merge: `{source_dir}` → `{target_dir}`", "",
+             f"- **Added:** {len(result['added'])}",
+             f"- **Modified:** {len(result['modified'])}",
+             f"- **Unchanged:** {len(result['unchanged']) + len(result['normalized'])} "
+             f"({len(result['normalized'])} only reordered or reformatted by the retrieve)", ""]
+    for status in ("added", "modified"):
+        if result[status]:
+            shown = result[status][:limit]
+            lines.append(f"<details><summary>{status.capitalize()} ({len(result[status])})</summary>\n")
+            lines += [f"- `{path}`" for path in shown]
+            if len(result[status]) > len(shown):
+                lines.append(f"- … {len(result[status]) - len(shown)} more in {REPORT_FILE}")
+            lines.append("\n</details>\n")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge retrieved metadata into force-app, copying only real changes")
+    parser.add_argument("source", help="retrieved metadata, e.g. '<change set>/main/default'")
+    parser.add_argument("target", nargs="?", default="force-app/main/default")
+    parser.add_argument("--stage", action="store_true", help="git add the added and modified files")
+    parser.add_argument("--dry-run", action="store_true", help="report without copying or staging")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--report", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source):
+        print(f"{RED_TEXT}❌ {args.source} is not a directory{RESET}")
+        sys.exit(1)
+
+    result = merge(args.source, args.target, args.workers, args.dry_run)
+    changed = [os.path.join(args.target, path) for path in result["added"] + result["modified"]]
+    if args.stage and not args.dry_run:
+        try:
+            stage(changed)
+        except subprocess.CalledProcessError as e:
+            print(f"{RED_TEXT}❌ git add failed with exit code {e.returncode}{RESET}")
+            sys.exit(1)
+
+    with open(args.report, "w") as f:
+        json.dump({"source": args.source, "target": args.target, **result}, f, indent=2)
+    summary_file = os.environ.get('GITHUB_STEP_SUMMARY')
+    if summary_file:
+        with open(summary_file, "a") as f:
+            f.write(summary_markdown(args.source, args.target, result))
+    output_file = os.environ.get('GITHUB_OUTPUT')
+    if output_file:
+        with open(output_file, "a") as f:
+            f.write(f"changed={len(changed)}\n")
+
+    for path in result["added"]:
+        print(f"{GREEN_TEXT}+ {path}{RESET}")
+    for path in result["modified"]:
+        print(f"{YELLOW_TEXT}~ {path}{RESET}")
+    verb = "would be" if args.dry_run else ("copied and staged" if args.stage else "copied")
+    print(f"{GREEN_TEXT}✅ {len(result['added'])} added, {len(result['modified'])} modified {verb}; "
+          f"{len(result['unchanged']) + len(result['normalized'])} unchanged "
+          f"({len(result['normalized'])} only reordered or reformatted){RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""Build the delta package (changed-sources/) from git, without the sfdx-git-delta plugin.
+
+    python devops/deltaBuilder.py --from origin/develop --to HEAD --output-dir changed-sources --source-dir force-app
+
+One `git diff --name-status -z` call lists the changes and one `git ls-tree`
+call lists the files of the target revision. Every changed path is mapped to
+its metadata type and member, the member's companion files (`-meta.xml`,
+bundle contents) are written below the output directory, and the manifests
+are generated in the layout sfdx-git-delta uses:
+
+    changed-sources/package/package.xml
+    changed-sources/destructiveChanges/destructiveChanges.xml
+    changed-sources/destructiveChanges/package.xml
+    changed-sources/force-app/...
+
+Files of the working tree are hard-linked (or reflinked with --link-mode
+reflink) instead of copied; anything that edits changed-sources must replace
+files rather than write into them. When --to is not the checked out HEAD,
+the files are extracted from that revision with `git archive`, a chunk
+of paths per call.
+
+The type table is built in. A Salesforce metadataRegistry.json (from
+@salesforce/source-deploy-retrieve) can extend it with --registry; its
+compiled index is cached next to the delta cache keyed by the file's SHA-256.
+"""
+import os
+import sys
+import json
+import glob
+import fcntl
+import pickle
+import shutil
+import fnmatch
+import hashlib
+import tarfile
+import bisect
+import argparse
+import subprocess
+from xml.sax.saxutils import escape
+
+import phaseProfile
+
+CACHE_DIR = os.environ.get('DELTA_CACHE_DIR', ".delta-cache")
+REGISTRY_CACHE_VERSION = 1
+FICLONE = 0x40049409  # Linux ioctl for copy-on-write clones (btrfs, xfs)
+ARCHIVE_ARGS_BYTES = 64 * 1024  # Paths per `git archive` call, well below ARG_MAX
+
+GREEN_TEXT = '\033[32m'
+YELLOW_TEXT = '\033[33m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+# directoryName: (type name, layout). Layouts:
+#   file        member is the file name without extensions; companions share that name (Foo.cls, Foo.cls-meta.xml)
+#   bundle      member is the first folder below the type directory, the whole folder is deployed
+#   mixed       like bundle, but the member may also be a single file (static resources, experiences)
+#   folder      member is the path below the type directory (reports, dashboards, email templates)
+#   decomposed  custom objects: the object folder holds the object file and child type folders
+BUILTIN_TYPES = {
+    "applications": ("CustomApplication", "file"),
+    "approvalProcesses": ("ApprovalProcess", "file"),
+    "assignmentRules": ("AssignmentRules", "file"),
+    "aura": ("AuraDefinitionBundle", "bundle"),
+    "autoResponseRules": ("AutoResponseRules", "file"),
+    "classes": ("ApexClass", "file"),
+    "components": ("ApexComponent", "file"),
+    "connectedApps": ("ConnectedApp", "file"),
+    "contentassets": ("ContentAsset", "file"),
+    "cspTrustedSites": ("CspTrustedSite", "file"),
+    "customMetadata": ("CustomMetadata", "file"),
+    "customPermissions": ("CustomPermission", "file"),
+    "dashboards": ("Dashboard", "folder"),
+    "duplicateRules": ("DuplicateRule", "file"),
+    "email": ("EmailTemplate", "folder"),
+    "escalationRules": ("EscalationRules", "file"),
+    "experiences": ("ExperienceBundle", "mixed"),
+    "externalCredentials": ("ExternalCredential", "file"),
+    "flexipages": ("FlexiPage", "file"),
+    "flows": ("Flow", "file"),
+    "globalValueSets": ("GlobalValueSet", "file"),
+    "groups": ("Group", "file"),
+    "labels": ("CustomLabels", "file"),
+    "layouts": ("Layout", "file"),
+    "letterhead": ("Letterhead", "file"),
+    "lwc": ("LightningComponentBundle", "bundle"),
+    "matchingRules": ("MatchingRules", "file"),
+    "messageChannels": ("LightningMessageChannel", "file"),
+    "namedCredentials": ("NamedCredential", "file"),
+    "navigationMenus": ("NavigationMenu", "file"),
+    "networks": ("Network", "file"),
+    "notificationtypes": ("CustomNotificationType", "file"),
+    "objects": ("CustomObject", "decomposed"),
+    "objectTranslations": ("CustomObjectTranslation", "bundle"),
+    "pages": ("ApexPage", "file"),
+    "pathAssistants": ("PathAssistant", "file"),
+    "permissionsetgroups": ("PermissionSetGroup", "file"),
+    "permissionsets": ("PermissionSet", "file"),
+    "platformEventChannelMembers": ("PlatformEventChannelMember", "file"),
+    "profiles": ("Profile", "file"),
+    "queues": ("Queue", "file"),
+    "quickActions": ("QuickAction", "file"),
+    "remoteSiteSettings": ("RemoteSiteSetting", "file"),
+    "reports": ("Report", "folder"),
+    "reportTypes": ("ReportType", "file"),
+    "roles": ("Role", "file"),
+    "settings": ("Settings", "file"),
+    "sharingRules": ("SharingRules", "file"),
+    "sites": ("CustomSite", "file"),
+    "standardValueSets": ("StandardValueSet", "file"),
+    "staticresources": ("StaticResource", "mixed"),
+    "tabs": ("CustomTab", "file"),
+    "translations": ("Translations", "file"),
+    "triggers": ("ApexTrigger", "file"),
+    "weblinks": ("CustomPageWebLink", "file"),
+    "workflows": ("Workflow", "file"),
+}
+
+# Child folders of a decomposed custom object
+OBJECT_CHILDREN = {
+    "businessProcesses": "BusinessProcess",
+    "compactLayouts": "CompactLayout",
+    "fieldSets": "FieldSet",
+    "fields": "CustomField",
+    "indexes": "Index",
+    "listViews": "ListView",
+    "recordTypes": "RecordType",
+    "sharingReasons": "SharingReason",
+    "validationRules": "ValidationRule",
+    "webLinks": "WebLink",
+}
+
+SDR_LAYOUTS = {"bundle": "bundle", "mixedContent": "mixed", "digitalExperience": "bundle", "decomposed": "decomposed"}
+
+
+def compile_registry(registry):
+    """Directory index {directoryName: (type name, layout)} from a source-deploy-retrieve metadataRegistry.json"""
+    index = {}
+    for metadata_type in registry.get("types", {}).values():
+        directory = metadata_type.get("directoryName")
+        if not directory or metadata_type.get("isAddressable") is False:
+            continue
+        adapter = metadata_type.get("strategies", {}).get("adapter")
+        layout = "folder" if metadata_type.get("inFolder") else SDR_LAYOUTS.get(adapter, "file")
+        index[directory] = (metadata_type["name"], layout)
+    return index
+
+
+def load_type_table(registry_path=None, cache_dir=CACHE_DIR):
+    """Built-in table, extended by a registry file whose compiled index is cached by content hash"""
+    table = dict(BUILTIN_TYPES)
+    if not registry_path:
+        return table
+
+    with open(registry_path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    cache_path = os.path.join(cache_dir, f"registry.{digest[:16]}.pickle")
+    try:
+        with open(cache_path, "rb") as f:
+            version, index = pickle.load(f)
+        if version != REGISTRY_CACHE_VERSION:
+            raise ValueError("stale registry cache")
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        index = compile_registry(json.loads(raw))
+        os.makedirs(cache_dir, exist_ok=True)
+        for stale in glob.glob(os.path.join(glob.escape(cache_dir), "registry.*.pickle")):
+            os.remove(stale)
+        with open(cache_path, "wb") as f:
+            pickle.dump((REGISTRY_CACHE_VERSION, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # The built-in entries know how this repo deploys; the registry only fills gaps
+    for directory, entry in index.items():
+        table.setdefault(directory, entry)
+    return table
+
+
+def strip_name(file_name):
+    """Foo.cls-meta.xml -> Foo, Type.Record.md-meta.xml -> Type.Record"""
+    if file_name.endswith("-meta.xml"):
+        file_name = file_name[:-len("-meta.xml")]
+    return file_name.rsplit(".", 1)[0] if "." in file_name else file_name
+
+
+def resolve(path, table):
+    """(type name, member, component key) for a source path, or None if it is not metadata.
+
+    The component key identifies the files deployed together (a bundle folder,
+    a file name prefix) and is used to collect companions.
+    """
+    parts = path.split("/")
+    for index, part in enumerate(parts[:-1]):
+        if part not in table:
+            continue
+        type_name, layout = table[part]
+        rest = parts[index + 1:]
+        type_dir = "/".join(parts[:index + 1])
+
+        if layout == "bundle":
+            if len(rest) < 2:
+                return None  # loose files such as lwc/jsconfig.json
+            return type_name, rest[0], ("dir", f"{type_dir}/{rest[0]}")
+        if layout == "mixed":
+            member = rest[0] if len(rest) > 1 else strip_name(rest[0])
+            return type_name, member, ("mixed", f"{type_dir}/{member}")
+        if layout == "folder":
+            member = "/".join(rest[:-1] + [strip_name(rest[-1])])
+            return type_name, member, ("name", f"{type_dir}/{member}")
+        if layout == "decomposed":
+            object_name = rest[0]
+            if len(rest) == 3 and rest[1] in OBJECT_CHILDREN:
+                member = f"{object_name}.{strip_name(rest[2])}"
+                return OBJECT_CHILDREN[rest[1]], member, ("name", "/".join(parts[:-1] + [strip_name(rest[2])]))
+            if len(rest) == 2:
+                return type_name, object_name, ("name", f"{type_dir}/{object_name}/{strip_name(rest[1])}")
+            return None
+        # Source format allows subfolders (classes/util/Bar.cls); the member is the file name wherever it sits
+        member = strip_name(rest[-1])
+        return type_name, member, ("name", "/".join(parts[:-1] + [member]))
+    return None
+
+
+def index_tree(tree_files):
+    """Index the target revision once: (sorted paths, {(directory, stripped file name): [paths]})"""
+    by_name = {}
+    for path in tree_files:
+        directory, _, file_name = path.rpartition("/")
+        by_name.setdefault((directory, strip_name(file_name)), []).append(path)
+    return sorted(tree_files), by_name
+
+
+def files_below(prefix, sorted_paths):
+    """Paths under the folder prefix, found by bisecting the sorted path list"""
+    start = bisect.bisect_left(sorted_paths, prefix + "/")
+    end = bisect.bisect_left(sorted_paths, prefix + "0")  # "0" sorts right after "/"
+    return sorted_paths[start:end]
+
+
+def component_files(key, tree_index):
+    """Files of the target revision that belong to a component key"""
+    sorted_paths, by_name = tree_index
+    kind, prefix = key
+    if kind == "dir":
+        return files_below(prefix, sorted_paths)
+    named = by_name.get(tuple(prefix.rsplit("/", 1)), [])
+    if kind == "mixed":
+        return files_below(prefix, sorted_paths) + named
+    return list(named)
+
+
+def load_forceignore(path=".forceignore"):
+    patterns = []
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    patterns.append(line)
+    except OSError:
+        pass
+    return patterns
+
+
+def ignored(path, patterns):
+    """Subset of .forceignore (gitignore style): names, anchored paths and ** globs"""
+    for pattern in patterns:
+        anchored = pattern.startswith("/")
+        pattern = pattern.strip("/")
+        if "/" not in pattern and not anchored:
+            if any(fnmatch.fnmatch(part, pattern) for part in path.split("/")):
+                return True
+            continue
+        glob_pattern = pattern.replace("**/", "*").replace("/**", "/*")
+        if fnmatch.fnmatch(path, glob_pattern) or fnmatch.fnmatch(path, glob_pattern + "/*"):
+            return True
+        if not anchored and fnmatch.fnmatch(path, "*/" + glob_pattern):
+            return True
+    return False
+
+
+def git_changes(from_ref, to_ref, source_dirs):
+    """[(status, path)] from one `git diff --name-status -z` call; renames come out as delete + add"""
+    output = subprocess.run(["git", "diff", "--name-status", "-z", "--no-renames", from_ref, to_ref, "--"] + source_dirs,
+                            capture_output=True, check=True).stdout.decode("utf-8")
+    fields = output.split("\0")
+    return [(fields[i][0], fields[i + 1]) for i in range(0, len(fields) - 1, 2)]
+
+
+def git_tree_files(to_ref, source_dirs):
+    output = subprocess.run(["git", "ls-tree", "-r", "--name-only", "-z", to_ref, "--"] + source_dirs,
+                            capture_output=True, check=True).stdout.decode("utf-8")
+    return set(filter(None, output.split("\0")))
+
+
+def compute_delta(changes, tree_files, table, ignore_patterns=()):
+    """Return (additions, deletions, files): {type: {members}} twice and the files to write"""
+    tree_index = index_tree(tree_files)
+    additions, deletions = {}, {}
+    files = set()
+    components = {}
+    unresolved = []
+    for status, path in changes:
+        if ignored(path, ignore_patterns):
+            continue
+        resolved = resolve(path, table)
+        if not resolved:
+            unresolved.append(path)
+            continue
+        type_name, member, key = resolved
+        components.setdefault((type_name, member, key), set()).add(status)
+
+    if unresolved:
+        print(f"{YELLOW_TEXT}⚠️ {len(unresolved)} changed path(s) are not metadata of a known type and are not deployed: "
+              f"{', '.join(unresolved[:10])}{' …' if len(unresolved) > 10 else ''}{RESET}")
+
+    deleted_objects = set()
+    for (type_name, member, key), statuses in components.items():
+        existing = component_files(key, tree_index)
+        if existing:
+            # A deleted file of a component that still exists is a change of that component
+            additions.setdefault(type_name, set()).add(member)
+            files.update(path for path in existing if not ignored(path, ignore_patterns))
+        elif "D" in statuses:
+            deletions.setdefault(type_name, set()).add(member)
+            if type_name == "CustomObject":
+                deleted_objects.add(member)
+
+    # Children of a deleted object go with it
+    for child_type in OBJECT_CHILDREN.values():
+        if child_type in deletions:
+            deletions[child_type] = {m for m in deletions[child_type] if m.split(".", 1)[0] not in deleted_objects}
+            if not deletions[child_type]:
+                del deletions[child_type]
+    return additions, deletions, files
+
+
+def package_xml(types, api_version):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<Package xmlns="http://soap.sforce.com/2006/04/metadata">']
+    for type_name in sorted(types):
+        lines.append("    <types>")
+        lines += [f"        <members>{escape(member)}</members>" for member in sorted(types[type_name])]
+        lines.append(f"        <name>{type_name}</name>")
+        lines.append("    </types>")
+    lines += [f"    <version>{api_version}</version>", "</Package>", ""]
+    return "\n".join(lines)
+
+
+def clone_file(source, target):
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def place_file(source, target, link_mode):
+    """Write target from source using the cheapest method the file system allows"""
+    if link_mode in ("auto", "hardlink"):
+        try:
+            os.link(source, target)
+            return "hardlink"
+        except OSError:
+            pass
+    if link_mode in ("auto", "reflink"):
+        try:
+            clone_file(source, target)
+            return "reflink"
+        except OSError:
+            pass
+    shutil.copy2(source, target)
+    return "copy"
+
+
+def path_chunks(paths, max_bytes=ARCHIVE_ARGS_BYTES):
+    """Split paths into lists whose command-line size stays below max_bytes"""
+    chunk, size = [], 0
+    for path in paths:
+        length = len(path.encode("utf-8")) + 1
+        if chunk and size + length > max_bytes:
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(path)
+        size += length
+    if chunk:
+        yield chunk
+
+
+def write_files(files, to_ref, output_dir, link_mode):
+    """Write the delta files below output_dir; returns {method: count}"""
+    methods = {}
+    head = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    target = subprocess.run(["git", "rev-parse", to_ref], capture_output=True, text=True, check=True).stdout.strip()
+    if target != head or link_mode == "archive":
+        # The working tree is another revision: extract the files from git, a chunk of paths per call
+        # (git archive takes no pathspec file, and one call with every path can exceed ARG_MAX)
+        extract_options = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+        for chunk in path_chunks(sorted(files)):
+            archive = subprocess.Popen(["git", "archive", "--format=tar", to_ref, "--"] + chunk, stdout=subprocess.PIPE)
+            with tarfile.open(fileobj=archive.stdout, mode="r|") as tar:
+                tar.extractall(output_dir, **extract_options)
+            if archive.wait() != 0:
+                raise subprocess.CalledProcessError(archive.returncode, "git archive")
+        return {"archive": len(files)}
+
+    for path in sorted(files):
+        destination = os.path.join(output_dir, path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        method = place_file(path, destination, link_mode)
+        methods[method] = methods.get(method, 0) + 1
+    return methods
+
+
+def api_version(project_file="sfdx-project.json"):
+    try:
+        with open(project_file) as f:
+            return json.load(f).get("sourceApiVersion", "63.0")
+    except (OSError, json.JSONDecodeError):
+        return "63.0"
+
+
+def main():
+    phaseProfile.install()
+    parser = argparse.ArgumentParser(description="Build changed-sources/ and its manifests from a git diff")
+    parser.add_argument("--from", dest="from_ref", required=True)
+    parser.add_argument("--to", dest="to_ref", default="HEAD")
+    parser.add_argument("--output-dir", default="changed-sources")
+    parser.add_argument("--source-dir", action="append", dest="source_dirs", help="repeatable, default force-app")
+    parser.add_argument("--link-mode", choices=["auto", "hardlink", "reflink", "copy", "archive"], default="auto")
+    parser.add_argument("--registry", default=os.environ.get('DELTA_METADATA_REGISTRY'),
+                        help="metadataRegistry.json from @salesforce/source-deploy-retrieve")
+    parser.add_argument("--api-version", default=None)
+    args = parser.parse_args()
+
+    source_dirs = [d.rstrip("/") for d in (args.source_dirs or ["force-app"])]
+    with phaseProfile.span("load"):
+        table = load_type_table(args.registry)
+    try:
+        with phaseProfile.span("parse diff"):
+            changes = git_changes(args.from_ref, args.to_ref, source_dirs)
+            tree_files = git_tree_files(args.to_ref, source_dirs)
+    except subprocess.CalledProcessError as e:
+        print(f"{RED_TEXT}❌ git failed: {e.stderr.decode('utf-8', 'replace').strip()}{RESET}")
+        sys.exit(1)
+
+    with phaseProfile.span("match"):
+        additions, deletions, files = compute_delta(changes, tree_files, table, load_forceignore())
+    version = args.api_version or api_version()
+
+    shutil.rmtree(args.output_dir, ignore_errors=True)
+    for folder in ("package", "destructiveChanges"):
+        os.makedirs(os.path.join(args.output_dir, folder), exist_ok=True)
+    with phaseProfile.span("render"):
+        with open(os.path.join(args.output_dir, "package", "package.xml"), "w") as f:
+            f.write(package_xml(additions, version))
+        with open(os.path.join(args.output_dir, "destructiveChanges", "destructiveChanges.xml"), "w") as f:
+            f.write(package_xml(deletions, version))
+        with open(os.path.join(args.output_dir, "destructiveChanges", "package.xml"), "w") as f:
+            f.write(package_xml({}, version))
+
+    with phaseProfile.span("write"):
+        methods = write_files(files, args.to_ref, args.output_dir, args.link_mode) if files else {}
+    added = sum(len(members) for members in additions.values())
+    deleted = sum(len(members) for members in deletions.values())
+    print(f"{GREEN_TEXT}✅ {len(changes)} changed path(s): {added} component(s) to deploy, {deleted} to delete, "
+          f"{len(files)} file(s) written to {args.output_dir} "
+          f"({', '.join(f'{count} {method}' for method, count in methods.items()) or 'none'}){RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Deploy-ready zip of the delta package with a checksum manifest.
+
+environmentReplacer.py --zip writes the package in one pass: files whose
+values were replaced come from memory, everything else is streamed from
+changed-sources. The layout matches `zip -r delta-package.zip changed-sources`.
+package-manifest.json in the zip lists the SHA-256 of every entry and the
+replaced files, so the deploy job can check the package before unzipping:
+
+    python devops/deployPackage.py verify delta-package/delta-package.zip
+
+Only the standard library is used, so the check runs without the validate
+job's Python dependencies.
+"""
+import os
+import sys
+import json
+import time
+import zipfile
+import hashlib
+import argparse
+from pathlib import Path
+
+import phaseProfile
+
+PACKAGE_MANIFEST = "package-manifest.json"
+# Content that is already compressed (zipped static resources, images, PDFs) is stored as is
+COMPRESSED_MAGIC = (b"PK\x03\x04", b"\x1f\x8b", b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"%PDF")
+CHUNK_SIZE = 1024 * 1024
+
+GREEN_TEXT = '\033[32m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+
+def is_compressed(head):
+    return head.startswith(COMPRESSED_MAGIC)
+
+
+def write_package(zip_path, source_dir, replaced, environment):
+    """Write source_dir to zip_path as `zip -r` would, with the replaced content taken from memory.
+
+    Untouched files are streamed into the archive in chunks; content that is
+    already compressed is stored rather than deflated again. A manifest with the
+    SHA-256 of every entry and the list of replaced files is added as
+    package-manifest.json, for verify_package() on the deploy side.
+    """
+    manifest = {"version": 1, "environment": environment, "created": int(time.time()), "files": {}, "replaced": []}
+    temp_path = f"{zip_path}.tmp"
+    with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+        for root, dirs, files in os.walk(source_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.normpath(os.path.join(root, name))
+                arcname = Path(path).as_posix()
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                digest = hashlib.sha256()
+                if path in replaced:
+                    content = replaced[path]
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    info.file_size = len(content)
+                    archive.writestr(info, content)
+                    digest.update(content)
+                    manifest["replaced"].append(arcname)
+                else:
+                    with open(path, "rb") as source:
+                        head = source.read(8)
+                        info.compress_type = zipfile.ZIP_STORED if is_compressed(head) else zipfile.ZIP_DEFLATED
+                        source.seek(0)
+                        with archive.open(info, "w", force_zip64=True) as target:
+                            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                                digest.update(chunk)
+                                target.write(chunk)
+                manifest["files"][arcname] = digest.hexdigest()
+        archive.writestr(PACKAGE_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(temp_path, zip_path)
+    return manifest
+
+
+def verify_package(zip_path):
+    """Check every entry of a package against its manifest without extracting it; returns a list of problems"""
+    problems = []
+    with zipfile.ZipFile(zip_path) as archive:
+        try:
+            manifest = json.loads(archive.read(PACKAGE_MANIFEST))
+        except KeyError:
+            return [f"{PACKAGE_MANIFEST} is missing"]
+        entries = {info.filename for info in archive.infolist() if not info.is_dir()} - {PACKAGE_MANIFEST}
+        for arcname in sorted(entries - set(manifest["files"])):
+            problems.append(f"{arcname}: not in the manifest")
+        for arcname, expected in sorted(manifest["files"].items()):
+            if arcname not in entries:
+                problems.append(f"{arcname}: missing")
+                continue
+            digest = hashlib.sha256()
+            with archive.open(arcname) as source:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            if digest.hexdigest() != expected:
+                problems.append(f"{arcname}: checksum mismatch")
+    return problems
+
+
+def main():
+    phaseProfile.install()
+    parser = argparse.ArgumentParser(description="Check a delta package zip against its manifest")
+    parser.add_argument("command", choices=["verify"])
+    parser.add_argument("zip_path")
+    args = parser.parse_args()
+
+    try:
+        problems = verify_package(args.zip_path)
+    except (OSError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+        problems = [str(e)]
+    for problem in problems:
+        print(f"{RED_TEXT}❌ {problem}{RESET}")
+    if problems:
+        sys.exit(1)
+    print(f"{GREEN_TEXT}✅ {args.zip_path} matches its manifest{RESET}")
+
+
+if __name__ == "__main__":
+    main()
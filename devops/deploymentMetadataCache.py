@@ -0,0 +1,64 @@
+import os
+import json
+
+# Directory shared between the validation and deploy jobs (persisted with actions/cache)
+CACHE_DIR = os.getenv("DEPLOY_METADATA_DIR", ".deploy-metadata")
+
+# Variables the deploy job needs, in the order they are written to GITHUB_ENV
+METADATA_VARIABLES = ["BYPASS_DEPLOYMENT", "RUN_ID", "DEPLOYMENT_ID", "ARTIFACT_URL", "ARTIFACT_ID"]
+
+
+def record_path(pr_number, commit_id, cache_dir=CACHE_DIR):
+    """Path of the record for one PR head commit"""
+    return os.path.join(cache_dir, f"{pr_number}-{commit_id}.json")
+
+
+def write_record(pr_number, commit_id, variables, passed, cache_dir=CACHE_DIR):
+    """Store the deployment metadata and outcome of a validation run keyed by PR number and head commit"""
+    if not pr_number or not commit_id:
+        print("Deployment metadata not cached: PR number or commit id missing")
+        return None
+
+    record = {
+        "pr_number": str(pr_number),
+        "commit_id": commit_id,
+        "passed": bool(passed),
+        "variables": {key: str(value) for key, value in variables.items()
+                      if key in METADATA_VARIABLES and value not in (None, "", "N/A")}
+    }
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = record_path(pr_number, commit_id, cache_dir)
+    with open(path, "w") as f:
+        json.dump(record, f)
+    print(f"Deployment metadata cached: {path}")
+    return path
+
+
+def read_record(pr_number, commit_id, cache_dir=CACHE_DIR):
+    """Return the cached variables for this PR head commit, or None on a cache miss"""
+    if not pr_number or not commit_id:
+        return None
+
+    path = record_path(pr_number, commit_id, cache_dir)
+    try:
+        with open(path, "r") as f:
+            record = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    # Guard against a record restored under the wrong key
+    if record.get("pr_number") != str(pr_number) or record.get("commit_id") != commit_id:
+        print(f"Ignoring deployment metadata for another PR/commit: {path}")
+        return None
+
+    if record.get("passed") is not True:
+        # A failed validation cannot be quick deployed; let the caller look up the latest summary instead
+        print(f"Ignoring deployment metadata of a failed validation: {path}")
+        return None
+
+    variables = record.get("variables", {})
+    if "DEPLOYMENT_ID" not in variables and variables.get("BYPASS_DEPLOYMENT") != "true":
+        # Without a deployment id the record cannot drive a quick deploy
+        return None
+    return variables
@@ -0,0 +1,221 @@
+"""Shared, parse-once model of the `sf project deploy --json` output (deploymentResult.json).
+
+The first script in a job parses and validates the JSON, then drops a pickle
+sidecar next to it keyed by the file's SHA-256. Later steps in the same job
+(quickDeploymentResultChecker.py, prUpdated.py) load the sidecar instead of
+parsing the JSON again.
+"""
+import os
+import json
+import glob
+import math
+import pickle
+import hashlib
+
+SIDECAR_VERSION = 2
+
+
+class DeploymentResultError(ValueError):
+    """Raised when deploymentResult.json does not match the expected schema"""
+
+
+class ComponentFailure:
+    __slots__ = ("component_type", "file_name", "full_name", "problem", "problem_type", "line", "column")
+
+    def __init__(self, item):
+        self.component_type = item.get("componentType")
+        self.file_name = item.get("fileName")
+        self.full_name = item.get("fullName")
+        self.problem = item.get("problem")
+        self.problem_type = item.get("problemType")
+        self.line = item.get("lineNumber")
+        self.column = item.get("columnNumber")
+
+
+class TestFailure:
+    __slots__ = ("name", "method_name", "message", "stack_trace", "time")
+
+    def __init__(self, item):
+        self.name = item.get("name")
+        self.method_name = item.get("methodName")
+        self.message = item.get("message")
+        self.stack_trace = item.get("stackTrace")
+        self.time = _number(item.get("time"))
+
+
+class TestSuccess:
+    __slots__ = ("name", "method_name", "time")
+
+    def __init__(self, item):
+        self.name = item.get("name")
+        self.method_name = item.get("methodName")
+        self.time = _number(item.get("time"))
+
+
+class CodeCoverage:
+    __slots__ = ("name", "num_locations", "num_locations_not_covered")
+
+    def __init__(self, item):
+        self.name = item.get("name")
+        self.num_locations = _number(item.get("numLocations"))
+        self.num_locations_not_covered = _number(item.get("numLocationsNotCovered"))
+
+    @property
+    def coverage_pct(self):
+        if not self.num_locations:
+            return None
+        return round((self.num_locations - self.num_locations_not_covered) * 100 / self.num_locations, 2)
+
+
+class FlowCoverage:
+    __slots__ = ("flow_name", "process_type", "num_elements", "num_elements_not_covered")
+
+    def __init__(self, item):
+        self.flow_name = item.get("flowName")
+        self.process_type = item.get("processType")
+        self.num_elements = _number(item.get("numElements"))
+        self.num_elements_not_covered = _number(item.get("numElementsNotCovered"))
+
+    @property
+    def coverage_pct(self):
+        if not self.num_elements:
+            return None
+        return round((self.num_elements - self.num_elements_not_covered) * 100 / self.num_elements, 2)
+
+
+class CoverageWarning:
+    __slots__ = ("name", "message")
+
+    def __init__(self, item):
+        self.name = item.get("name")
+        self.message = item.get("message")
+
+
+class DeploymentResult:
+    __slots__ = (
+        "name", "id", "status", "success", "deploy_url", "start_date", "completed_date",
+        "number_components_deployed", "number_components_total", "number_component_errors",
+        "number_tests_completed", "number_tests_total", "number_test_errors",
+        "component_failures", "test_failures", "test_successes",
+        "code_coverage", "flow_coverage", "code_coverage_warnings", "flow_coverage_warnings",
+    )
+
+    def __init__(self, data):
+        if not isinstance(data, dict):
+            raise DeploymentResultError("top level must be a JSON object")
+        result = _expect(data, "result", dict, {})
+        details = _expect(result, "details", dict, {})
+        run_test_result = _expect(details, "runTestResult", dict, {})
+
+        self.name = data.get("name", "N/A")
+        self.id = result.get("id", "N/A")
+        self.status = result.get("status")
+        self.success = result.get("success", False) is True or str(result.get("success")).lower() == "true"
+        self.deploy_url = result.get("deployUrl", "")
+        self.start_date = result.get("startDate", "N/A")
+        self.completed_date = result.get("completedDate", "N/A")
+        self.number_components_deployed = _number(result.get("numberComponentsDeployed"))
+        self.number_components_total = _number(result.get("numberComponentsTotal"))
+        self.number_component_errors = _number(result.get("numberComponentErrors"))
+        self.number_tests_completed = _number(result.get("numberTestsCompleted"))
+        self.number_tests_total = _number(result.get("numberTestsTotal"))
+        self.number_test_errors = _number(result.get("numberTestErrors"))
+
+        self.component_failures = [ComponentFailure(i) for i in _records(details, "componentFailures")]
+        self.test_failures = [TestFailure(i) for i in _records(run_test_result, "failures")]
+        self.test_successes = [TestSuccess(i) for i in _records(run_test_result, "successes")]
+        self.code_coverage = [CodeCoverage(i) for i in _records(run_test_result, "codeCoverage")]
+        self.flow_coverage = [FlowCoverage(i) for i in _records(run_test_result, "flowCoverage")]
+        self.code_coverage_warnings = [CoverageWarning(i) for i in _records(run_test_result, "codeCoverageWarnings")]
+        self.flow_coverage_warnings = [CoverageWarning(i) for i in _records(run_test_result, "flowCoverageWarnings")]
+
+    @property
+    def nothing_to_deploy(self):
+        return self.name == "NothingToDeploy"
+
+    @property
+    def passed(self):
+        """Status used by the PR summary: a successful deploy or an empty delta"""
+        return self.success or self.nothing_to_deploy
+
+    def summary_line(self):
+        """One-line description used instead of dumping the whole JSON to the log"""
+        return (
+            f"{self.name} {self.id}: success={self.success}, "
+            f"components {self.number_components_deployed}/{self.number_components_total} "
+            f"({len(self.component_failures)} failures), "
+            f"tests {self.number_tests_completed}/{self.number_tests_total} "
+            f"({len(self.test_failures)} failures), "
+            f"{len(self.code_coverage)} classes / {len(self.flow_coverage)} flows with coverage"
+        )
+
+
+def _number(value):
+    """Salesforce returns counters and times as numbers or numeric strings; integral values become ints"""
+    try:
+        number = float(value or 0)
+    except (TypeError, ValueError):
+        return 0
+    if not math.isfinite(number):
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+def _expect(container, key, kind, default):
+    value = container.get(key, default)
+    if value is None:
+        return default
+    if not isinstance(value, kind):
+        raise DeploymentResultError(f"'{key}' must be a {kind.__name__}, got {type(value).__name__}")
+    return value
+
+
+def _records(container, key):
+    """List of objects under key; the Metadata API returns a single object when there is only one"""
+    value = container.get(key)
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(i, dict) for i in value):
+        raise DeploymentResultError(f"'{key}' must be a list of objects")
+    return value
+
+
+def sidecar_path(path, digest):
+    return f"{path}.{digest[:16]}.pickle"
+
+
+def load(path="deploymentResult.json"):
+    """Return the DeploymentResult for path, parsing the JSON only if no matching sidecar exists.
+
+    Raises FileNotFoundError, json.JSONDecodeError or DeploymentResultError.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    sidecar = sidecar_path(path, digest)
+
+    try:
+        with open(sidecar, "rb") as f:
+            version, model = pickle.load(f)
+        if version == SIDECAR_VERSION and isinstance(model, DeploymentResult):
+            return model
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError):
+        pass
+
+    model = DeploymentResult(json.loads(raw))
+
+    # Drop sidecars of previous versions of the file before writing the new one
+    for stale in glob.glob(f"{glob.escape(path)}.*.pickle"):
+        if stale != sidecar:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    try:
+        with open(sidecar, "wb") as f:
+            pickle.dump((SIDECAR_VERSION, model), f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    return model
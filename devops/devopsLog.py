@@ -0,0 +1,187 @@
+"""Shared logging for the devops scripts: levels, sampling, bounded payloads, redaction.
+
+    log = devopsLog.get_logger(__name__)
+    log.info("Violation %d: no matching PR file", i, extra={"category": "violation"})
+    log.warning("GraphQL response: %s", devopsLog.excerpt(response.text))
+
+Every logger hangs off the "devops" logger, which writes to stdout as
+`LEVEL: message` or, with LOG_FORMAT=json, as one JSON object per line (time,
+level, logger, message and any `extra` fields). LOG_LEVEL sets the level
+(default INFO).
+
+Records with a category are sampled: the first `burst` records pass, then one
+in `every` (0 drops the rest). Defaults are in SAMPLING and can be overridden
+with LOG_SAMPLING="violation=20/100,graphql=10/0". The number of suppressed
+records per category is logged at exit.
+
+Payloads are logged through excerpt(), which serialises, redacts and cuts them
+at LOG_PAYLOAD_LIMIT characters (default 2000). Tokens are redacted from every
+record: values of environment variables named like secrets (TOKEN_GITHUB,
+GH_PAT, SF_AUTH_URL, *_SECRET, *_PASSWORD, ...), values passed to
+register_secret(), and anything shaped like a GitHub token, a bearer header,
+an sfdx auth URL or a Salesforce session ID.
+"""
+import os
+import re
+import sys
+import json
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', "INFO").upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', "text").lower()
+PAYLOAD_LIMIT = int(os.environ.get('LOG_PAYLOAD_LIMIT', 2000))
+
+# category: (burst, every)
+SAMPLING = {
+    "violation": (20, 100),
+    "graphql": (10, 0),
+}
+
+SECRET_NAME = re.compile(r"(?:^|_)(?:TOKEN|SECRET|PASSWORD|PASSWD|PAT|KEY|AUTH_URL)(?:_|$)")
+SECRET_PATTERNS = [
+    re.compile(r"\b(?:gh[pousr]_[A-Za-z0-9]{20,}|github_pat_[A-Za-z0-9_]{20,})"),
+    re.compile(r"(?<=Bearer )[^\s'\"]+|(?<=token )[A-Za-z0-9_]{20,}", re.IGNORECASE),
+    re.compile(r"force://[^\s'\"]+"),
+    re.compile(r"\b00D[A-Za-z0-9]{12,15}![A-Za-z0-9._]+"),
+]
+MASK = "***"
+MIN_SECRET_LENGTH = 6
+
+_secrets = set()
+_lock = threading.Lock()
+_state = {"configured": False}
+_sampling = {}
+_counts = {}
+_suppressed = {}
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "category"}
+
+
+def register_secret(value):
+    """Redact value from every later record and excerpt"""
+    if value and len(str(value)) >= MIN_SECRET_LENGTH:
+        with _lock:
+            _secrets.add(str(value))
+
+
+def redact(text):
+    text = str(text)
+    for secret in sorted(_secrets, key=len, reverse=True):
+        if secret in text:
+            text = text.replace(secret, MASK)
+    for pattern in SECRET_PATTERNS:
+        text = pattern.sub(MASK, text)
+    return text
+
+
+def excerpt(payload, limit=None):
+    """A redacted string of at most limit characters for a payload of any size"""
+    limit = PAYLOAD_LIMIT if limit is None else limit
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8", "replace")
+    if not isinstance(payload, str):
+        try:
+            payload = json.dumps(payload, separators=(",", ":"), default=str)
+        except (TypeError, ValueError):
+            payload = repr(payload)
+    text = redact(payload)
+    if len(text) > limit:
+        return f"{text[:limit]}… ({len(text) - limit} more characters)"
+    return text
+
+
+def parse_sampling(spec):
+    """'violation=20/100,graphql=10/0' -> {category: (burst, every)}"""
+    policies = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        category, _, policy = item.partition("=")
+        burst, _, every = policy.partition("/")
+        try:
+            policies[category.strip()] = (int(burst), int(every or 0))
+        except ValueError:
+            continue
+    return policies
+
+
+class RedactFilter(logging.Filter):
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = ()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def filter(self, record):
+        category = getattr(record, "category", None)
+        policy = _sampling.get(category)
+        if policy is None:
+            return True
+        burst, every = policy
+        with _lock:
+            seen = _counts[category] = _counts.get(category, 0) + 1
+            keep = seen <= burst or (every > 0 and (seen - burst) % every == 0)
+            if not keep:
+                _suppressed[category] = _suppressed.get(category, 0) + 1
+        return keep
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "category", None):
+            entry["category"] = record.category
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        # Extra fields are not redacted by RedactFilter; the mask keeps the line valid JSON
+        return redact(json.dumps(entry, default=str))
+
+
+class TextFormatter(logging.Formatter):
+    def formatException(self, exc_info):
+        return redact(super().formatException(exc_info))
+
+
+def configure():
+    """Set up the "devops" logger once; get_logger() calls this"""
+    if _state["configured"]:
+        return
+    _state["configured"] = True
+    for name, value in os.environ.items():
+        if SECRET_NAME.search(name):
+            register_secret(value)
+    _sampling.update(SAMPLING)
+    _sampling.update(parse_sampling(os.environ.get('LOG_SAMPLING')))
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonLinesFormatter() if LOG_FORMAT == "json" else TextFormatter("%(levelname)s: %(message)s"))
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(RedactFilter())
+    root = logging.getLogger("devops")
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    root.propagate = False
+    atexit.register(report_suppressed)
+
+
+def get_logger(name):
+    configure()
+    name = os.path.splitext(os.path.basename(sys.argv[0]))[0] if name == "__main__" else name
+    return logging.getLogger(f"devops.{name}")
+
+
+def report_suppressed():
+    """Log how many records sampling dropped (registered with atexit by configure())"""
+    if _suppressed:
+        logging.getLogger("devops").info(
+            "Sampling suppressed %s", ", ".join(f"{count} {category} record(s)" for category, count in _suppressed.items()),
+            extra={"suppressed": dict(_suppressed)})
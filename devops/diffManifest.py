@@ -0,0 +1,200 @@
+"""Diff index of a pull request: changed files, their hunks and comment positions.
+
+The manifest is built once from the PR files API (all pages) and reused:
+
+- pmdCommentor.py uses it to map violations to diff positions and to drop
+  findings outside the changed hunks before anything is rendered.
+- validate.yml uses the target list to let `sf code-analyzer run` analyse only
+  the files the PR touches.
+
+Usage:
+    python devops/diffManifest.py --output pr-diff-manifest.json --targets scan-targets.txt
+
+Requires PR_NUMBER, GITHUB_REPOSITORY and TOKEN_GITHUB.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+
+import requests
+import apiTrace
+import devopsLog
+import phaseProfile
+
+MANIFEST_VERSION = 1
+PER_PAGE = 100  # GitHub maximum; the files API stops at 3000 files
+
+HUNK_HEADER = re.compile(r'@@\s+-\d+(?:,\d+)?\s+\+(\d+)(?:,(\d+))?\s+@@')
+
+GREEN_TEXT = '\033[32m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+
+def parse_patch(patch):
+    """Return (hunks, line_to_position) for a file patch from the PR files API.
+
+    hunks are inclusive [start, end] ranges of new-file lines shown in the diff
+    (added and context lines). Positions count lines below the first hunk
+    header; later hunk headers take a position too, as in GitHub's review API.
+    """
+    hunks = []
+    line_to_position = {}
+    current_line = 0
+    diff_position = 0
+    seen_header = False
+
+    for patch_line in patch.split('\n'):
+        if patch_line.startswith('@@'):
+            match = HUNK_HEADER.match(patch_line)
+            if match:
+                current_line = int(match.group(1))
+                if match.group(2) != "0":
+                    hunks.append([current_line, current_line - 1])
+            if seen_header:
+                diff_position += 1
+            seen_header = True
+        elif (patch_line.startswith('+') and not patch_line.startswith('+++')) or patch_line.startswith(' '):
+            # Added or context line - can receive comments
+            diff_position += 1
+            line_to_position[current_line] = diff_position
+            if hunks:
+                hunks[-1][1] = current_line
+            current_line += 1
+        elif patch_line.startswith('-'):
+            # Deleted line - takes a position but not a new line number
+            diff_position += 1
+
+    return [h for h in hunks if h[1] >= h[0]], line_to_position
+
+
+def fetch_pr_files(repo, pr_number, token, api_url=None, session=None):
+    """All files of the PR, following the Link header through every page"""
+    api_url = api_url or os.environ.get('GITHUB_API_URL', "https://api.github.com")
+    session = session or requests.Session()
+    url = f"{api_url}/repos/{repo}/pulls/{pr_number}/files"
+    params = {"per_page": PER_PAGE}
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/vnd.github.v3+json"}
+
+    files = []
+    while url:
+        response = session.get(url, headers=headers, params=params)
+        if response.status_code != 200:
+            raise RuntimeError(f"Failed to get PR files: {response.status_code} {devopsLog.excerpt(response.text, 200)}")
+        files.extend(response.json())
+        url = response.links.get("next", {}).get("url")
+        params = None  # the next link already carries the query string
+    return files
+
+
+def build_manifest(pr_files, pr_number=None, head_sha=None):
+    files = {}
+    for file_data in pr_files:
+        entry = {"status": file_data["status"], "hunks": [], "positions": {}}
+        if file_data.get("previous_filename"):
+            entry["previous_filename"] = file_data["previous_filename"]
+        if file_data.get("patch"):
+            entry["hunks"], entry["positions"] = parse_patch(file_data["patch"])
+        files[file_data["filename"]] = entry
+    return {"version": MANIFEST_VERSION, "pr": pr_number, "head_sha": head_sha, "files": files}
+
+
+def write_manifest(manifest, path):
+    with open(path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+
+
+def load_manifest(path):
+    """Read a manifest written by write_manifest, or None if missing or from another version"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    for entry in manifest["files"].values():
+        # JSON object keys are strings
+        entry["positions"] = {int(line): position for line, position in entry["positions"].items()}
+    return manifest
+
+
+def commentable_files(manifest):
+    """{filename: {'valid_lines', 'line_to_position', 'hunks'}} for added or modified files with a patch"""
+    changed = {}
+    for filename, entry in manifest["files"].items():
+        if entry["status"] in ("added", "modified") and entry["positions"]:
+            changed[filename] = {
+                "hunks": entry["hunks"],
+                "valid_lines": set(entry["positions"]),
+                "line_to_position": entry["positions"],
+            }
+    return changed
+
+
+def in_changed_hunks(hunks, line):
+    return any(start <= line <= end for start, end in hunks)
+
+
+def package_directories(project_file="sfdx-project.json"):
+    try:
+        with open(project_file) as f:
+            return [d["path"].rstrip("/") for d in json.load(f).get("packageDirectories", [])]
+    except (OSError, json.JSONDecodeError, KeyError):
+        return []
+
+
+def scan_targets(manifest, source_dirs=None):
+    """Files of the PR that still exist and live under one of source_dirs"""
+    source_dirs = source_dirs if source_dirs is not None else package_directories()
+    targets = []
+    for filename, entry in manifest["files"].items():
+        if entry["status"] == "removed" or not os.path.isfile(filename):
+            continue
+        if source_dirs and not any(filename.startswith(d + "/") for d in source_dirs):
+            continue
+        targets.append(filename)
+    return sorted(targets)
+
+
+def main():
+    apiTrace.install()
+    phaseProfile.install()
+    parser = argparse.ArgumentParser(description="Build the PR diff manifest and the code-analyzer target list")
+    parser.add_argument("--output", default=os.environ.get('PMD_DIFF_MANIFEST', "pr-diff-manifest.json"))
+    parser.add_argument("--targets", help="write the files to scan, one per line")
+    parser.add_argument("--source-dir", action="append", dest="source_dirs",
+                        help="limit targets to this folder (repeatable, default: sfdx-project.json packageDirectories)")
+    args = parser.parse_args()
+
+    repo = os.environ.get('GITHUB_REPOSITORY')
+    pr_number = os.environ.get('PR_NUMBER')
+    token = os.environ.get('TOKEN_GITHUB')
+    if not (repo and pr_number and token):
+        print(f"{RED_TEXT}❌ PR_NUMBER, GITHUB_REPOSITORY and TOKEN_GITHUB are required{RESET}")
+        sys.exit(1)
+
+    try:
+        with phaseProfile.span("fetch"):
+            pr_files = fetch_pr_files(repo, pr_number, token)
+    except (RuntimeError, requests.RequestException) as e:
+        print(f"{RED_TEXT}❌ {e}{RESET}")
+        sys.exit(1)
+
+    with phaseProfile.span("parse diff"):
+        manifest = build_manifest(pr_files, int(pr_number), os.environ.get('COMMIT_ID'))
+    write_manifest(manifest, args.output)
+    hunk_count = sum(len(entry["hunks"]) for entry in manifest["files"].values())
+    print(f"{GREEN_TEXT}✅ {len(manifest['files'])} changed file(s), {hunk_count} hunk(s) written to {args.output}{RESET}")
+
+    if args.targets:
+        targets = scan_targets(manifest, args.source_dirs)
+        with open(args.targets, "w") as f:
+            f.write("".join(f"{target}\n" for target in targets))
+        print(f"{GREEN_TEXT}✅ {len(targets)} scan target(s) written to {args.targets}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
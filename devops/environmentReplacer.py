@@ -2,14 +2,17 @@
 import os
 import sys
 import yaml
+import argparse
 from lxml import etree
 import re
 from pathlib import Path
-import logging
+from deployPackage import write_package
+import devopsLog
+import phaseProfile
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
-logger = logging.getLogger(__name__)
+logger = devopsLog.get_logger("environmentReplacer")
+
+SOURCE_DIR = "changed-sources"
 
 class EnvironmentVariableReplacer:
     def __init__(self, config_dir="environments"):  # Remove target_env from __init__
@@ -61,6 +64,8 @@ class EnvironmentVariableReplacer:
             value = os.getenv(var_name)
             if value:
                 variables[var_name] = value
+                # Placeholders usually hold secrets; keep them out of the "New value" lines
+                devopsLog.register_secret(value)
                 logger.info(f"✓ Loaded environment variable: {var_name}")
             else:
                 missing.append(var_name)
@@ -86,13 +91,13 @@ class EnvironmentVariableReplacer:
         
         return re.sub(r'\$\{([^}]+)\}', replace_variable, str(value))
     
-    def process_file(self, file_path, replacements, variables):
-        """Process a single XML file"""
-        full_path = Path(f"./changed-sources/force-app/main/default/{file_path}")
+    def process_file(self, file_path, replacements, variables, write=True):
+        """Process a single XML file; returns (path, replaced content), or None if nothing changed"""
+        full_path = Path(f"./{SOURCE_DIR}/force-app/main/default/{file_path}")
         
         if not full_path.exists():
             logger.info(f"File not in delta, skipping: {file_path}")
-            return
+            return None
         
         logger.info(f"Processing: {file_path}")
         
@@ -119,21 +124,35 @@ class EnvironmentVariableReplacer:
                 else:
                     logger.warning(f"  ⚠ XPath not found: {xpath}")
             
-            # Save if modified
-            if modified:
-                tree.write(str(full_path), encoding='utf-8', xml_declaration=True, pretty_print=True)
+            if not modified:
+                return None
+            content = etree.tostring(tree, encoding='UTF-8', xml_declaration=True, pretty_print=True)
+
+            # Save if modified. Write a new file and swap it in: changed-sources may hard-link
+            # to the checkout (deltaBuilder.py), so writing in place would change the source too
+            if write:
+                temp_path = full_path.with_name(full_path.name + '.tmp')
+                temp_path.write_bytes(content)
+                os.replace(temp_path, full_path)
                 logger.info(f"  ✓ File updated: {file_path}")
+            return full_path, content
         
         except Exception as e:
             logger.error(f"  ✗ Error processing {file_path}: {str(e)}")
+            return None
     
-    def process_environment(self, target_env):
-        """Main processing method"""
+    def process_environment(self, target_env, zip_path=None):
+        """Main processing method.
+
+        With zip_path, changed-sources is left untouched and the replaced files
+        go straight into a deploy-ready zip instead.
+        """
         logger.info(f"Starting replacement for environment: {target_env}")
         logger.info("=" * 50)
         
         # Load environment-specific config file
-        config = self.load_config(target_env)  # Pass target_env here
+        with phaseProfile.span("load"):
+            config = self.load_config(target_env)  # Pass target_env here
         
         # Get required environment variables (only for ${} placeholders)
         required_variables = self.get_required_variables(config)
@@ -146,7 +165,7 @@ class EnvironmentVariableReplacer:
         variables = self.load_variables(required_variables)
         
         # Check if we have changes to process
-        if not Path('./changed-sources').exists():
+        if not Path(f'./{SOURCE_DIR}').exists():
             logger.info('No changed-sources directory found')
             return
         
@@ -160,21 +179,33 @@ class EnvironmentVariableReplacer:
         
         # Process each file
         logger.info(f"Processing {len(files_to_process)} files...")
-        for file_path, replacements in files_to_process.items():
-            self.process_file(file_path, replacements, variables)
+        replaced = {}
+        with phaseProfile.span("render"):
+            for file_path, replacements in files_to_process.items():
+                result = self.process_file(file_path, replacements, variables, write=zip_path is None)
+                if result:
+                    replaced[os.path.normpath(result[0])] = result[1]
+
+        if zip_path:
+            with phaseProfile.span("write"):
+                manifest = write_package(zip_path, SOURCE_DIR, replaced, target_env)
+            logger.info(f"Package written: {zip_path} ({len(manifest['files'])} files, "
+                        f"{len(manifest['replaced'])} replaced)")
         
         logger.info("=" * 50)
         logger.info("Replacement completed successfully!")
 
 
 def main():
-    if len(sys.argv) != 2:
-        logger.error('Usage: python replace_env_vars.py <environment>')  # Fixed script name
-        sys.exit(1)
-    
-    target_env = sys.argv[1]
+    phaseProfile.install()
+    parser = argparse.ArgumentParser(description="Apply environment-specific values to the delta package")
+    parser.add_argument("environment", help="environments/<environment>.yml to apply")
+    parser.add_argument("--zip", dest="zip_path",
+                        help="write a deploy-ready zip instead of rewriting changed-sources in place")
+    args = parser.parse_args()
+
     replacer = EnvironmentVariableReplacer()
-    replacer.process_environment(target_env)  # Pass target_env here
+    replacer.process_environment(args.environment, args.zip_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,692 @@
+"""Offline stand-in for the parts of the GitHub REST and GraphQL APIs used by the devops bots.
+
+Point a bot at it with GITHUB_API_URL / GITHUB_GRAPHQL_URL:
+
+    python devops/fakeGitHubServer.py --scenario scenario.json --port 8788 --latency-ms 40
+    GITHUB_API_URL=http://127.0.0.1:8788 GITHUB_GRAPHQL_URL=http://127.0.0.1:8788/graphql \\
+        python devops/prDeployPreProcessor.py
+
+It supports page/per_page pagination with Link headers, ETag / If-None-Match,
+primary rate-limit headers (X-RateLimit-*), secondary rate limits on mutating
+calls (403 + Retry-After) and injected latency. Every call is recorded so the
+benchmark harness (botBenchmark.py) can count API usage per script.
+
+A scenario is a JSON object:
+
+    {"repos": {"owner/name": {
+        "refs": {"develop": "<sha>"},
+        "pulls": [{"number": 1, "head": "feature/x", "base": "develop", "head_sha": "<sha>",
+                   "files": [{"filename": ..., "status": "modified", "patch": ...}],
+                   "reviews": [{"login": "github-actions[bot]", "body": ..., "comments": [...]}],
+                   "issue_comments": [{"login": ..., "body": ...}]}]}}}
+"""
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter, deque
+from urllib.parse import urlparse, parse_qs, urlencode, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+GRAPHQL_CONNECTION_LIMIT = 100
+MUTATING_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+
+
+class FakeGitHub:
+    """In-memory repository state plus rate limiting, latency injection and call accounting"""
+
+    def __init__(self, bot_login="github-actions[bot]", rate_limit=5000, graphql_rate_limit=5000,
+                 secondary_limit=None, secondary_window=60.0, latency_ms=0.0, jitter_ms=0.0):
+        self.bot_login = bot_login
+        self.rate_limit = rate_limit
+        self.graphql_rate_limit = graphql_rate_limit
+        self.secondary_limit = secondary_limit
+        self.secondary_window = secondary_window
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+
+        self.lock = threading.RLock()
+        self.repos = {}
+        self.nodes = {}
+        self.next_id = 1000
+        self.reset_stats()
+
+    # ── State ──────────────────────────────────────────────────────────────
+
+    def new_id(self, kind):
+        with self.lock:
+            self.next_id += 1
+            return self.next_id, f"{kind}_{self.next_id}"
+
+    def repo(self, full_name):
+        with self.lock:
+            return self.repos.setdefault(full_name, {"refs": {}, "pulls": {}, "next_number": 1})
+
+    def set_ref(self, full_name, branch, sha):
+        self.repo(full_name)["refs"][branch] = sha
+
+    def add_pull_request(self, full_name, number=None, head="feature", base="develop", head_sha=None,
+                         body="", files=None, reviews=None, issue_comments=None, draft=False):
+        repo = self.repo(full_name)
+        with self.lock:
+            number = number or repo["next_number"]
+            repo["next_number"] = max(repo["next_number"], number + 1)
+            database_id, node_id = self.new_id("PR")
+            head_sha = head_sha or hashlib.sha1(f"{full_name}:{head}:{number}".encode()).hexdigest()
+            pr = {
+                "id": database_id, "node_id": node_id, "number": number, "state": "open", "draft": draft,
+                "title": f"PR {number}", "body": body, "head": head, "base": base, "head_sha": head_sha,
+                "files": list(files or []), "reviews": [], "issue_comments": [], "repo": full_name,
+            }
+            repo["pulls"][number] = pr
+            self.nodes[node_id] = ("pull", pr)
+            repo["refs"].setdefault(head, head_sha)
+        for review in reviews or []:
+            self.add_review(full_name, number, review.get("body", ""), review.get("login"),
+                            review.get("comments"), review.get("state", "COMMENTED"))
+        for comment in issue_comments or []:
+            self.add_issue_comment(full_name, number, comment.get("body", ""), comment.get("login"))
+        return pr
+
+    def add_review(self, full_name, number, body, login=None, comments=None, state="COMMENTED"):
+        pr = self.repo(full_name)["pulls"][number]
+        database_id, node_id = self.new_id("PRR")
+        review = {"id": database_id, "node_id": node_id, "body": body, "state": state,
+                  "user": {"login": login or self.bot_login}, "commit_id": pr["head_sha"], "comments": []}
+        with self.lock:
+            pr["reviews"].append(review)
+            self.nodes[node_id] = ("review", (pr, review))
+        for comment in comments or []:
+            comment_id, comment_node = self.new_id("PRRC")
+            entry = {"id": comment_id, "node_id": comment_node, "body": comment.get("body", ""),
+                     "path": comment.get("path"), "position": comment.get("position"), "line": comment.get("line")}
+            with self.lock:
+                review["comments"].append(entry)
+                self.nodes[comment_node] = ("review_comment", (review, entry))
+        return review
+
+    def add_issue_comment(self, full_name, number, body, login=None):
+        pr = self.repo(full_name)["pulls"][number]
+        database_id, node_id = self.new_id("IC")
+        comment = {"id": database_id, "node_id": node_id, "body": body, "user": {"login": login or self.bot_login}}
+        with self.lock:
+            pr["issue_comments"].append(comment)
+            self.nodes[node_id] = ("issue_comment", (pr, comment))
+        return comment
+
+    def load_scenario(self, scenario):
+        for full_name, repo in scenario.get("repos", {}).items():
+            for branch, sha in repo.get("refs", {}).items():
+                self.set_ref(full_name, branch, sha)
+            for pull in repo.get("pulls", []):
+                self.add_pull_request(full_name, **pull)
+
+    # ── Accounting ─────────────────────────────────────────────────────────
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls = []
+            self.core_used = 0
+            self.graphql_used = 0
+            self.mutation_times = deque()
+            self.reset_at = int(time.time()) + 3600
+
+    def record(self, method, route, status, bytes_in, bytes_out, cost=0):
+        with self.lock:
+            self.calls.append({"method": method, "route": route, "status": status,
+                               "bytes_in": bytes_in, "bytes_out": bytes_out, "cost": cost})
+
+    def stats(self):
+        """Call counts per route plus totals, for benchmark reports"""
+        with self.lock:
+            calls = list(self.calls)
+        by_route = Counter(f"{c['method']} {c['route']}" for c in calls)
+        return {
+            "total_calls": len(calls),
+            "graphql_calls": sum(1 for c in calls if c["route"] == "/graphql"),
+            "rest_calls": sum(1 for c in calls if c["route"] != "/graphql"),
+            "not_modified": sum(1 for c in calls if c["status"] == 304),
+            "rate_limited": sum(1 for c in calls if c["status"] in (403, 429)),
+            "bytes_in": sum(c["bytes_in"] for c in calls),
+            "bytes_out": sum(c["bytes_out"] for c in calls),
+            "graphql_cost": sum(c["cost"] for c in calls),
+            "by_route": dict(by_route.most_common()),
+        }
+
+    def inject_latency(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+
+    def check_limits(self, mutating, graphql_cost=0):
+        """Return None when the call is allowed, else (status, headers, payload)"""
+        with self.lock:
+            now = time.monotonic()
+            if mutating and self.secondary_limit is not None:
+                while self.mutation_times and now - self.mutation_times[0] > self.secondary_window:
+                    self.mutation_times.popleft()
+                if len(self.mutation_times) >= self.secondary_limit:
+                    retry_after = int(self.secondary_window - (now - self.mutation_times[0])) + 1
+                    return 403, {"Retry-After": str(retry_after)}, {
+                        "message": "You have exceeded a secondary rate limit. Please wait a few minutes before you try again.",
+                        "documentation_url": "https://docs.github.com/rest/overview/rate-limits-for-the-rest-api"}
+                self.mutation_times.append(now)
+
+            if graphql_cost:
+                if self.graphql_used + graphql_cost > self.graphql_rate_limit:
+                    return 403, {}, {"message": "API rate limit exceeded (graphql)"}
+                self.graphql_used += graphql_cost
+            else:
+                if self.core_used >= self.rate_limit:
+                    return 403, {}, {"message": "API rate limit exceeded"}
+                self.core_used += 1
+        return None
+
+    def rate_headers(self, graphql=False):
+        limit, used = (self.graphql_rate_limit, self.graphql_used) if graphql else (self.rate_limit, self.core_used)
+        return {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(max(limit - used, 0)),
+            "X-RateLimit-Used": str(used),
+            "X-RateLimit-Reset": str(self.reset_at),
+            "X-RateLimit-Resource": "graphql" if graphql else "core",
+        }
+
+
+def paginate(items, query):
+    per_page = min(int(query.get("per_page", [DEFAULT_PER_PAGE])[0]), MAX_PER_PAGE)
+    page = max(int(query.get("page", [1])[0]), 1)
+    last = max((len(items) + per_page - 1) // per_page, 1)
+    return items[(page - 1) * per_page: page * per_page], page, last, per_page
+
+
+def link_header(base_url, query, page, last, per_page):
+    def url(target):
+        params = {k: v[0] for k, v in query.items()}
+        params.update({"per_page": per_page, "page": target})
+        return f'<{base_url}?{urlencode(params)}>'
+
+    links = []
+    if page < last:
+        links += [f'{url(page + 1)}; rel="next"', f'{url(last)}; rel="last"']
+    if page > 1:
+        links += [f'{url(1)}; rel="first"', f'{url(page - 1)}; rel="prev"']
+    return ", ".join(links)
+
+
+# ── REST ──────────────────────────────────────────────────────────────────────
+
+REPO_PREFIX = r"^/repos/(?P<repo>[^/]+/[^/]+)"
+ROUTES = [
+    ("GET", REPO_PREFIX + r"/pulls/(?P<number>\d+)/reviews$", "list_reviews"),
+    ("POST", REPO_PREFIX + r"/pulls/(?P<number>\d+)/reviews$", "create_review"),
+    ("PUT", REPO_PREFIX + r"/pulls/(?P<number>\d+)/reviews/(?P<review_id>\d+)$", "update_review"),
+    ("GET", REPO_PREFIX + r"/pulls/(?P<number>\d+)/files$", "list_files"),
+    ("GET", REPO_PREFIX + r"/pulls/(?P<number>\d+)$", "get_pull"),
+    ("PATCH", REPO_PREFIX + r"/pulls/(?P<number>\d+)$", "update_pull"),
+    ("GET", REPO_PREFIX + r"/pulls$", "list_pulls"),
+    ("POST", REPO_PREFIX + r"/pulls$", "create_pull"),
+    ("GET", REPO_PREFIX + r"/issues/(?P<number>\d+)/comments$", "list_issue_comments"),
+    ("POST", REPO_PREFIX + r"/issues/(?P<number>\d+)/comments$", "create_issue_comment"),
+    ("GET", REPO_PREFIX + r"/git/refs/heads/(?P<branch>.+)$", "get_ref"),
+    ("PATCH", REPO_PREFIX + r"/git/refs/heads/(?P<branch>.+)$", "update_ref"),
+    ("DELETE", REPO_PREFIX + r"/git/refs/heads/(?P<branch>.+)$", "delete_ref"),
+    ("POST", REPO_PREFIX + r"/git/refs$", "create_ref"),
+    ("POST", REPO_PREFIX + r"/merges$", "merge"),
+    ("GET", r"^/rate_limit$", "rate_limit"),
+    ("POST", r"^/graphql$", "graphql"),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern), name) for method, pattern, name in ROUTES]
+
+
+def review_json(review, pr):
+    return {"id": review["id"], "node_id": review["node_id"], "user": review["user"], "body": review["body"],
+            "state": review["state"], "commit_id": review["commit_id"],
+            "pull_request_url": f"/repos/{pr['repo']}/pulls/{pr['number']}"}
+
+
+def pull_json(pr):
+    return {"id": pr["id"], "node_id": pr["node_id"], "number": pr["number"], "state": pr["state"],
+            "draft": pr["draft"], "title": pr["title"], "body": pr["body"],
+            "head": {"ref": pr["head"], "sha": pr["head_sha"]}, "base": {"ref": pr["base"]}}
+
+
+class RestApi:
+    """REST handlers; each returns (status, payload) and may raise KeyError for 404"""
+
+    def __init__(self, github):
+        self.github = github
+
+    def pull(self, repo, number):
+        return self.github.repo(repo)["pulls"][int(number)]
+
+    def list_reviews(self, repo, number, query, body):
+        pr = self.pull(repo, number)
+        return 200, [review_json(r, pr) for r in pr["reviews"]]
+
+    def create_review(self, repo, number, query, body):
+        pr = self.pull(repo, number)
+        review = self.github.add_review(repo, int(number), body.get("body", ""), comments=body.get("comments"),
+                                        state={"COMMENT": "COMMENTED"}.get(body.get("event"), "PENDING"))
+        return 200, review_json(review, pr)
+
+    def update_review(self, repo, number, review_id, query, body):
+        pr = self.pull(repo, number)
+        review = next(r for r in pr["reviews"] if r["id"] == int(review_id))
+        review["body"] = body.get("body", review["body"])
+        return 200, review_json(review, pr)
+
+    def list_files(self, repo, number, query, body):
+        return 200, self.pull(repo, number)["files"]
+
+    def get_pull(self, repo, number, query, body):
+        return 200, pull_json(self.pull(repo, number))
+
+    def update_pull(self, repo, number, query, body):
+        pr = self.pull(repo, number)
+        for key in ("state", "body", "title"):
+            if key in body:
+                pr[key] = body[key]
+        return 200, pull_json(pr)
+
+    def list_pulls(self, repo, number=None, query=None, body=None):
+        pulls = self.github.repo(repo)["pulls"].values()
+        state = query.get("state", ["open"])[0]
+        head = query.get("head", [None])[0]
+        base = query.get("base", [None])[0]
+        result = [pull_json(pr) for pr in pulls
+                  if (state == "all" or pr["state"] == state)
+                  and (head is None or head.split(":")[-1] == pr["head"])
+                  and (base is None or base == pr["base"])]
+        return 200, result
+
+    def create_pull(self, repo, query, body):
+        pulls = self.github.repo(repo)["pulls"].values()
+        if any(pr["state"] == "open" and pr["head"] == body["head"] and pr["base"] == body["base"] for pr in pulls):
+            return 422, {"message": "Validation Failed",
+                         "errors": [{"message": f"A pull request already exists for {body['head']}."}]}
+        if body["head"] not in self.github.repo(repo)["refs"]:
+            return 422, {"message": "Validation Failed", "errors": [{"field": "head", "code": "invalid"}]}
+        pr = self.github.add_pull_request(repo, head=body["head"], base=body["base"], body=body.get("body", ""),
+                                          head_sha=self.github.repo(repo)["refs"][body["head"]],
+                                          draft=body.get("draft", False))
+        pr["title"] = body.get("title", pr["title"])
+        return 201, pull_json(pr)
+
+    def list_issue_comments(self, repo, number, query, body):
+        return 200, self.pull(repo, number)["issue_comments"]
+
+    def create_issue_comment(self, repo, number, query, body):
+        return 201, self.github.add_issue_comment(repo, int(number), body.get("body", ""))
+
+    def get_ref(self, repo, branch, query, body):
+        refs = self.github.repo(repo)["refs"]
+        if branch not in refs:
+            return 404, {"message": "Not Found"}
+        return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": refs[branch], "type": "commit"}}
+
+    def update_ref(self, repo, branch, query, body):
+        refs = self.github.repo(repo)["refs"]
+        if branch not in refs:
+            return 422, {"message": "Reference does not exist"}
+        # Commit ancestry is not modelled, so non-forced updates are accepted as fast-forwards
+        refs[branch] = body["sha"]
+        return 200, {"ref": f"refs/heads/{branch}", "object": {"sha": body["sha"], "type": "commit"}}
+
+    def delete_ref(self, repo, branch, query, body):
+        refs = self.github.repo(repo)["refs"]
+        if refs.pop(branch, None) is None:
+            return 422, {"message": "Reference does not exist"}
+        return 204, None
+
+    def create_ref(self, repo, query, body):
+        refs = self.github.repo(repo)["refs"]
+        branch = body["ref"].replace("refs/heads/", "", 1)
+        if branch in refs:
+            return 422, {"message": "Reference already exists"}
+        refs[branch] = body["sha"]
+        return 201, {"ref": body["ref"], "object": {"sha": body["sha"], "type": "commit"}}
+
+    def merge(self, repo, query, body):
+        refs = self.github.repo(repo)["refs"]
+        if body["base"] not in refs:
+            return 404, {"message": "Base does not exist"}
+        if refs[body["base"]] == body["head"]:
+            return 204, None
+        refs[body["base"]] = hashlib.sha1(f"{refs[body['base']]}+{body['head']}".encode()).hexdigest()
+        return 201, {"sha": refs[body["base"]]}
+
+    def rate_limit(self, query, body):
+        github = self.github
+        return 200, {"resources": {
+            "core": {"limit": github.rate_limit, "used": github.core_used,
+                     "remaining": github.rate_limit - github.core_used, "reset": github.reset_at},
+            "graphql": {"limit": github.graphql_rate_limit, "used": github.graphql_used,
+                        "remaining": github.graphql_rate_limit - github.graphql_used, "reset": github.reset_at}}}
+
+
+# ── GraphQL ───────────────────────────────────────────────────────────────────
+
+MUTATION_FIELD = re.compile(
+    r"(?:(\w+)\s*:\s*)?(deleteReview|deletePullRequestReviewComment|deleteIssueComment|addPullRequestReview|"
+    r"addComment|markPullRequestReadyForReview|updatePullRequestReview|updateIssueComment)\s*\(\s*input\s*:\s*\{(.*?)\}\s*\)",
+    re.S)
+REPOSITORY_FIELD = re.compile(r"(?:(\w+)\s*:\s*)?(ref|pullRequests|pullRequest)\s*\(([^)]*)\)")
+ARGUMENT = re.compile(r"(\w+)\s*:\s*(\$\w+|\"[^\"]*\"|\[[^\]]*\]|\{[^}]*\}|[\w.]+)")
+
+
+def graphql_arguments(text, variables):
+    args = {}
+    for name, raw in ARGUMENT.findall(text):
+        if raw.startswith("$"):
+            args[name] = variables.get(raw[1:])
+        elif raw.startswith('"'):
+            args[name] = raw[1:-1]
+        elif raw.isdigit():
+            args[name] = int(raw)
+        else:
+            args[name] = raw
+    return args
+
+
+def field_arguments(query, field, variables):
+    """Arguments of the first `field(...)` in the query, e.g. {"last": 100} for reviews(last: 100)"""
+    match = re.search(rf"\b{field}\s*\(([^)]*)\)", query)
+    return graphql_arguments(match.group(1), variables) if match else {}
+
+
+def connection(items, to_node, args=None):
+    """A connection over items honouring first: (oldest items) or last: (newest items)"""
+    args = args or {}
+    if args.get("last") is not None:
+        count = min(int(args["last"]), GRAPHQL_CONNECTION_LIMIT)
+        page = items[-count:] if count else []
+        has_next, has_previous = False, len(items) > count
+    else:
+        count = min(int(args.get("first") or GRAPHQL_CONNECTION_LIMIT), GRAPHQL_CONNECTION_LIMIT)
+        page = items[:count]
+        has_next, has_previous = len(items) > count, False
+    return {"totalCount": len(items), "nodes": [to_node(item) for item in page],
+            "pageInfo": {"hasNextPage": has_next, "hasPreviousPage": has_previous,
+                         "endCursor": None, "startCursor": None}}
+
+
+class GraphQLApi:
+    """Pattern-based resolver covering the queries and mutations the bots send"""
+
+    def __init__(self, github):
+        self.github = github
+
+    @staticmethod
+    def classify(query):
+        """(is_mutation, cost) of a query, known before it runs so limits are checked first"""
+        is_mutation = query.lstrip().startswith("mutation")
+        # Each connection of up to 100 nodes costs one point, nested ones multiply
+        cost = 1 if is_mutation else max(1, (query.count("first:") + query.count("last:")) // 2)
+        return is_mutation, cost
+
+    def execute(self, query, variables):
+        """Return (payload, is_mutation, cost); call only once check_limits() allowed the cost"""
+        is_mutation, cost = self.classify(query)
+        data = {}
+        errors = []
+
+        if is_mutation:
+            for alias, field, input_text in MUTATION_FIELD.findall(query):
+                try:
+                    data[alias or field] = self.mutate(field, graphql_arguments(input_text, variables))
+                except (KeyError, StopIteration) as e:
+                    data[alias or field] = None
+                    errors.append({"type": "NOT_FOUND", "path": [alias or field], "message": f"Could not resolve {e}"})
+        else:
+            repo_match = re.search(r"repository\s*\(([^)]*)\)", query)
+            if repo_match:
+                args = graphql_arguments(repo_match.group(1), variables)
+                data["repository"] = self.resolve_repository(f"{args['owner']}/{args['name']}", query, variables)
+
+        if "rateLimit" in query:
+            data["rateLimit"] = {"cost": cost, "limit": self.github.graphql_rate_limit,
+                                 "remaining": self.github.graphql_rate_limit - self.github.graphql_used,
+                                 "resetAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.github.reset_at))}
+        payload = {"data": data}
+        if errors:
+            payload["errors"] = errors
+        return payload, is_mutation, cost
+
+    def resolve_repository(self, full_name, query, variables):
+        repo = self.github.repo(full_name)
+        result = {}
+        for alias, field, arg_text in REPOSITORY_FIELD.findall(query):
+            args = graphql_arguments(arg_text, variables)
+            key = alias or field
+            if field == "ref":
+                branch = (args.get("qualifiedName") or "").replace("refs/heads/", "", 1)
+                sha = repo["refs"].get(branch)
+                result[key] = {"name": branch, "target": {"oid": sha}} if sha else None
+            elif field == "pullRequest":
+                pr = repo["pulls"].get(int(args["number"]))
+                result[key] = self.pull_request_node(pr, query, variables) if pr else None
+            elif field == "pullRequests":
+                states = args.get("states") or "OPEN"
+                pulls = [pr for pr in repo["pulls"].values()
+                         if pr["state"].upper() in str(states)
+                         and (args.get("headRefName") is None or pr["head"] == args["headRefName"])
+                         and (args.get("baseRefName") is None or pr["base"] == args["baseRefName"])]
+                pulls.sort(key=lambda pr: pr["id"], reverse="DESC" in str(args.get("orderBy", "")))
+                result[key] = connection(pulls, self.pull_request_summary, args)
+        return result
+
+    @staticmethod
+    def pull_request_summary(pr):
+        return {"id": pr["node_id"], "number": pr["number"], "body": pr["body"], "headRefName": pr["head"],
+                "baseRefName": pr["base"], "headRefOid": pr["head_sha"], "isDraft": pr["draft"]}
+
+    def pull_request_node(self, pr, query="", variables=None):
+        # The bots use the same arguments for a field wherever it appears, so the first occurrence is enough
+        review_args = field_arguments(query, "reviews", variables or {})
+        comment_args = field_arguments(query, "comments", variables or {})
+        node = self.pull_request_summary(pr)
+        node.update({
+            "baseRefOid": hashlib.sha1(pr["base"].encode()).hexdigest(),
+            "reviews": connection(pr["reviews"], lambda r: {
+                "id": r["node_id"], "databaseId": r["id"], "body": r["body"], "author": {"login": r["user"]["login"]},
+                "comments": connection(r["comments"], lambda c: {"id": c["node_id"], "body": c["body"]},
+                                       comment_args)}, review_args),
+            "comments": connection(pr["issue_comments"], lambda c: {
+                "id": c["node_id"], "databaseId": c["id"], "body": c["body"], "author": {"login": c["user"]["login"]}},
+                comment_args),
+        })
+        return node
+
+    def mutate(self, field, args):
+        github = self.github
+        if field == "deleteReview":
+            pr, review = github.nodes.pop(args["reviewId"])[1]
+            pr["reviews"].remove(review)
+            return {"clientMutationId": None}
+        if field == "deletePullRequestReviewComment":
+            review, comment = github.nodes.pop(args["id"])[1]
+            review["comments"].remove(comment)
+            return {"clientMutationId": None}
+        if field == "deleteIssueComment":
+            pr, comment = github.nodes.pop(args["id"])[1]
+            pr["issue_comments"].remove(comment)
+            return {"clientMutationId": None}
+        if field == "addPullRequestReview":
+            pr = github.nodes[args["pullRequestId"]][1]
+            review = github.add_review(pr["repo"], pr["number"], args.get("body") or "", comments=args.get("comments"))
+            return {"pullRequestReview": {"id": review["node_id"], "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                                          "comments": connection(review["comments"], lambda c: {
+                                              "id": c["node_id"], "path": c["path"], "line": c["line"]})}}
+        if field == "addComment":
+            pr = github.nodes[args["subjectId"]][1]
+            comment = github.add_issue_comment(pr["repo"], pr["number"], args.get("body") or "")
+            return {"commentEdge": {"node": {"id": comment["node_id"], "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ")}}}
+        if field == "updateIssueComment":
+            pr, comment = github.nodes[args["id"]][1]
+            comment["body"] = args.get("body", comment["body"])
+            return {"issueComment": {"id": comment["node_id"]}}
+        if field == "updatePullRequestReview":
+            pr, review = github.nodes[args["pullRequestReviewId"]][1]
+            review["body"] = args.get("body", review["body"])
+            return {"pullRequestReview": {"id": review["node_id"]}}
+        if field == "markPullRequestReadyForReview":
+            pr = github.nodes[args["pullRequestId"]][1]
+            pr["draft"] = False
+            return {"pullRequest": {"id": pr["node_id"], "isDraft": False}}
+        raise KeyError(field)
+
+
+# ── HTTP plumbing ─────────────────────────────────────────────────────────────
+
+def make_handler(github):
+    rest = RestApi(github)
+    graphql = GraphQLApi(github)
+
+    class FakeGitHubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.dispatch("GET")
+
+        def do_POST(self):
+            self.dispatch("POST")
+
+        def do_PATCH(self):
+            self.dispatch("PATCH")
+
+        def do_PUT(self):
+            self.dispatch("PUT")
+
+        def do_DELETE(self):
+            self.dispatch("DELETE")
+
+        def dispatch(self, method):
+            github.inject_latency()
+            parsed = urlparse(self.path)
+            path = unquote(parsed.path)
+            query = parse_qs(parsed.query)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length) if length else b""
+            body = json.loads(raw_body) if raw_body else {}
+
+            for route_method, pattern, name in COMPILED_ROUTES:
+                match = pattern.match(path)
+                if match and route_method == method:
+                    break
+            else:
+                return self.respond(method, path, 404, {"message": "Not Found"}, len(raw_body))
+
+            if not self.headers.get("Authorization"):
+                return self.respond(method, pattern.pattern, 401, {"message": "Requires authentication"}, len(raw_body))
+
+            try:
+                if name == "graphql":
+                    return self.handle_graphql(body, len(raw_body))
+
+                limited = github.check_limits(method in MUTATING_METHODS)
+                if limited:
+                    status, headers, payload = limited
+                    return self.respond(method, pattern.pattern, status, payload, len(raw_body), headers)
+
+                with github.lock:
+                    status, payload = getattr(rest, name)(**match.groupdict(), query=query, body=body)
+            except (KeyError, StopIteration):
+                status, payload = 404, {"message": "Not Found"}
+
+            headers = {}
+            if method == "GET" and status == 200 and isinstance(payload, list):
+                payload, page, last, per_page = paginate(payload, query)
+                link = link_header(f"http://{self.headers.get('Host')}{parsed.path}", query, page, last, per_page)
+                if link:
+                    headers["Link"] = link
+            self.respond(method, pattern.pattern, status, payload, len(raw_body), headers)
+
+        def handle_graphql(self, body, bytes_in):
+            query = body.get("query", "")
+            is_mutation, cost = graphql.classify(query)
+            # Like the REST handlers: a limited call is rejected before it changes anything
+            limited = github.check_limits(is_mutation, graphql_cost=cost)
+            if limited:
+                status, headers, error = limited
+                return self.respond("POST", "/graphql", status, error, bytes_in, headers, graphql=True)
+            with github.lock:
+                payload, is_mutation, cost = graphql.execute(query, body.get("variables") or {})
+            self.respond("POST", "/graphql", 200, payload, bytes_in, graphql=True, cost=cost)
+
+        def respond(self, method, route, status, payload, bytes_in, headers=None, graphql=False, cost=0):
+            body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+            headers = dict(headers or {})
+
+            if method == "GET" and status == 200:
+                etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+                headers["ETag"] = etag
+                if self.headers.get("If-None-Match") == etag:
+                    # Conditional hit: refund the call and answer without a body
+                    with github.lock:
+                        github.core_used -= 1
+                    status, body = 304, b""
+
+            headers.update(github.rate_headers(graphql))
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+            route = re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", route).strip("^$")
+            github.record(method, route, status, bytes_in, len(body), cost)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeGitHubHandler
+
+
+def start_server(github=None, host="127.0.0.1", port=0):
+    """Start the stand-in in a background thread; returns (server, github, base_url)"""
+    github = github or FakeGitHub()
+    server = ThreadingHTTPServer((host, port), make_handler(github))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, github, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline GitHub REST + GraphQL stand-in for the devops bots")
+    parser.add_argument("--scenario", help="JSON scenario to preload")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--graphql-rate-limit", type=int, default=5000)
+    parser.add_argument("--secondary-limit", type=int, help="mutating calls allowed per --secondary-window seconds")
+    parser.add_argument("--secondary-window", type=float, default=60)
+    args = parser.parse_args()
+
+    github = FakeGitHub(rate_limit=args.rate_limit, graphql_rate_limit=args.graphql_rate_limit,
+                        secondary_limit=args.secondary_limit, secondary_window=args.secondary_window,
+                        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    if args.scenario:
+        with open(args.scenario, "r") as f:
+            github.load_scenario(json.load(f))
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(github))
+    print(f"Fake GitHub API on http://{args.host}:{server.server_port} (GraphQL at /graphql)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(github.stats(), indent=2))
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Stand-in for `sf apex run --file <script> --json`, so apexScriptRunner.py runs without an org.
+
+    SF_CLI="python3 devops/fakeSfCli.py" python devops/apexScriptRunner.py --folder scripts/apex
+
+The outcome is driven by comment directives in the script:
+
+    // @fake-sleep: 2.5             seconds the execution takes
+    // @fake-fail: Some message     runtime exception with this message
+    // @fake-compile-error: Bad     compile error with this problem
+
+Scripts without directives succeed immediately. Set FAKE_SF_LOG to a file to
+append one JSON line per run with start and end times, e.g. to check ordering
+and parallelism.
+"""
+import os
+import re
+import sys
+import json
+import time
+
+DIRECTIVE = re.compile(r'^//\s*@fake-(sleep|fail|compile-error)\s*:?\s*(.*?)\s*$', re.IGNORECASE)
+
+
+def directives(path):
+    found = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            match = DIRECTIVE.match(line.strip())
+            if match:
+                found[match.group(1).lower()] = match.group(2)
+    return found
+
+
+def apex_run(path):
+    """Return (exit_code, result) shaped like the real command's JSON output"""
+    found = directives(path)
+    time.sleep(float(found.get("sleep") or 0))
+
+    result = {"success": True, "compiled": True, "compileProblem": "", "exceptionMessage": "",
+              "exceptionStackTrace": "", "line": -1, "column": -1,
+              "logs": f"Execute Anonymous: {os.path.basename(path)}\n"}
+    if "compile-error" in found:
+        result.update({"success": False, "compiled": False, "compileProblem": found["compile-error"], "line": 1, "column": 1})
+    elif "fail" in found:
+        result.update({"success": False, "exceptionMessage": found["fail"],
+                       "exceptionStackTrace": "AnonymousBlock: line 1, column 1"})
+    return (0 if result["success"] else 1), result
+
+
+def main(argv):
+    if argv[:2] != ["apex", "run"] or "--file" not in argv:
+        print(json.dumps({"status": 1, "message": f"fakeSfCli only supports 'apex run --file': {' '.join(argv)}"}))
+        return 1
+    path = argv[argv.index("--file") + 1]
+
+    start = time.time()
+    exit_code, result = apex_run(path)
+    log_file = os.environ.get("FAKE_SF_LOG")
+    if log_file:
+        with open(log_file, "a") as f:
+            f.write(json.dumps({"script": os.path.basename(path), "start": start, "end": time.time(),
+                                "success": result["success"]}) + "\n")
+
+    print(json.dumps({"status": exit_code, "result": result}))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
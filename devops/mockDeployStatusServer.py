@@ -0,0 +1,218 @@
+"""Local stand-in for the Salesforce deployRequest status endpoint.
+
+Replays recorded status sequences so quickDeployPoller.py can be exercised
+without an org:
+
+    python devops/mockDeployStatusServer.py recording.json --port 8787
+    SF_INSTANCE_URL=http://127.0.0.1:8787 SF_ACCESS_TOKEN=x \\
+        python devops/quickDeployPoller.py 0Af000000000001
+
+A recording is either a list of deployResult snapshots (used for every job id)
+or an object mapping job ids to such lists. Each status request returns the
+next snapshot of that job; the last one is repeated once the sequence ends.
+A snapshot of the form {"httpStatus": 503} answers that request with the
+status code instead. A PATCH with status Canceling cancels the job: later
+requests report it as Canceled.
+
+--check runs quickDeployPoller.py against the built-in SCENARIOS (success,
+fail-fast with cancel, timeout, transient errors, expired session) and exits
+with 1 if any outcome differs from the expected one:
+
+    python devops/mockDeployStatusServer.py --check
+"""
+import re
+import sys
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUS_PATH = re.compile(r"^/services/data/v[\d.]+/metadata/deployRequest/([A-Za-z0-9]+)")
+
+# Used when no recording is given: a small successful deploy with tests
+DEFAULT_SEQUENCE = [
+    {"status": "Pending", "done": False, "numberComponentsTotal": 0, "numberComponentsDeployed": 0},
+    {"status": "InProgress", "done": False, "numberComponentsTotal": 3, "numberComponentsDeployed": 1,
+     "numberTestsTotal": 4, "numberTestsCompleted": 0},
+    {"status": "InProgress", "done": False, "numberComponentsTotal": 3, "numberComponentsDeployed": 3,
+     "numberTestsTotal": 4, "numberTestsCompleted": 2},
+    {"status": "Succeeded", "done": True, "success": True, "numberComponentsTotal": 3,
+     "numberComponentsDeployed": 3, "numberComponentErrors": 0, "numberTestsTotal": 4,
+     "numberTestsCompleted": 4, "numberTestErrors": 0,
+     "details": {"componentFailures": [], "runTestResult": {"failures": [], "successes": []}}},
+]
+
+
+class DeployStatusReplay:
+    """Per-job cursor over recorded deployResult snapshots"""
+
+    def __init__(self, recording):
+        self.recording = recording
+        self.cursors = {}
+        self.requests = []
+        self.canceled = set()
+        self.lock = threading.Lock()
+
+    def sequence_for(self, job_id):
+        if isinstance(self.recording, dict):
+            return self.recording.get(job_id)
+        return self.recording
+
+    def next_status(self, job_id):
+        sequence = self.sequence_for(job_id)
+        if not sequence:
+            return None
+        with self.lock:
+            self.requests.append(job_id)
+            index = self.cursors.get(job_id, 0)
+            self.cursors[job_id] = index + 1
+        snapshot = dict(sequence[min(index, len(sequence) - 1)])
+        if job_id in self.canceled:
+            snapshot.update({"status": "Canceled", "done": True, "success": False})
+        snapshot.setdefault("id", job_id)
+        return {"id": job_id, "deployResult": snapshot}
+
+    def cancel(self, job_id):
+        if not self.sequence_for(job_id):
+            return False
+        with self.lock:
+            self.canceled.add(job_id)
+        return True
+
+
+def make_handler(replay):
+    class DeployStatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = STATUS_PATH.match(self.path)
+            if not match:
+                return self.send_json(404, [{"errorCode": "NOT_FOUND", "message": self.path}])
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                return self.send_json(401, [{"errorCode": "INVALID_SESSION_ID", "message": "Session expired or invalid"}])
+
+            status = replay.next_status(match.group(1))
+            if status is None:
+                return self.send_json(404, [{"errorCode": "INVALID_ID_FIELD", "message": match.group(1)}])
+            if "httpStatus" in status["deployResult"]:
+                return self.send_json(status["deployResult"]["httpStatus"], [{"errorCode": "REPLAYED_ERROR"}])
+            self.send_json(200, status)
+
+        def do_PATCH(self):
+            match = STATUS_PATH.match(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not match or body.get("deployResult", {}).get("status") != "Canceling":
+                return self.send_json(400, [{"errorCode": "INVALID_OPERATION", "message": self.path}])
+            if not replay.cancel(match.group(1)):
+                return self.send_json(404, [{"errorCode": "INVALID_ID_FIELD", "message": match.group(1)}])
+            self.send_json(202, {"id": match.group(1), "deployResult": {"status": "Canceling"}})
+
+        def send_json(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return DeployStatusHandler
+
+
+def start_server(recording=None, host="127.0.0.1", port=0):
+    """Start the stand-in in a background thread; returns (server, replay). Port 0 picks a free port."""
+    replay = DeployStatusReplay(recording or DEFAULT_SEQUENCE)
+    server = ThreadingHTTPServer((host, port), make_handler(replay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, replay
+
+
+def in_progress(deployed, total=3):
+    return {"status": "InProgress", "done": False, "numberComponentsTotal": total,
+            "numberComponentsDeployed": deployed, "numberComponentErrors": 0}
+
+
+# name: (job id, recording for it, expected poll outcome, expect a cancel request)
+SCENARIOS = {
+    "success": ("0Af000000000001", DEFAULT_SEQUENCE, "done", False),
+    "fail fast": ("0Af000000000002", [
+        in_progress(1),
+        {**in_progress(2), "numberComponentErrors": 1},
+    ], "failed_fast", True),
+    "timeout": ("0Af000000000003", [in_progress(1)], "timeout", True),
+    "transient errors": ("0Af000000000004", [
+        {"httpStatus": 503}, {"httpStatus": 500}, in_progress(2), DEFAULT_SEQUENCE[-1],
+    ], "done", False),
+    "expired session": ("0Af000000000005", [{"httpStatus": 401}], "unauthorized", False),
+}
+
+
+def run_checks():
+    """Poll every scenario on a simulated clock; returns the number of failed scenarios"""
+    import quickDeployPoller
+
+    recording = {job_id: sequence for job_id, sequence, _, _ in SCENARIOS.values()}
+    server, replay = start_server(recording)
+    instance_url = f"http://127.0.0.1:{server.server_port}"
+    failures = 0
+    try:
+        for name, (job_id, _, expected, cancels) in SCENARIOS.items():
+            clock, sleep = simulated_clock()
+            _, outcome = quickDeployPoller.poll_deploy(job_id, instance_url, "token", clock, sleep)
+            if outcome in ("failed_fast", "timeout"):
+                quickDeployPoller.cancel_deploy(job_id, instance_url, "token", clock, sleep)
+            ok = outcome == expected and (job_id in replay.canceled) == cancels
+            failures += not ok
+            print(f"{'PASS' if ok else 'FAIL'} {name}: outcome {outcome} (expected {expected}), "
+                  f"canceled {job_id in replay.canceled} (expected {cancels}), "
+                  f"{replay.requests.count(job_id)} status request(s)")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # A refused connection must back off like any other transient error, not crash the poller
+    _, outcome = quickDeployPoller.poll_deploy("0Af000000000006", instance_url, "token", *simulated_clock())
+    ok = outcome == "timeout"
+    failures += not ok
+    print(f"{'PASS' if ok else 'FAIL'} connection refused: outcome {outcome} (expected timeout)")
+    return failures
+
+
+def simulated_clock():
+    """(clock, sleep) where sleeping advances the clock instead of waiting"""
+    clock_time = [0.0]
+
+    def sleep(seconds):
+        clock_time[0] += max(seconds, 1)
+
+    return (lambda: clock_time[0]), sleep
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Salesforce deploy status sequences")
+    parser.add_argument("recording", nargs="?", help="JSON recording (defaults to a built-in successful deploy)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--check", action="store_true", help="run quickDeployPoller.py against SCENARIOS and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if run_checks() else 0)
+
+    recording = None
+    if args.recording:
+        with open(args.recording, "r") as f:
+            recording = json.load(f)
+
+    replay = DeployStatusReplay(recording or DEFAULT_SEQUENCE)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(replay))
+    print(f"Serving deploy status replay on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
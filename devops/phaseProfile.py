@@ -0,0 +1,151 @@
+"""Opt-in profiling for the devops scripts: named phase spans, cProfile and peak RSS.
+
+Call install() once at the top of a script, then time its phases with
+
+    with phaseProfile.span("fetch"):
+        ...
+
+or report a phase the caller already timed with record(name, seconds). The
+scripts share the phase names load, fetch, parse diff, match, render and
+submit, and add their own where none fits (cleanup, parse, write).
+
+Profiling is off unless the script is started with --profile (removed from
+sys.argv, so argparse and positional arguments are unaffected) or
+DEVOPS_PROFILE=true. DEVOPS_PROFILE=spans records spans and peak RSS without
+cProfile, whose overhead would skew throughput measurements (see
+replacerBenchmark.py). At exit $PROFILE_DIR (default .devops-profile/) receives:
+
+- <script>.pstats: cProfile of the main thread (`python -m pstats` or snakeviz)
+- <script>.json: wall time, peak RSS, the span table and the hottest functions
+
+and the span table is appended to $GITHUB_STEP_SUMMARY. Spans are flat: a
+span nested in another counts in both, and spans of worker threads add up to
+more than the wall time.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows runners
+    resource = None
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", ".devops-profile")
+FLAG = "--profile"
+TOP_FUNCTIONS = 25
+
+_spans = {}
+_lock = threading.Lock()
+_state = {"enabled": False, "script": None, "start": None, "profiler": None}
+
+
+def install(script_name=None):
+    """Start profiling when --profile or DEVOPS_PROFILE=true asks for it"""
+    requested = FLAG in sys.argv[1:]
+    if requested:
+        sys.argv[1:] = [arg for arg in sys.argv[1:] if arg != FLAG]
+    if _state["enabled"]:
+        return
+    mode = "true" if requested else os.environ.get("DEVOPS_PROFILE", "false").lower()
+    if mode not in ("true", "spans"):
+        return
+    _state.update({"enabled": True, "start": time.perf_counter(),
+                   "profiler": cProfile.Profile() if mode == "true" else None,
+                   "script": script_name or os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"})
+    if _state["profiler"]:
+        _state["profiler"].enable()
+    atexit.register(write_report)
+
+
+def record(name, seconds):
+    """Add one timed occurrence of a phase"""
+    if not _state["enabled"]:
+        return
+    with _lock:
+        stats = _spans.setdefault(name, {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+        stats["calls"] += 1
+        stats["total_s"] += seconds
+        stats["max_s"] = max(stats["max_s"], seconds)
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as one occurrence of phase name"""
+    if not _state["enabled"]:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    """The functions with the highest cumulative time"""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: -item[1][3])[:limit]
+    cwd = os.getcwd() + os.sep
+    return [{"function": f"{path[len(cwd):] if path.startswith(cwd) else path}:{line}({name})",
+             "calls": calls, "own_s": round(own, 4), "cumulative_s": round(cumulative, 4)}
+            for (path, line, name), (_, calls, own, cumulative, _) in rows]
+
+
+def summary_markdown(report):
+    rss = f"{report['peak_rss_mb']} MB" if report["peak_rss_mb"] is not None else "n/a"
+    lines = [
+        f"### ⏱️ Profile: `{report['script']}`",
+        "",
+        f"Wall time **{report['wall_s']:.2f}s**, peak RSS **{rss}**",
+        "",
+        "| Phase | Calls | Total (s) | Max (s) | Share of wall |",
+        "|-------|-------|-----------|---------|---------------|",
+    ]
+    for name, stats in sorted(report["spans"].items(), key=lambda item: -item[1]["total_s"]):
+        share = stats["total_s"] / report["wall_s"] * 100 if report["wall_s"] else 0
+        lines.append(f"| {name} | {stats['calls']} | {stats['total_s']:.3f} | {stats['max_s']:.3f} | {share:.0f}% |")
+    return "\n".join(lines) + "\n\n"
+
+
+def write_report():
+    """Write the pstats, the JSON report and the job summary table (registered with atexit by install())"""
+    profiler = _state["profiler"]
+    if profiler:
+        profiler.disable()
+    script = _state["script"]
+    with _lock:
+        spans = {name: {key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()}
+                 for name, stats in _spans.items()}
+    report = {"script": script, "wall_s": round(time.perf_counter() - _state["start"], 3),
+              "peak_rss_mb": peak_rss_mb(), "spans": spans, "top_functions": top_functions(profiler) if profiler else []}
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if profiler:
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"{script}.pstats"))
+        with open(os.path.join(PROFILE_DIR, f"{script}.json"), "w") as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        print(f"Could not write profile: {e}")
+
+    summary_file = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_file:
+        with open(summary_file, "a") as f:
+            f.write(summary_markdown(report))
+
+    print(f"⏱️ Profile: {report['wall_s']:.2f}s wall, peak RSS {report['peak_rss_mb']} MB"
+          + "".join(f", {name} {stats['total_s']:.2f}s" for name, stats in spans.items()))
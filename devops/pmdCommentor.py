@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import requests
 import time
@@ -7,239 +8,76 @@ import re
 from collections import defaultdict
 from rich.console import Console
 from rich.panel import Panel
+from scanResults import load_violations, expand_paths, ScanResultsError
+from diffManifest import load_manifest, fetch_pr_files, build_manifest, commentable_files, in_changed_hunks
+from runJournal import RunJournal, content_digest
+import apiTrace
+import devopsLog
+import phaseProfile
+
+apiTrace.install()
+phaseProfile.install()
 
 console = Console()
+log = devopsLog.get_logger("pmdCommentor")
 
-pr_number         = os.environ.get('PR_NUMBER')
 github_repository = os.environ.get('GITHUB_REPOSITORY')
 github_token      = os.environ.get('TOKEN_GITHUB')
-commit_id         = os.environ.get('COMMIT_ID')
-
-console.rule("[bold cyan]GitHub Context")
-console.print(f"[bold green]Repository:[/bold green] {github_repository}")
-console.print(f"[bold green]PR Number:[/bold green] {pr_number}")
-console.print(f"[bold green]Commit ID:[/bold green] {commit_id}")
-
-pmd_violations_file = "apexScanResults.json"
-
-# Load scan results
-try:
-    with open(pmd_violations_file, "r") as file:
-        scan_results = json.load(file)
-        violations = scan_results.get("violations", [])
-        console.print_json(data=scan_results)
-        console.print(f"[bold green]✅ Loaded {len(violations)} violation(s).[/bold green]")
-except (FileNotFoundError, json.JSONDecodeError) as e:
-    console.print(f"[bold red]❌ Error reading {pmd_violations_file}: {e}[/bold red]")
-    exit(1)
-
-# GraphQL endpoint
-graphql_url = "https://api.github.com/graphql"
+
+# GitHub endpoints (set by GitHub Actions, overridable for a local stand-in)
+api_url     = os.environ.get('GITHUB_API_URL', "https://api.github.com")
+graphql_url = os.environ.get('GITHUB_GRAPHQL_URL', f"{api_url}/graphql")
 headers = {
     "Authorization": f"Bearer {github_token}",
     "Content-Type": "application/json"
 }
 
-def execute_graphql_query(query, variables=None):
-    """Execute a GraphQL query/mutation"""
+def execute_graphql_query(query, variables=None, session=None, console=console):
+    """Execute a GraphQL query/mutation, over session when one is shared between PRs"""
     payload = {
         "query": query,
         "variables": variables or {}
     }
     
-    response = requests.post(graphql_url, json=payload, headers=headers)
+    response = (session or requests).post(graphql_url, json=payload, headers=headers)
     
     if response.status_code != 200:
         console.print(f"[red]❌ GraphQL request failed: {response.status_code}[/red]")
-        console.print_json(data=response.json())
+        log.warning("GraphQL response: %s", devopsLog.excerpt(response.text), extra={"category": "graphql"})
         return None
     
     result = response.json()
     if "errors" in result:
-        console.print("[red]❌ GraphQL errors:[/red]")
-        console.print_json(data=result["errors"])
+        console.print("[red]❌ GraphQL errors[/red]")
+        log.warning("GraphQL errors: %s", devopsLog.excerpt(result["errors"]), extra={"category": "graphql"})
         return None
     
     return result["data"]
 
-# Delete old PMD comments using GraphQL
-console.rule("[bold yellow]🧹 Cleaning up old PMD comments")
-
-# First, get PR node ID and existing comments
-get_pr_query = """
-query GetPRInfo($owner: String!, $name: String!, $number: Int!) {
-  repository(owner: $owner, name: $name) {
-    pullRequest(number: $number) {
-      id
-      headRefOid
-      baseRefOid
-      reviews(first: 100) {
-        nodes {
-          id
-          body
-          comments(first: 100) {
-            nodes {
-              id
-              body
-            }
-          }
-        }
+DELETE_MUTATIONS = {
+    "review": """
+    mutation DeleteReview($id: ID!) {
+      deleteReview(input: {reviewId: $id}) {
+        clientMutationId
       }
-      comments(first: 100) {
-        nodes {
-          id
-          body
-        }
+    }
+    """,
+    "comment": """
+    mutation DeleteComment($id: ID!) {
+      deletePullRequestReviewComment(input: {id: $id}) {
+        clientMutationId
       }
     }
-  }
-}
-"""
-
-owner, repo_name = github_repository.split('/')
-pr_data = execute_graphql_query(get_pr_query, {
-    "owner": owner,
-    "name": repo_name,
-    "number": int(pr_number)
-})
-
-if not pr_data:
-    console.print("[red]❌ Failed to get PR information[/red]")
-    exit(1)
-
-pr_node_id = pr_data["repository"]["pullRequest"]["id"]
-head_oid = pr_data["repository"]["pullRequest"]["headRefOid"]
-console.print(f"[bold green]PR Node ID:[/bold green] {pr_node_id}")
-console.print(f"[bold green]Head OID:[/bold green] {head_oid}")
-
-# Delete old PMD comments
-deleted_count = 0
-comments_to_delete = []
-
-# Check review comments
-for review in pr_data["repository"]["pullRequest"]["reviews"]["nodes"]:
-    if "🔍 **PMD Analysis**" in review.get("body", ""):
-        comments_to_delete.append(("review", review["id"]))
-    for comment in review["comments"]["nodes"]:
-        if "🔍 **PMD Analysis**" in comment.get("body", "") or "| Detail" in comment.get("body", ""):
-            comments_to_delete.append(("comment", comment["id"]))
-
-# Check PR comments
-for comment in pr_data["repository"]["pullRequest"]["comments"]["nodes"]:
-    if "🔍 **PMD Analysis**" in comment.get("body", "") or "| Detail" in comment.get("body", ""):
-        comments_to_delete.append(("issue_comment", comment["id"]))
-
-# Delete comments in batches using GraphQL mutations
-if comments_to_delete:
-    console.print(f"[yellow]Found {len(comments_to_delete)} old PMD comments to delete[/yellow]")
-    
-    for comment_type, comment_id in comments_to_delete:
-        if comment_type == "review":
-            delete_mutation = """
-            mutation DeleteReview($reviewId: ID!) {
-              deleteReview(input: {reviewId: $reviewId}) {
-                clientMutationId
-              }
-            }
-            """
-            result = execute_graphql_query(delete_mutation, {"reviewId": comment_id})
-        elif comment_type == "comment":
-            delete_mutation = """
-            mutation DeleteComment($commentId: ID!) {
-              deletePullRequestReviewComment(input: {id: $commentId}) {
-                clientMutationId
-              }
-            }
-            """
-            result = execute_graphql_query(delete_mutation, {"commentId": comment_id})
-        elif comment_type == "issue_comment":
-            delete_mutation = """
-            mutation DeleteIssueComment($commentId: ID!) {
-              deleteIssueComment(input: {id: $commentId}) {
-                clientMutationId
-              }
-            }
-            """
-            result = execute_graphql_query(delete_mutation, {"commentId": comment_id})
-        
-        if result:
-            deleted_count += 1
-        time.sleep(0.5)  # Small delay between deletions
-
-console.print(f"[bold green]✅ Deleted {deleted_count} old PMD comment(s).[/bold green]")
-
-# Get PR files using REST API (GraphQL doesn't provide patch data)
-console.rule("[bold cyan]🗂️ Getting PR Files")
-
-pr_files_url = f"https://api.github.com/repos/{github_repository}/pulls/{pr_number}/files"
-pr_files_headers = {
-    "Authorization": f"Bearer {github_token}",
-    "Accept": "application/vnd.github.v3+json"
+    """,
+    "issue_comment": """
+    mutation DeleteIssueComment($id: ID!) {
+      deleteIssueComment(input: {id: $id}) {
+        clientMutationId
+      }
+    }
+    """,
 }
 
-pr_files_response = requests.get(pr_files_url, headers=pr_files_headers)
-if pr_files_response.status_code != 200:
-    console.print(f"[red]❌ Failed to get PR files: {pr_files_response.status_code}[/red]")
-    console.print_json(data=pr_files_response.json())
-    exit(1)
-
-pr_files = pr_files_response.json()
-console.print(f"[bold green]✅ Found {len(pr_files)} changed files in PR[/bold green]")
-
-# Build file mapping with line numbers that can accept comments
-changed_files = {}
-for file_data in pr_files:
-    filename = file_data['filename']  # REST API uses 'filename' not 'path'
-    # Only process files that have changes (not just renamed/moved)
-    if file_data['status'] in ['added', 'modified'] and file_data.get('patch'):
-        changed_files[filename] = {
-            'patch': file_data['patch'],
-            'valid_lines': set()
-        }
-        
-# Build file mapping with line numbers and their diff positions
-changed_files = {}
-for file_data in pr_files:
-    filename = file_data['filename']  # REST API uses 'filename' not 'path'
-    # Only process files that have changes (not just renamed/moved)
-    if file_data['status'] in ['added', 'modified'] and file_data.get('patch'):
-        changed_files[filename] = {
-            'patch': file_data['patch'],
-            'valid_lines': set(),
-            'line_to_position': {}  # Maps line number to diff position
-        }
-        
-        # Parse patch to find lines that can receive comments and their positions
-        patch_lines = file_data['patch'].split('\n')
-        current_line = 0
-        diff_position = 0
-        
-        for patch_line in patch_lines:
-            if patch_line.startswith('@@'):
-                # Parse hunk header: @@ -old_start,old_count +new_start,new_count @@
-                match = re.match(r'@@\s+-\d+(?:,\d+)?\s+\+(\d+)(?:,\d+)?\s+@@', patch_line)
-                if match:
-                    current_line = int(match.group(1))
-                # Hunk headers don't count as diff positions for comments
-            elif patch_line.startswith('+') and not patch_line.startswith('+++'):
-                # This is a new line that can receive comments
-                diff_position += 1
-                changed_files[filename]['valid_lines'].add(current_line)
-                changed_files[filename]['line_to_position'][current_line] = diff_position
-                current_line += 1
-            elif patch_line.startswith(' '):
-                # Context line
-                diff_position += 1
-                changed_files[filename]['valid_lines'].add(current_line)
-                changed_files[filename]['line_to_position'][current_line] = diff_position
-                current_line += 1
-            elif patch_line.startswith('-'):
-                # Deleted line - contributes to diff position but not to new line numbers
-                diff_position += 1
-            # Other lines (like file headers) don't affect position or line numbers
-
-console.print(f"[bold green]✅ Processed {len(changed_files)} files with changes[/bold green]")
-
 def normalize_file_path(raw_file_path):
     """Normalize file path to match PR files"""
     if "changed-sources/" in raw_file_path:
@@ -278,245 +116,593 @@ def find_matching_file(file_path, available_files):
             
     return None
 
-# Prepare inline comments for GraphQL review
-console.rule("[bold cyan]🛠️ Preparing Inline Comments")
-review_comments = []
-overflow_comments = []
-MAX_INLINE = 20
+# Aggregate repetitive findings: one comment per (rule, file, message template)
+AGGREGATE_MIN_GROUP = int(os.environ.get('PMD_AGGREGATE_MIN_GROUP', 3))    # 0 disables aggregation
+AGGREGATE_MAX_LINES = int(os.environ.get('PMD_AGGREGATE_MAX_LINES', 100))  # lines listed per group
 
-for i, v in enumerate(violations):
-    console.print(f"[dim]Processing violation {i+1}/{len(violations)}[/dim]")
-    
-    primary_index = v.get("primaryLocationIndex", 0)
-    locs = v.get("locations", [])
-    if primary_index >= len(locs):
-        console.print(f"[yellow]Violation {i+1}: Invalid primary location index[/yellow]")
-        overflow_comments.append(v)
-        continue
-    
-    loc = locs[primary_index]
-    raw_file = loc.get("file", "")
-    
-    # Find the matching file in our PR files
-    matched_file = find_matching_file(raw_file, changed_files.keys())
-    if not matched_file:
-        console.print(f"[yellow]Violation {i+1}: No matching PR file for {raw_file}[/yellow]")
-        overflow_comments.append(v)
-        continue
-    
+def message_template(message):
+    """Replace the variable parts of a message (quoted names, numbers) so similar messages group together"""
+    template = re.sub(r"'[^']*'|\"[^\"]*\"|`[^`]*`", "…", str(message))
+    return re.sub(r"\b\d+(?:\.\d+)?\b", "#", template)
+
+def violation_line(loc):
     line = loc.get("startLine")
     if not isinstance(line, int) or line < 1:
         line = loc.get("line", 1)
         if not isinstance(line, int) or line < 1:
             line = 1
-    
-    # Check if this line can receive comments
-    valid_lines = changed_files[matched_file]['valid_lines']
-    if line not in valid_lines:
-        console.print(f"[yellow]Violation {i+1}: Line {line} not in valid lines for {matched_file}[/yellow]")
-        overflow_comments.append(v)
-        continue
-    
-    console.print(f"[green]Violation {i+1}: Found valid line {line} for {matched_file}[/green]")
-    
-    # Extract violation details
-    message = v.get("message", "No message provided").replace("|", "\\|")
-    rule = v.get("rule", "Unknown Rule")
-    engine = v.get("engine", "Unknown Engine")
-    severity = v.get("severity", "Unknown Severity")
-    url = v.get("resources", [""])[0] if v.get("resources") else ""
-    
-    # Make rule name a hyperlink if URL is available
-    rule_display = f"[{rule}]({url})" if url else rule
-    
-    markdown_table = (
-        "| Detail   | Value |\n"
-        "|----------|-------|\n"
-        f"| Rule     | {rule_display} |\n"
-        f"| Engine   | {engine} |\n"
-        f"| Severity | {severity} |\n"
-        f"| Message  | {message} |"
-    )
-    
-    # Map line to diff position for GraphQL
-    position = changed_files[matched_file]['line_to_position'][line]
-    comment_data = {
-        "path": matched_file,
-        "line": line,
-        "position": position,  # <-- FIX: add position for GraphQL
-        "body": f"🔍 **PMD Analysis**\n\n{markdown_table}"
-    }
-    
-    review_comments.append(comment_data)
-
-# Limit to 20 comments for GraphQL review
-if len(review_comments) > MAX_INLINE:
-    overflow_from_limit = review_comments[MAX_INLINE:]
-    review_comments = review_comments[:MAX_INLINE]
-    
-    # Convert excess comments to overflow format
-    for comment in overflow_from_limit:
-        overflow_comments.append({
-            "type": "inline_overflow",
-            "comment": comment
+    return line
+
+def format_line_ranges(lines, limit=AGGREGATE_MAX_LINES):
+    """Collapse sorted line numbers into '3-7, 12, 40-41', listing at most limit lines"""
+    shown = lines[:limit] if limit > 0 else lines
+    ranges = []
+    start = prev = shown[0]
+    for line in shown[1:]:
+        if line == prev + 1:
+            prev = line
+            continue
+        ranges.append(f"{start}-{prev}" if prev != start else str(start))
+        start = prev = line
+    ranges.append(f"{start}-{prev}" if prev != start else str(start))
+    label = ", ".join(ranges)
+    if len(lines) > len(shown):
+        label += f" … (+{len(lines) - len(shown)} more lines)"
+    return label
+
+def aggregate_violations(violations, min_group=AGGREGATE_MIN_GROUP):
+    """Group violations by (rule, file, message template).
+
+    Groups of at least min_group hits become a single violation carrying the
+    sorted 'aggregatedLines'; everything else is returned unchanged, in order.
+    """
+    if min_group <= 0:
+        return list(violations)
+
+    groups = defaultdict(list)
+    order = []
+    for v in violations:
+        locs = v.get("locations", [])
+        primary_index = v.get("primaryLocationIndex", 0)
+        if primary_index >= len(locs):
+            order.append(("single", v))
+            continue
+        loc = locs[primary_index]
+        key = (v.get("rule"), normalize_file_path(loc.get("file", "")), message_template(v.get("message", "")))
+        if key not in groups:
+            order.append(("group", key))
+        groups[key].append(v)
+
+    aggregated = []
+    for kind, item in order:
+        if kind == "single":
+            aggregated.append(item)
+            continue
+        members = groups[item]
+        if len(members) < min_group:
+            aggregated.extend(members)
+            continue
+        first = members[0]
+        messages = {m.get("message") for m in members}
+        lines = sorted({violation_line(m["locations"][m.get("primaryLocationIndex", 0)]) for m in members})
+        aggregated.append({
+            **first,
+            "message": first.get("message") if len(messages) == 1 else item[2],
+            "aggregatedLines": lines,
+            "aggregatedCount": len(members),
         })
+    return aggregated
+
+def filter_to_changed_hunks(violations, changed_files):
+    """Drop violations whose primary location is not inside a changed hunk of the PR"""
+    kept = []
+    for v in violations:
+        locs = v.get("locations", [])
+        primary_index = v.get("primaryLocationIndex", 0)
+        if primary_index >= len(locs):
+            continue
+        loc = locs[primary_index]
+        matched_file = find_matching_file(loc.get("file", ""), changed_files.keys())
+        if matched_file and in_changed_hunks(changed_files[matched_file]['hunks'], violation_line(loc)):
+            kept.append(v)
+    return kept
 
-console.print(Panel.fit(f"[bold yellow]💬 Prepared {len(review_comments)} inline comment(s), {len(overflow_comments)} overflow."))
-
-# Post review with all inline comments using GraphQL
-console.rule("[bold green]🚀 Submitting Review with Inline Comments")
-if review_comments:
-    create_review_mutation = """
-    mutation CreateReview($pullRequestId: ID!, $commitOID: GitObjectID!, $body: String!, $comments: [DraftPullRequestReviewComment!]!) {
-      addPullRequestReview(input: {
-        pullRequestId: $pullRequestId,
-        commitOID: $commitOID,
-        body: $body,
-        event: COMMENT,
-        comments: $comments
-      }) {
-        pullRequestReview {
-          id
-          createdAt
-          comments(first: 100) {
-            totalCount
-            nodes {
+MAX_INLINE = 20
+
+def comment_on_pr(pr_number, commit_id, violations, repository=None, session=None, console=console):
+    """Replace the PMD review and overflow comment of one PR.
+
+    violations is not modified, so one parsed result set can serve several PRs.
+    Returns a dict with the counts, the time spent per phase and 'error' when
+    the run had to stop.
+    """
+    repository = repository or github_repository
+    timings = {}
+    phase_start = time.perf_counter()
+    deleted_count = 0
+    review_comments, overflow_comments = [], []
+    posted_ok = True
+
+    def graphql(query, variables=None):
+        return execute_graphql_query(query, variables, session, console)
+
+    def end_phase(name):
+        """Close the running phase; a phase that recurs accumulates its time"""
+        nonlocal phase_start
+        now = time.perf_counter()
+        timings[name] = round(timings.get(name, 0) + now - phase_start, 3)
+        phaseProfile.record(name, now - phase_start)
+        phase_start = now
+
+    def result_of(error=None):
+        return {"pr": pr_number, "commit": commit_id, "ok": posted_ok and not error, "error": error,
+                "violations": len(violations), "deleted": deleted_count, "inline": len(review_comments),
+                "overflow": len(overflow_comments), "timings": timings}
+
+    def delete_node(comment_type, node_id):
+        """Delete a review or comment and checkpoint it; returns True on success"""
+        result = graphql(DELETE_MUTATIONS[comment_type], {"id": node_id})
+        if result:
+            journal.mark_deleted(node_id)
+        return bool(result)
+
+    # Checkpoints of this PR and head commit: a retried run skips the work an aborted one finished
+    journal = RunJournal("pmdCommentor", pr_number, commit_id)
+    if journal.resumed:
+        console.print(f"[bold yellow]♻️ Resuming from checkpoint {journal.path}[/bold yellow]")
+
+    # Delete old PMD comments using GraphQL
+    console.rule("[bold yellow]🧹 Cleaning up old PMD comments")
+
+    owner, repo_name = repository.split('/')
+    deleted_count = 0
+
+    if journal.get("cleanup_done"):
+        pr_node_id = journal.get("pr_node_id")
+        head_oid = journal.get("head_oid")
+        console.print("[dim]Old PMD comments were already cleaned up for this commit[/dim]")
+    else:
+        # First, get PR node ID and existing comments
+        get_pr_query = """
+        query GetPRInfo($owner: String!, $name: String!, $number: Int!) {
+          rateLimit { cost remaining }
+          repository(owner: $owner, name: $name) {
+            pullRequest(number: $number) {
               id
-              path
-              line
+              headRefOid
+              baseRefOid
+              reviews(first: 100) {
+                nodes {
+                  id
+                  body
+                  comments(first: 100) {
+                    nodes {
+                      id
+                      body
+                    }
+                  }
+                }
+              }
+              comments(first: 100) {
+                nodes {
+                  id
+                  body
+                }
+              }
             }
           }
         }
-      }
-    }
-    """
-    
-    # Convert comments to GraphQL format
-    graphql_comments = []
-    for comment in review_comments:
-        graphql_comments.append({
-            "path": comment["path"],
-            "position": comment["position"],  # Use position for GraphQL
-            "body": comment["body"]
+        """
+
+        pr_data = graphql(get_pr_query, {
+            "owner": owner,
+            "name": repo_name,
+            "number": int(pr_number)
         })
+
+        if not pr_data:
+            console.print("[red]❌ Failed to get PR information[/red]")
+            return result_of("Failed to get PR information")
+
+        pr_node_id = pr_data["repository"]["pullRequest"]["id"]
+        head_oid = pr_data["repository"]["pullRequest"]["headRefOid"]
+        journal.set("pr_node_id", pr_node_id)
+        journal.set("head_oid", head_oid)
+        end_phase("fetch")
+
+        # Delete old PMD comments
+        comments_to_delete = []
+
+        # Check review comments
+        for review in pr_data["repository"]["pullRequest"]["reviews"]["nodes"]:
+            if "🔍 **PMD Analysis**" in review.get("body", ""):
+                comments_to_delete.append(("review", review["id"]))
+            for comment in review["comments"]["nodes"]:
+                if "🔍 **PMD Analysis**" in comment.get("body", "") or "| Detail" in comment.get("body", ""):
+                    comments_to_delete.append(("comment", comment["id"]))
+
+        # Check PR comments
+        for comment in pr_data["repository"]["pullRequest"]["comments"]["nodes"]:
+            if "🔍 **PMD Analysis**" in comment.get("body", "") or "| Detail" in comment.get("body", ""):
+                comments_to_delete.append(("issue_comment", comment["id"]))
+
+        # What an earlier attempt already deleted or posted for this commit stays as it is
+        comments_to_delete = [(comment_type, comment_id) for comment_type, comment_id in comments_to_delete
+                              if not journal.is_deleted(comment_id) and comment_id not in journal.posted_ids()]
+
+        # Delete comments one by one using GraphQL mutations
+        if comments_to_delete:
+            console.print(f"[yellow]Found {len(comments_to_delete)} old PMD comments to delete[/yellow]")
+
+            for comment_type, comment_id in comments_to_delete:
+                if delete_node(comment_type, comment_id):
+                    deleted_count += 1
+                time.sleep(0.5)  # Small delay between deletions
+
+        # Failed deletions are looked up again by the next attempt
+        if deleted_count == len(comments_to_delete):
+            journal.set("cleanup_done", True)
+
+    console.print(f"[bold green]PR Node ID:[/bold green] {pr_node_id}")
+    console.print(f"[bold green]Head OID:[/bold green] {head_oid}")
+    console.print(f"[bold green]✅ Deleted {deleted_count} old PMD comment(s).[/bold green]")
+
+    end_phase("cleanup")
+
+    # Get PR files: the manifest from diffManifest.py if an earlier step wrote one, else the REST API
+    # (GraphQL doesn't provide patch data)
+    console.rule("[bold cyan]🗂️ Getting PR Files")
+
+    diff_manifest_file = os.environ.get('PMD_DIFF_MANIFEST', "pr-diff-manifest.json")
+    manifest = load_manifest(diff_manifest_file)
+    if manifest and str(manifest.get("pr")) == str(pr_number) and manifest.get("head_sha") in (None, commit_id):
+        console.print(f"[bold green]✅ Using diff manifest {diff_manifest_file}[/bold green]")
+    else:
+        try:
+            pr_files = fetch_pr_files(repository, pr_number, github_token, api_url=api_url, session=session)
+        except (RuntimeError, requests.RequestException) as e:
+            console.print(f"[red]❌ {e}[/red]")
+            return result_of(str(e))
+        end_phase("fetch")
+        manifest = build_manifest(pr_files, pr_number, commit_id)
+
+    console.print(f"[bold green]✅ Found {len(manifest['files'])} changed files in PR[/bold green]")
+
+    # File mapping with line numbers that can accept comments and their diff positions
+    changed_files = commentable_files(manifest)
+    console.print(f"[bold green]✅ Processed {len(changed_files)} files with changes[/bold green]")
+
+    end_phase("parse diff")
+
+    # Findings outside the diff go to the overflow table by default; 'drop' discards them before rendering
+    if os.environ.get('PMD_OUT_OF_DIFF', "overflow").lower() == "drop":
+        in_diff = filter_to_changed_hunks(violations, changed_files)
+        console.print(f"[bold cyan]✂️ Dropped {len(violations) - len(in_diff)} violation(s) outside the changed hunks[/bold cyan]")
+        violations = in_diff
+
+    if AGGREGATE_MIN_GROUP > 0:
+        raw_count = len(violations)
+        violations = aggregate_violations(violations)
+        if len(violations) < raw_count:
+            console.print(Panel.fit(f"[bold cyan]🧮 Aggregated {raw_count} violation(s) into {len(violations)} finding(s) "
+                                    f"(groups of {AGGREGATE_MIN_GROUP}+ by rule, file and message)"))
+
+    # Prepare inline comments for GraphQL review
+    console.rule("[bold cyan]🛠️ Preparing Inline Comments")
+
+    # One record per violation: sampled under the "violation" category instead of printed
+    violation_log = {"category": "violation", "pr": pr_number}
+    for i, v in enumerate(violations):
+        primary_index = v.get("primaryLocationIndex", 0)
+        locs = v.get("locations", [])
+        if primary_index >= len(locs):
+            log.info("Violation %d/%d: invalid primary location index", i + 1, len(violations), extra=violation_log)
+            overflow_comments.append(v)
+            continue
+    
+        loc = locs[primary_index]
+        raw_file = loc.get("file", "")
+    
+        # Find the matching file in our PR files
+        matched_file = find_matching_file(raw_file, changed_files.keys())
+        if not matched_file:
+            log.info("Violation %d/%d: no matching PR file for %s", i + 1, len(violations), raw_file,
+                     extra=violation_log)
+            overflow_comments.append(v)
+            continue
+    
+        line = violation_line(loc)
+    
+        # Check if this line can receive comments
+        valid_lines = changed_files[matched_file]['valid_lines']
+        aggregated_lines = v.get("aggregatedLines")
+        if aggregated_lines:
+            # Anchor the group comment on its first commentable line
+            line = next((l for l in aggregated_lines if l in valid_lines), aggregated_lines[0])
+        if line not in valid_lines:
+            log.info("Violation %d/%d: line %d not in valid lines for %s", i + 1, len(violations), line, matched_file,
+                     extra=violation_log)
+            overflow_comments.append(v)
+            continue
+    
+        log.debug("Violation %d/%d: valid line %d for %s", i + 1, len(violations), line, matched_file,
+                  extra=violation_log)
+    
+        # Extract violation details
+        message = v.get("message", "No message provided").replace("|", "\\|")
+        rule = v.get("rule", "Unknown Rule")
+        engine = v.get("engine", "Unknown Engine")
+        severity = v.get("severity", "Unknown Severity")
+        url = v.get("resources", [""])[0] if v.get("resources") else ""
+    
+        # Make rule name a hyperlink if URL is available
+        rule_display = f"[{rule}]({url})" if url else rule
+    
+        markdown_table = (
+            "| Detail   | Value |\n"
+            "|----------|-------|\n"
+            f"| Rule     | {rule_display} |\n"
+            f"| Engine   | {engine} |\n"
+            f"| Severity | {severity} |\n"
+            f"| Message  | {message} |"
+        )
+        if aggregated_lines:
+            markdown_table += (
+                f"\n| Hits     | {v['aggregatedCount']} |\n\n"
+                f"<details><summary>All {len(aggregated_lines)} line(s) in this file</summary>\n\n"
+                f"{format_line_ranges(aggregated_lines)}\n\n</details>"
+            )
+    
+        # Map line to diff position for GraphQL
+        position = changed_files[matched_file]['line_to_position'][line]
+        comment_data = {
+            "path": matched_file,
+            "line": line,
+            "position": position,  # <-- FIX: add position for GraphQL
+            "body": f"🔍 **PMD Analysis**\n\n{markdown_table}"
+        }
+        if aggregated_lines:
+            comment_data["lines_label"] = format_line_ranges(aggregated_lines)
+    
+        review_comments.append(comment_data)
+
+    # Limit to 20 comments for GraphQL review
+    if len(review_comments) > MAX_INLINE:
+        overflow_from_limit = review_comments[MAX_INLINE:]
+        review_comments = review_comments[:MAX_INLINE]
+    
+        # Convert excess comments to overflow format
+        for comment in overflow_from_limit:
+            overflow_comments.append({
+                "type": "inline_overflow",
+                "comment": comment
+            })
+
+    console.print(Panel.fit(f"[bold yellow]💬 Prepared {len(review_comments)} inline comment(s), {len(overflow_comments)} overflow."))
+    end_phase("match")
+
+    # Post review with all inline comments using GraphQL
+    console.rule("[bold green]🚀 Submitting Review with Inline Comments")
+    if review_comments:
+        create_review_mutation = """
+        mutation CreateReview($pullRequestId: ID!, $commitOID: GitObjectID!, $body: String!, $comments: [DraftPullRequestReviewComment!]!) {
+          addPullRequestReview(input: {
+            pullRequestId: $pullRequestId,
+            commitOID: $commitOID,
+            body: $body,
+            event: COMMENT,
+            comments: $comments
+          }) {
+            pullRequestReview {
+              id
+              createdAt
+              comments(first: 100) {
+                totalCount
+                nodes {
+                  id
+                  path
+                  line
+                }
+              }
+            }
+          }
+        }
+        """
+    
+        # Convert comments to GraphQL format
+        graphql_comments = []
+        for comment in review_comments:
+            graphql_comments.append({
+                "path": comment["path"],
+                "position": comment["position"],  # Use position for GraphQL
+                "body": comment["body"]
+            })
+    
+        review_body = f"🔍 **PMD Analysis Results**\n\nFound {len(review_comments)} code quality issues in this PR."
+        if overflow_comments:
+            review_body += f" {len(overflow_comments)} additional violations are listed in the summary comment below."
+    
+        variables = {
+            "pullRequestId": pr_node_id,
+            "commitOID": head_oid,
+            "body": review_body,
+            "comments": graphql_comments
+        }
     
-    review_body = f"🔍 **PMD Analysis Results**\n\nFound {len(review_comments)} code quality issues in this PR."
+        review_digest = content_digest(review_body, graphql_comments)
+        previous = journal.posted("review")
+        if previous and previous["digest"] == review_digest:
+            console.print(f"[bold green]✅ Review already submitted by an earlier attempt ({previous['id']})[/bold green]")
+        else:
+            if previous:
+                # Same commit, different findings: replace the review an earlier attempt posted
+                delete_node("review", previous["id"])
+            console.print(f"[dim]Creating review with {len(graphql_comments)} inline comments[/dim]")
+
+            result = graphql(create_review_mutation, variables)
+
+            if result and result.get("addPullRequestReview"):
+                review_data = result["addPullRequestReview"]["pullRequestReview"]
+                comment_count = review_data["comments"]["totalCount"]
+                journal.record_post("review", review_digest, review_data["id"])
+                console.print(f"[bold green]✅ Successfully created review with {comment_count} inline comments![/bold green]")
+                console.print(f"[dim]Review ID: {review_data['id']}[/dim]")
+            else:
+                console.print("[bold red]❌ Failed to create review with inline comments[/bold red]")
+                posted_ok = False
+
+                # Fallback: Add comments individually (but this defeats the purpose)
+                console.print("[yellow]⚠️ Consider using REST API fallback if needed[/yellow]")
+    elif journal.posted("review"):
+        # Nothing inline any more: remove the review an earlier attempt posted for this commit
+        delete_node("review", journal.posted("review")["id"])
+        journal.forget_post("review")
+    end_phase("submit")
+
+    # Post overflow comments as summary
     if overflow_comments:
-        review_body += f" {len(overflow_comments)} additional violations are listed in the summary comment below."
-    
-    variables = {
-        "pullRequestId": pr_node_id,
-        "commitOID": head_oid,
-        "body": review_body,
-        "comments": graphql_comments
-    }
-    
-    console.print(f"[dim]Creating review with {len(graphql_comments)} inline comments[/dim]")
-    
-    result = execute_graphql_query(create_review_mutation, variables)
-    
-    if result and result.get("addPullRequestReview"):
-        review_data = result["addPullRequestReview"]["pullRequestReview"]
-        comment_count = review_data["comments"]["totalCount"]
-        console.print(f"[bold green]✅ Successfully created review with {comment_count} inline comments![/bold green]")
-        console.print(f"[dim]Review ID: {review_data['id']}[/dim]")
-    else:
-        console.print("[bold red]❌ Failed to create review with inline comments[/bold red]")
-        
-        # Fallback: Add comments individually (but this defeats the purpose)
-        console.print("[yellow]⚠️ Consider using REST API fallback if needed[/yellow]")
-
-# Post overflow comments as summary
-if overflow_comments:
-    console.rule("[bold magenta]🗄️ Posting Overflow as Summary Comment")
-    
-    # Create issue comment using GraphQL
-    create_comment_mutation = """
-    mutation CreateIssueComment($subjectId: ID!, $body: String!) {
-      addComment(input: {
-        subjectId: $subjectId,
-        body: $body
-      }) {
-        commentEdge {
-          node {
-            id
-            createdAt
+        console.rule("[bold magenta]🗄️ Posting Overflow as Summary Comment")
+    
+        # Create issue comment using GraphQL
+        create_comment_mutation = """
+        mutation CreateIssueComment($subjectId: ID!, $body: String!) {
+          addComment(input: {
+            subjectId: $subjectId,
+            body: $body
+          }) {
+            commentEdge {
+              node {
+                id
+                createdAt
+              }
+            }
           }
         }
-      }
-    }
-    """
+        """
     
-    header = "| File | Line | Rule | Severity | Message |\n|------|------|----------|----------|----------|\n"
-    body_rows = []
+        header = "| File | Line | Rule | Severity | Message |\n|------|------|----------|----------|----------|\n"
+        body_rows = []
     
-    for v in overflow_comments:
-        # Handle both regular violations and inline overflow comments
-        if v.get("type") == "inline_overflow":
-            comment_data = v["comment"]
-            file_path = comment_data["path"]
+        for v in overflow_comments:
+            # Handle both regular violations and inline overflow comments
+            if v.get("type") == "inline_overflow":
+                comment_data = v["comment"]
+                file_path = comment_data["path"]
             
-            # Use the stored line number for display
-            line_no = comment_data.get("line", "?")
+                # Use the stored line number (or collapsed line list) for display
+                line_no = comment_data.get("lines_label", comment_data.get("line", "?"))
             
-            # Extract from comment body
-            body = comment_data["body"]
-            rule_match = re.search(r'\| Rule\s+\| ([^|]+) \|', body)
-            severity_match = re.search(r'\| Severity \| ([^|]+) \|', body)
-            message_match = re.search(r'\| Message\s+\| ([^|]+) \|', body)
+                # Extract from comment body
+                body = comment_data["body"]
+                rule_match = re.search(r'\| Rule\s+\| ([^|]+) \|', body)
+                severity_match = re.search(r'\| Severity \| ([^|]+) \|', body)
+                message_match = re.search(r'\| Message\s+\| ([^|]+) \|', body)
             
-            rule = rule_match.group(1).strip() if rule_match else "Unknown Rule"
-            severity = severity_match.group(1).strip() if severity_match else "Unknown Severity"
-            message = message_match.group(1).strip() if message_match else "No message"
+                rule = rule_match.group(1).strip() if rule_match else "Unknown Rule"
+                severity = severity_match.group(1).strip() if severity_match else "Unknown Severity"
+                message = message_match.group(1).strip() if message_match else "No message"
             
-            body_rows.append(f"| `{file_path}` | {line_no} | {rule} | {severity} | {message} |")
-        else:
-            # Regular violation
-            locs = v.get("locations", [])
-            loc = locs[v.get("primaryLocationIndex", 0)] if locs else {}
-            file_path = normalize_file_path(loc.get("file", "Unknown"))
-            line_no = loc.get("startLine", "?")
+                body_rows.append(f"| `{file_path}` | {line_no} | {rule} | {severity} | {message} |")
+            else:
+                # Regular violation
+                locs = v.get("locations", [])
+                loc = locs[v.get("primaryLocationIndex", 0)] if locs else {}
+                file_path = normalize_file_path(loc.get("file", "Unknown"))
+                line_no = loc.get("startLine", "?")
+                if v.get("aggregatedLines"):
+                    line_no = format_line_ranges(v["aggregatedLines"])
             
-            rule = v.get("rule", "Unknown Rule")
-            severity = v.get("severity", "Unknown Severity")
-            message = v.get("message", "No message provided")
-            url = v.get("resources", [""])[0] if v.get("resources") else ""
+                rule = v.get("rule", "Unknown Rule")
+                severity = v.get("severity", "Unknown Severity")
+                message = v.get("message", "No message provided")
+                url = v.get("resources", [""])[0] if v.get("resources") else ""
             
-            rule_display = f"[{rule}]({url})" if url else rule
-            message = str(message).replace("|", "\\|").replace("\n", " ")
-            if len(message) > 100:
-                message = message[:97] + "..."
+                rule_display = f"[{rule}]({url})" if url else rule
+                message = str(message).replace("|", "\\|").replace("\n", " ")
+                if len(message) > 100:
+                    message = message[:97] + "..."
             
-            body_rows.append(f"| `{file_path}` | {line_no} | {rule_display} | {severity} | {message} |")
-    
-    overflow_table = header + "\n".join(body_rows)
+                body_rows.append(f"| `{file_path}` | {line_no} | {rule_display} | {severity} | {message} |")
     
-    # Count different types of overflow
-    regular_overflow = len([v for v in overflow_comments if v.get("type") != "inline_overflow"])
-    limit_overflow = len([v for v in overflow_comments if v.get("type") == "inline_overflow"])
+        overflow_table = header + "\n".join(body_rows)
     
-    overflow_title = "⚠️ **PMD Analysis Results**"
-    if regular_overflow > 0 and limit_overflow > 0:
-        overflow_title += f" ({regular_overflow} not mapped to changes, {limit_overflow} over {MAX_INLINE} comment limit)"
-    elif regular_overflow > 0:
-        overflow_title += f" ({regular_overflow} violations not mapped to changed lines)"
-    elif limit_overflow > 0:
-        overflow_title += f" ({limit_overflow} violations over {MAX_INLINE} comment limit)"
+        # Count different types of overflow
+        regular_overflow = len([v for v in overflow_comments if v.get("type") != "inline_overflow"])
+        limit_overflow = len([v for v in overflow_comments if v.get("type") == "inline_overflow"])
     
-    comment_body = f"{overflow_title}\n\nThe following violations could not be posted as inline comments:\n\n{overflow_table}"
+        overflow_title = "⚠️ **PMD Analysis Results**"
+        if regular_overflow > 0 and limit_overflow > 0:
+            overflow_title += f" ({regular_overflow} not mapped to changes, {limit_overflow} over {MAX_INLINE} comment limit)"
+        elif regular_overflow > 0:
+            overflow_title += f" ({regular_overflow} violations not mapped to changed lines)"
+        elif limit_overflow > 0:
+            overflow_title += f" ({limit_overflow} violations over {MAX_INLINE} comment limit)"
     
-    variables = {
-        "subjectId": pr_node_id,
-        "body": comment_body
-    }
+        comment_body = f"{overflow_title}\n\nThe following violations could not be posted as inline comments:\n\n{overflow_table}"
     
-    result = execute_graphql_query(create_comment_mutation, variables)
+        variables = {
+            "subjectId": pr_node_id,
+            "body": comment_body
+        }
+        end_phase("render")
     
-    if result and result.get("addComment"):
-        comment_id = result["addComment"]["commentEdge"]["node"]["id"]
-        console.print(f"[bold green]✅ Posted overflow summary comment![/bold green]")
-        console.print(f"[dim]Comment ID: {comment_id}[/dim]")
-    else:
-        console.print("[bold red]❌ Failed to post overflow summary comment[/bold red]")
-
-console.rule("[bold cyan]🏁 Done")
\ No newline at end of file
+        overflow_digest = content_digest(comment_body)
+        previous = journal.posted("overflow")
+        if previous and previous["digest"] == overflow_digest:
+            console.print(f"[bold green]✅ Overflow summary already posted by an earlier attempt ({previous['id']})[/bold green]")
+        else:
+            if previous:
+                delete_node("issue_comment", previous["id"])
+
+            result = graphql(create_comment_mutation, variables)
+
+            if result and result.get("addComment"):
+                comment_id = result["addComment"]["commentEdge"]["node"]["id"]
+                journal.record_post("overflow", overflow_digest, comment_id)
+                console.print(f"[bold green]✅ Posted overflow summary comment![/bold green]")
+                console.print(f"[dim]Comment ID: {comment_id}[/dim]")
+            else:
+                console.print("[bold red]❌ Failed to post overflow summary comment[/bold red]")
+                posted_ok = False
+    elif journal.posted("overflow"):
+        delete_node("issue_comment", journal.posted("overflow")["id"])
+        journal.forget_post("overflow")
+
+    end_phase("submit")
+
+    console.rule("[bold cyan]🏁 Done")
+    return result_of()
+
+
+def main():
+    pr_number = os.environ.get('PR_NUMBER')
+    commit_id = os.environ.get('COMMIT_ID')
+
+    console.rule("[bold cyan]GitHub Context")
+    console.print(f"[bold green]Repository:[/bold green] {github_repository}")
+    console.print(f"[bold green]PR Number:[/bold green] {pr_number}")
+    console.print(f"[bold green]Commit ID:[/bold green] {commit_id}")
+
+    # Result files: arguments, PMD_RESULT_FILES (comma separated, globs allowed) or the validate.yml default.
+    # Code-analyzer JSON and SARIF can be mixed, e.g. one file per engine job.
+    result_patterns = sys.argv[1:] or [p.strip() for p in os.environ.get('PMD_RESULT_FILES', "apexScanResults.json").split(",") if p.strip()]
+    pmd_violations_files = expand_paths(result_patterns)
+
+    # Load scan results
+    try:
+        with phaseProfile.span("load"):
+            violations, loaded_files = load_violations(pmd_violations_files)
+    except (OSError, json.JSONDecodeError, ScanResultsError) as e:
+        console.print(f"[bold red]❌ Error reading scan results: {e}[/bold red]")
+        sys.exit(1)
+    for path, (fmt, count) in loaded_files.items():
+        console.print(f"[bold green]Read {count} violation(s) from {path} ({fmt})[/bold green]")
+    console.print(f"[bold green]✅ Loaded {len(violations)} violation(s) after de-duplication.[/bold green]")
+
+    result = comment_on_pr(pr_number, commit_id, violations)
+    if result["error"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
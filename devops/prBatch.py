@@ -0,0 +1,189 @@
+"""Run the PMD commenter or the deployment summary bot for many PRs in one process.
+
+    python devops/prBatch.py pmd --manifest batch.json --workers 8
+    python devops/prBatch.py summary --manifest batch.json
+
+The manifest is a JSON list with one entry per PR:
+
+    [{"pr": 12, "commit": "<head sha>", "results": "scans/pr-12.json"}, ...]
+
+For `pmd`, results is a scan result file or a list of them (globs allowed,
+code-analyzer JSON or SARIF); for `summary` it is a deploymentResult.json.
+Entries may also set "repository" (default GITHUB_REPOSITORY) and, for
+`summary`, "artifact_url", "artifact_id" and "run_id".
+
+Every result file is parsed once, however many entries name it. PRs are then
+processed by up to --workers threads sharing one pooled HTTP session; each
+PR's log is printed as a block when it finishes. A timing report per PR and
+for the whole batch goes to prBatchReport.json and $GITHUB_STEP_SUMMARY. The
+exit code is 1 if any PR failed.
+"""
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from rich.console import Console
+
+import apiTrace
+import phaseProfile
+
+apiTrace.install()
+phaseProfile.install()
+
+import pmdCommentor
+import prUpdated
+from scanResults import load_violations, expand_paths, ScanResultsError
+
+MAX_WORKERS = int(os.environ.get('PR_BATCH_MAX_WORKERS', 8))
+REPORT_FILE = "prBatchReport.json"
+
+GREEN_TEXT = '\033[32m'
+YELLOW_TEXT = '\033[33m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+
+def pooled_session(pool_size):
+    """One session for every PR, keeping up to pool_size connections alive per host"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def read_manifest(path):
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path} must contain a JSON list of entries")
+    for i, entry in enumerate(entries):
+        missing = [key for key in ("pr", "commit", "results") if not entry.get(key)]
+        if missing:
+            raise ValueError(f"Entry {i} of {path} is missing {', '.join(missing)}")
+    return entries
+
+
+def result_key(entry):
+    results = entry["results"]
+    return tuple(results) if isinstance(results, list) else (results,)
+
+
+def load_shared_results(bot, entries):
+    """{result key: parsed results} with every distinct result set parsed once"""
+    shared = {}
+    for key in dict.fromkeys(result_key(entry) for entry in entries):
+        if bot == "pmd":
+            violations, _ = load_violations(expand_paths(list(key)))
+            shared[key] = violations
+            print(f"Parsed {len(violations)} violation(s) from {', '.join(key)}")
+        else:
+            shared[key] = prUpdated.load_result(key[0])
+            if shared[key] is not None:
+                print(f"Parsed {key[0]}: {shared[key].summary_line()}")
+    return shared
+
+
+def process_entry(bot, entry, results, session):
+    """Run one PR; returns (result dict, captured log)"""
+    start = time.perf_counter()
+    buffer = io.StringIO()
+    try:
+        if results is None:
+            result = {"ok": False, "error": f"{result_key(entry)[0]} could not be parsed"}
+        elif bot == "pmd":
+            console = Console(file=buffer, force_terminal=sys.stdout.isatty(), width=120)
+            result = pmdCommentor.comment_on_pr(entry["pr"], entry["commit"], results, entry.get("repository"),
+                                                session, console)
+        else:
+            result = prUpdated.submit_summary(entry["pr"], entry["commit"], results, entry.get("artifact_url"),
+                                              entry.get("artifact_id"), entry.get("run_id"), entry.get("repository"),
+                                              session, lambda line: buffer.write(f"{line}\n"))
+    except Exception as e:  # One PR's failure must not stop the others
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    result.update({"pr": entry["pr"], "commit": entry["commit"], "seconds": round(time.perf_counter() - start, 3)})
+    return result, buffer.getvalue()
+
+
+def run_batch(bot, entries, shared, workers=MAX_WORKERS):
+    """Process entries concurrently; returns their results in manifest order"""
+    session = pooled_session(workers)
+    results = [None] * len(entries)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(process_entry, bot, entry, shared[result_key(entry)], session): i
+                   for i, entry in enumerate(entries)}
+        for future in as_completed(futures):
+            result, log = future.result()
+            results[futures[future]] = result
+            colour = GREEN_TEXT if result["ok"] else RED_TEXT
+            print(f"{colour}──── PR #{result['pr']} ({result['seconds']}s) {'ok' if result['ok'] else result.get('error') or 'failed'}{RESET}")
+            sys.stdout.write(log)
+    return results
+
+
+def timing_markdown(bot, results, load_seconds, wall_seconds):
+    phases = sorted({phase for result in results for phase in result.get("timings", {})})
+    busy = sum(result["seconds"] for result in results)
+    summary = (f"### 📦 PR batch ({bot})\n"
+               f"- **PRs:** {len(results)} ({sum(1 for r in results if r['ok'])} ok)\n"
+               f"- **Parsing results:** {load_seconds:.2f}s\n"
+               f"- **Wall time:** {wall_seconds:.2f}s for {busy:.2f}s of PR work "
+               f"(x{busy / wall_seconds if wall_seconds else 0:.1f} concurrency)\n\n")
+    summary += "| PR | Status | Time (s) |" + "".join(f" {phase} (s) |" for phase in phases) + "\n"
+    summary += "|----|--------|----------|" + "".join("-" * (len(phase) + 6) + "|" for phase in phases) + "\n"
+    for result in results:
+        status = "✅" if result["ok"] else f"❌ {str(result.get('error') or 'failed').replace('|', '/')}"
+        cells = "".join(f" {result.get('timings', {}).get(phase, '')} |" for phase in phases)
+        summary += f"| #{result['pr']} | {status} | {result['seconds']} |{cells}\n"
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a PR bot for every entry of a batch manifest")
+    parser.add_argument("bot", choices=["pmd", "summary"])
+    parser.add_argument("--manifest", required=True, help="JSON list of {pr, commit, results} entries")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--report", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    try:
+        entries = read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"{RED_TEXT}❌ Could not read batch manifest: {e}{RESET}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        with phaseProfile.span("load"):
+            shared = load_shared_results(args.bot, entries)
+    except (OSError, json.JSONDecodeError, ScanResultsError) as e:
+        print(f"{RED_TEXT}❌ Error reading scan results: {e}{RESET}")
+        sys.exit(1)
+    load_seconds = time.perf_counter() - start
+
+    results = run_batch(args.bot, entries, shared, args.workers)
+    wall_seconds = time.perf_counter() - start
+
+    with open(args.report, "w") as f:
+        json.dump({"bot": args.bot, "load_seconds": round(load_seconds, 3), "wall_seconds": round(wall_seconds, 3),
+                   "results": results}, f, indent=2)
+    summary = timing_markdown(args.bot, results, load_seconds, wall_seconds)
+    print(summary)
+    summary_file = os.environ.get('GITHUB_STEP_SUMMARY')
+    if summary_file:
+        with open(summary_file, "a") as f:
+            f.write(summary + "\n")
+
+    failed = [result for result in results if not result["ok"]]
+    if failed:
+        print(f"{RED_TEXT}❌ {len(failed)} of {len(results)} PR(s) failed{RESET}")
+        sys.exit(1)
+    print(f"{GREEN_TEXT}✅ {len(results)} PR(s) processed{RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,31 @@
 import requests
 import re
 import os
+import json
+from urllib.parse import urlparse, parse_qs
+from deploymentMetadataCache import read_record
+import apiTrace
+import phaseProfile
+
+apiTrace.install()
+phaseProfile.install()
 
 # GitHub API information
 TOKEN_GITHUB = os.getenv("TOKEN_GITHUB")  # Get the token from GitHub secrets
 REPO = os.getenv("GITHUB_REPOSITORY")  # In GitHub Actions, the repository is set as an environment variable
 PR_NUMBER = os.getenv("PR_NUMBER")  # You need to pass the PR number or get it from the event
+COMMIT_ID = os.getenv("COMMIT_ID")  # Head commit of the PR, keys the local metadata cache
 env_file = os.getenv('GITHUB_ENV')  # Get the path of the runner file
+etag_cache_file = os.getenv("GITHUB_ETAG_CACHE", ".github-etag-cache.json")  # Conditional request cache
+
+BOT_LOGIN = "github-actions[bot]"
+# prUpdated.py marks its summary review; older summaries only carry the heading
+SUMMARY_MARKERS = ("<!-- deployment-summary ", "Deployment/Validation Summary")
+PER_PAGE = 100  # GitHub maximum, the default of 30 hides recent reviews on busy PRs
 
-# GitHub API URL
-API_URL = f"https://api.github.com/repos/{REPO}/pulls/{PR_NUMBER}/reviews"
+# GitHub API URL (GITHUB_API_URL is set by GitHub Actions)
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+API_URL = f"{GITHUB_API_URL}/repos/{REPO}/pulls/{PR_NUMBER}/reviews"
 
 print(f"GitHub API_URL: {API_URL}")
 
@@ -19,78 +35,214 @@ headers = {
     "Accept": "application/vnd.github.full+json",
 }
 
-# Fetch all comments on the PR
-response = requests.get(API_URL, headers=headers)
-
-if response.status_code == 200:
-    comments = response.json()
-
-    # Find the latest github-actions[bot] comment
-    latest_comment = None
-    for comment in comments:
-        if comment['user']['login'] == "github-actions[bot]":
-            latest_comment = comment['body']
-    
-    if latest_comment:
-        print("Full comment body:")
-        print(latest_comment)
-
-
-        # Regex pattern to  No code deployment
-        name_match = re.search(r"\*\*Name:\*\*\s([A-Za-z0-9]+)", latest_comment or "")
-        if name_match:
-            name = name_match.group(1)
-            print(f"Name: {name}")
-            # Set BYPASS_DEPLOYMENT environment variable
-            with open(env_file, "a") as f:
-                bypass_value = str(name == "NothingToDeploy").lower()  # Convert to lowercase string
-                f.write(f"BYPASS_DEPLOYMENT={bypass_value}\n")
-        else:
-            print("Name not found in comment") 
-         # Extract Run Id ID using regex
-        run_id_match = re.search(r"\*\*Run Id:\*\*\s([A-Za-z0-9]+)", latest_comment)
-        if run_id_match:
-            run_id = run_id_match.group(1)
-            print(f"Run ID: {run_id}")
-            # Set Deployment ID as an environment variable
-            with open(env_file, "a") as f:
-                f.write(f"RUN_ID={run_id}\n")
-        else:
-            print("Run ID not found")
-
-        # Extract Deployment ID using regex
-        deployment_id_match = re.search(r"\*\*Deployment ID:\*\*\s([A-Za-z0-9]+)", latest_comment)
-        if deployment_id_match:
-            deployment_id = deployment_id_match.group(1)
-            print(f"Deployment ID: {deployment_id}")
-            # Set Deployment ID as an environment variable
-            with open(env_file, "a") as f:
-                f.write(f"DEPLOYMENT_ID={deployment_id}\n")
-        else:
-            print("Deployment ID not found")
-
-        # Regex pattern to match the Artifact URL
-        artifact_url_match = re.search(r"\*\*Artifact URL:\*\*\s([^\s]+)", latest_comment)
-        if artifact_url_match:
-            artifact_url = artifact_url_match.group(1)
-            print(f"Artifact URL: {artifact_url}")
-            # Set Artifact URL as an environment variable
-            with open(env_file, "a") as f:
-                f.write(f"ARTIFACT_URL={artifact_url}\n")
-        else:
-            print("Artifact URL not found")
-
-        # Regex pattern to match the Artifact ID
-        artifact_id_match = re.search(r"\*\*Artifact ID:\*\*\s([^\s]+)", latest_comment)
-        if artifact_id_match:
-            artifact_id = artifact_id_match.group(1)
-            print(f"Artifact ID: {artifact_id}")
-            # Set Artifact ID as an environment variable
-            with open(env_file, "a") as f:
-                f.write(f"ARTIFACT_ID={artifact_id}\n")
+
+def load_etag_cache():
+    """Load cached ETags from previous runs (e.g. restored by actions/cache)"""
+    try:
+        with open(etag_cache_file, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_etag_cache(cache):
+    """Persist ETags so the next run can send If-None-Match"""
+    try:
+        with open(etag_cache_file, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        print(f"Could not write ETag cache: {e}")
+
+
+def parse_link_header(link_header):
+    """Parse a GitHub Link header into a {rel: url} mapping"""
+    links = {}
+    for part in (link_header or "").split(","):
+        match = re.search(r'<([^>]+)>;\s*rel="([^"]+)"', part)
+        if match:
+            links[match.group(2)] = match.group(1)
+    return links
+
+
+def page_number(url):
+    """Return the page query parameter of a paginated URL (GitHub omits it for page 1)"""
+    values = parse_qs(urlparse(url).query).get("page")
+    return int(values[0]) if values else 1
+
+
+def is_summary_review(review):
+    """A deployment summary by the bot; its PMD reviews are newer when the summary is edited in place"""
+    body = review.get("body") or ""
+    return review.get("user", {}).get("login") == BOT_LOGIN and any(marker in body for marker in SUMMARY_MARKERS)
+
+
+def latest_summary(reviews):
+    """Body of the newest summary review on a page, or None"""
+    for review in reversed(reviews):
+        if is_summary_review(review):
+            return review["body"]
+    return None
+
+
+def fetch_reviews_page(url, params, etag_cache, conditional=True):
+    """GET one page of reviews and return (status_code, newest summary body or None, links).
+
+    With conditional, If-None-Match is sent when an ETag is cached and a 304 is
+    answered from the cache (it does not count against the rate limit). Only the
+    page's summary body and links are cached, not the reviews themselves.
+    """
+    cache_key = requests.Request("GET", url, params=params).prepare().url
+    cached = etag_cache.get(cache_key) if conditional else None
+    if cached and "summary" not in cached:
+        cached = None  # Written by an older version that cached whole pages
+    request_headers = dict(headers)
+    if cached:
+        request_headers["If-None-Match"] = cached["etag"]
+
+    response = requests.get(url, headers=request_headers, params=params)
+
+    if response.status_code == 304 and cached:
+        print(f"Not modified, using cached page: {cache_key}")
+        return 200, cached["summary"], cached["links"]
+
+    if response.status_code != 200:
+        return response.status_code, None, {}
+
+    summary = latest_summary(response.json())
+    links = parse_link_header(response.headers.get("Link"))
+    etag = response.headers.get("ETag")
+    if etag and conditional:
+        etag_cache[cache_key] = {"etag": etag, "summary": summary, "links": links}
+    return 200, summary, links
+
+
+def find_latest_bot_review(etag_cache):
+    """Find the body of the newest github-actions[bot] deployment summary review.
+
+    Reviews are returned oldest first, so jump straight to the last page via the
+    Link header and walk backwards, stopping at the first summary review found.
+    The first page is always fetched unconditionally: new reviews land on later
+    pages, so its ETag stays the same while its `last` link goes stale.
+    """
+    status, first_summary, links = fetch_reviews_page(API_URL, {"per_page": PER_PAGE}, etag_cache,
+                                                      conditional=False)
+    if status != 200:
+        return status, None
+
+    summary = first_summary
+    if "last" in links:
+        status, summary, links = fetch_reviews_page(links["last"], None, etag_cache)
+        if status != 200:
+            return status, None
+
+    pages_scanned = 0
+    while True:
+        pages_scanned += 1
+        if summary:
+            print(f"Found latest bot review after scanning {pages_scanned} page(s)")
+            return 200, summary
+
+        prev_url = links.get("prev")
+        if not prev_url:
+            return 200, None
+        if page_number(prev_url) == 1:
+            # The first page was already fetched above, no need to request it again
+            summary, links = first_summary, {}
+            continue
+        status, summary, links = fetch_reviews_page(prev_url, None, etag_cache)
+        if status != 200:
+            return status, None
+
+
+def extract_metadata(latest_comment):
+    """Extract the deployment variables from the body of a bot review"""
+    env_vars = {}
+
+    # Regex pattern to  No code deployment
+    name_match = re.search(r"\*\*Name:\*\*\s([A-Za-z0-9]+)", latest_comment or "")
+    if name_match:
+        name = name_match.group(1)
+        print(f"Name: {name}")
+        # Set BYPASS_DEPLOYMENT environment variable
+        env_vars["BYPASS_DEPLOYMENT"] = str(name == "NothingToDeploy").lower()  # Convert to lowercase string
+    else:
+        print("Name not found in comment")
+
+    # Extract Run Id ID using regex
+    run_id_match = re.search(r"\*\*Run Id:\*\*\s([A-Za-z0-9]+)", latest_comment)
+    if run_id_match:
+        run_id = run_id_match.group(1)
+        print(f"Run ID: {run_id}")
+        env_vars["RUN_ID"] = run_id
+    else:
+        print("Run ID not found")
+
+    # Extract Deployment ID using regex
+    deployment_id_match = re.search(r"\*\*Deployment ID:\*\*\s([A-Za-z0-9]+)", latest_comment)
+    if deployment_id_match:
+        deployment_id = deployment_id_match.group(1)
+        print(f"Deployment ID: {deployment_id}")
+        env_vars["DEPLOYMENT_ID"] = deployment_id
+    else:
+        print("Deployment ID not found")
+
+    # Regex pattern to match the Artifact URL
+    artifact_url_match = re.search(r"\*\*Artifact URL:\*\*\s([^\s]+)", latest_comment)
+    if artifact_url_match:
+        artifact_url = artifact_url_match.group(1)
+        print(f"Artifact URL: {artifact_url}")
+        env_vars["ARTIFACT_URL"] = artifact_url
+    else:
+        print("Artifact URL not found")
+
+    # Regex pattern to match the Artifact ID
+    artifact_id_match = re.search(r"\*\*Artifact ID:\*\*\s([^\s]+)", latest_comment)
+    if artifact_id_match:
+        artifact_id = artifact_id_match.group(1)
+        print(f"Artifact ID: {artifact_id}")
+        env_vars["ARTIFACT_ID"] = artifact_id
+    else:
+        print("Artifact ID not found")
+
+    return env_vars
+
+
+def write_env(env_vars):
+    """Write all variables to GITHUB_ENV in a single buffered write"""
+    if env_vars:
+        with open(env_file, "a") as f:
+            f.write("".join(f"{key}={value}\n" for key, value in env_vars.items()))
+
+
+def main():
+    # Prefer the record written by the validation job, the API is only needed on a miss
+    with phaseProfile.span("load"):
+        cached_vars = read_record(PR_NUMBER, COMMIT_ID)
+    if cached_vars:
+        print(f"Using cached deployment metadata for PR #{PR_NUMBER} @ {COMMIT_ID}")
+        for key, value in cached_vars.items():
+            print(f"{key}: {value}")
+        write_env(cached_vars)
+        return
+
+    print("No cached deployment metadata, falling back to PR reviews")
+    with phaseProfile.span("fetch"):
+        etag_cache = load_etag_cache()
+        status_code, latest_comment = find_latest_bot_review(etag_cache)
+        save_etag_cache(etag_cache)
+
+    if status_code == 200:
+        if latest_comment:
+            print("Full comment body:")
+            print(latest_comment)
+            with phaseProfile.span("match"):
+                env_vars = extract_metadata(latest_comment)
+            write_env(env_vars)
         else:
-            print("Artifact ID not found")
+            print("No comment from github-actions[bot] found.")
     else:
-        print("No comment from github-actions[bot] found.")
-else:
-    print(f"Failed to fetch comments: {response.status_code}")
+        print(f"Failed to fetch comments: {status_code}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
 import os
+import re
+import sys
 import json
 import requests
 import datetime
+import deploymentResult
+from deploymentMetadataCache import write_record
+import apiTrace
+import devopsLog
+import phaseProfile
+
+apiTrace.install()
+phaseProfile.install()
 
 GREEN_TEXT = '\033[32m'
 YELLOW_TEXT = '\033[33m'
@@ -9,53 +19,55 @@ RED_TEXT = '\033[31m'
 RESET = '\033[0m'
 CYAN_BG = '\033[46m'
 
-pr_number         = os.environ.get('PR_NUMBER')
 github_repository = os.environ.get('GITHUB_REPOSITORY')
 github_token      = os.environ.get('TOKEN_GITHUB')
-commit_id         = os.environ.get('COMMIT_ID')
-artifact_url      = os.environ.get('ARTIFACT_URL')
-artifact_id       = os.environ.get('ARTIFACT_ID')
-run_id            = os.environ.get('RUN_ID')
-
-print(f"GitHub Repository: {github_repository}")
-print(f"GitHub Token: {github_token}")
-print(f"PR Number: {pr_number}")
-print(f"commit_id: {commit_id}")
-print(f"Artifact URL: {artifact_url}")
-print(f"RUN Id: {run_id}")
-
-owner, repo = github_repository.split("/")
-
-deployment_result_file = "deploymentResult.json"
-try:
-    with open(deployment_result_file, "r") as file:
-        deploy_result = json.load(file)
-        print("✅ Deployment result loaded.")
-        print(json.dumps(deploy_result, indent=2))
-except FileNotFoundError:
-    print(f"{CYAN_BG}{RED_TEXT}Error: File {deployment_result_file} not found.{RESET}")
-    exit(1)
-except json.JSONDecodeError:
-    print(f"{CYAN_BG}{RED_TEXT}Error: Invalid JSON in {deployment_result_file}.{RESET}")
-    exit(1)
-
-result  = deploy_result.get("result", {})
-details = result.get("details", {})
-
-deployment_id = result.get("id", "N/A")
-deploy_url    = result.get("deployUrl", "")
-name          = deploy_result.get("name", "N/A")
-
-# --- Build the big 'body' of the review ---
-summary = f"""
+api_url           = os.environ.get('GITHUB_API_URL', "https://api.github.com")
+graphql_url       = os.environ.get('GITHUB_GRAPHQL_URL', f"{api_url}/graphql")
+
+# 'edit' updates the bot's existing summary review in place, 'new' posts a review on every run
+SUMMARY_MODE  = os.environ.get('PR_SUMMARY_MODE', "edit").lower()
+HISTORY_LIMIT = int(os.environ.get('PR_SUMMARY_HISTORY', 20))  # earlier runs kept in the body
+BOT_LOGIN     = "github-actions[bot]"
+
+# Hidden marker with the run shown in the body; finds the review again and seeds the history
+SUMMARY_MARKER = re.compile(r"<!-- deployment-summary (\{.*?\}) -->")
+HISTORY_START  = "<!-- deployment-summary-history -->"
+HISTORY_END    = "<!-- /deployment-summary-history -->"
+
+FIND_SUMMARY_QUERY = """
+query FindSummaryReview($owner: String!, $name: String!, $number: Int!) {
+  rateLimit { cost remaining }
+  repository(owner: $owner, name: $name) {
+    pullRequest(number: $number) {
+      reviews(last: 100) {
+        nodes {
+          databaseId
+          body
+          author { login }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def build_summary(deploy_result, artifact_url=None, artifact_id=None, run_id=None):
+    """Markdown body of the deployment/validation summary review"""
+    deployment_id = deploy_result.id
+    deploy_url    = deploy_result.deploy_url
+    name          = deploy_result.name
+
+    # --- Build the big 'body' of the review ---
+    summary = f"""
 ### 🚀 Deployment/Validation Summary
-- **Status:** {"✅ Success" if result.get("success") or name == "NothingToDeploy" else "❌ Failed"}
+- **Status:** {"✅ Success" if deploy_result.passed else "❌ Failed"}
 - **Name:** {name}
-- **Start Time:** {result.get("startDate", "N/A")}
-- **End Time:** {result.get("completedDate", "N/A")}
-- **Components Deployed:** {result.get("numberComponentsDeployed", 0)} / {result.get("numberComponentsTotal", 0)}
-- **Component Errors:** {result.get("numberComponentErrors", 0)}
-- **Tests Run:** {result.get("numberTestsCompleted", 0)} / {result.get("numberTestsTotal", 0)}
+- **Start Time:** {deploy_result.start_date}
+- **End Time:** {deploy_result.completed_date}
+- **Components Deployed:** {deploy_result.number_components_deployed} / {deploy_result.number_components_total}
+- **Component Errors:** {deploy_result.number_component_errors}
+- **Tests Run:** {deploy_result.number_tests_completed} / {deploy_result.number_tests_total}
 
 
 ### 📌 Deployment Metadata
@@ -66,124 +78,243 @@ summary = f"""
 - **Run Id:** {run_id}
 """
 
-# --- Append Component Failures if any ---
-component_failures = details.get("componentFailures", [])
-if component_failures:
-    summary += "\n\n### ❌ Component Failures\n| Type | File | Problem |\n|------|------|---------|\n"
-    for cf in component_failures:
-        # show raw path; no inline attaching
-        summary += f"| {cf.get('componentType')} | `{cf.get('fileName')}` | {cf.get('problem')} |\n"
-
-# --- Append Test Failures if any ---
-failures = details.get("runTestResult", {}).get("failures", [])
-if failures:
-    summary += "\n\n### ❌ Test Failures\n| Name | Method | Message |\n|------|--------|---------|\n"
-    for failure in failures:
-        summary += f"| `{failure['name']}` | `{failure['methodName']}` | {failure['message']} |\n"
-
-# --- Append Code Coverage Warnings if any ---
-coverage_warnings = details.get("runTestResult", {}).get("codeCoverageWarnings", [])
-if coverage_warnings:
-    summary += "\n\n### ⚠️ Code Coverage Warnings\n| Name | Message |\n|------|---------|\n"
-    for warning in coverage_warnings:
-        summary += f"| `{warning['name']}` | {warning['message']} |\n"
-
-# --- Append Flow Coverage Warnings if any ---
-flow_warnings = details.get("runTestResult", {}).get("flowCoverageWarnings", [])
-if flow_warnings:
-    summary += "\n\n### ⚠️ Flow Coverage Warnings\n| Flow Name | Message |\n|-----------|---------|\n"
-    for warning in flow_warnings:
-        summary += f"| `{warning.get('name')}` | {warning.get('message')} |\n"
-
-# --- Append Top 10 Apex Classes with <90% Coverage ---
-coverage_info   = details.get("runTestResult", {}).get("codeCoverage", [])
-coverage_data   = []
-for item in coverage_info:
-    total    = item.get("numLocations", 0)
-    uncovered= item.get("numLocationsNotCovered", 0)
-    if total == 0:
-        continue
-    coverage_pct = round((total - uncovered) * 100 / total, 2)
-    if coverage_pct < 90:
-        coverage_data.append({
-            "name":     item.get("name"),
-            "coverage": coverage_pct,
-            "uncovered": uncovered
-        })
-coverage_data.sort(key=lambda x: x["coverage"])
-if coverage_data:
-    summary += "\n\n### 🧪 Top 10 Apex Classes with <90% Code Coverage\n| Class | Coverage % | Uncovered Lines |\n|-------|-------------|------------------|\n"
-    for item in coverage_data[:10]:
-        summary += f"| `{item['name']}` | {item['coverage']}% | {item['uncovered']} |\n"
-
-# --- Append Top 10 Flows with <90% Coverage ---
-flow_info      = details.get("runTestResult", {}).get("flowCoverage", [])
-flow_data      = []
-for flow in flow_info:
-    total     = flow.get("numElements", 0)
-    uncovered = flow.get("numElementsNotCovered", 0)
-    if total == 0:
-        continue
-    coverage_pct = round((total - uncovered) * 100 / total, 2)
-    if coverage_pct < 90:
-        flow_data.append({
-            "flowName":    flow.get("flowName"),
-            "coverage":    coverage_pct,
-            "uncovered": uncovered,
-            "processType": flow.get("processType")
-        })
-flow_data.sort(key=lambda x: x["coverage"])
-if flow_data:
-    summary += "\n\n### 🔁 Top 10 Flows with <90% Coverage\n| Flow Name | Type | Coverage % | Uncovered Elements |\n|-----------|------|-------------|---------------------|\n"
-    for flow in flow_data[:10]:
-        summary += f"| `{flow['flowName']}` | {flow['processType']} | {flow['coverage']}% | {flow['uncovered']} |\n"
-
-# --- Append Top 10 Slowest Test Methods ---
-slow_methods   = []
-test_successes = details.get("runTestResult", {}).get("successes", [])
-for test_item in test_successes:
-    class_name  = test_item.get("name")
-    method_name = test_item.get("methodName")
-    time_ms     = test_item.get("time", 0)
-    if class_name and method_name:
-        slow_methods.append({
-            "class":  class_name,
-            "method": method_name,
-            "time":   time_ms
-        })
-slow_methods.sort(key=lambda x: x["time"], reverse=True)
-if slow_methods:
-    summary += "\n\n### 🐢 Top 10 Slowest Test Methods\n| Class | Method | Time (ms) |\n|--------|--------|------------|\n"
-    for test_item in slow_methods[:10]:
-        summary += f"| `{test_item['class']}` | `{test_item['method']}` | {test_item['time']} |\n"
-
-# ────────────────────────────────────────────────────────────────────────────────
-# Build review payload WITHOUT any inline comments:
-review_payload = {
-    "commit_id": commit_id,
-    "body":      summary,
-    "event":     "COMMENT"
-}
+    # --- Append Component Failures if any ---
+    component_failures = deploy_result.component_failures
+    if component_failures:
+        summary += "\n\n### ❌ Component Failures\n| Type | File | Problem |\n|------|------|---------|\n"
+        for cf in component_failures:
+            # show raw path; no inline attaching
+            summary += f"| {cf.component_type} | `{cf.file_name}` | {cf.problem} |\n"
 
-# Call the Create‐Review endpoint:
-headers = {
-    "Authorization": f"Bearer {github_token}",
-    "Accept":        "application/vnd.github+json",
-    "X-GitHub-Api-Version": "2022-11-28"
-}
-review_url = f"https://api.github.com/repos/{owner}/{repo}/pulls/{pr_number}/reviews"
-
-print(f"{YELLOW_TEXT}📤 Submitting a single, large review comment…{RESET}")
-response = requests.post(review_url, headers=headers, json=review_payload)
-
-if response.status_code in (200, 201):
-    print(f"{GREEN_TEXT}✅ Review submitted successfully!{RESET}")
-    if result.get("success") or name == "NothingToDeploy":
-        exit(0)
-    else:
-        exit(1)
-else:
-    print(f"{RED_TEXT}❌ Failed to submit review: {response.status_code}{RESET}")
-    print(review_payload)
-    print(response.text)
-    exit(1)
+    # --- Append Test Failures if any ---
+    failures = deploy_result.test_failures
+    if failures:
+        summary += "\n\n### ❌ Test Failures\n| Name | Method | Message |\n|------|--------|---------|\n"
+        for failure in failures:
+            summary += f"| `{failure.name}` | `{failure.method_name}` | {failure.message} |\n"
+
+    # --- Append Code Coverage Warnings if any ---
+    coverage_warnings = deploy_result.code_coverage_warnings
+    if coverage_warnings:
+        summary += "\n\n### ⚠️ Code Coverage Warnings\n| Name | Message |\n|------|---------|\n"
+        for warning in coverage_warnings:
+            summary += f"| `{warning.name}` | {warning.message} |\n"
+
+    # --- Append Flow Coverage Warnings if any ---
+    flow_warnings = deploy_result.flow_coverage_warnings
+    if flow_warnings:
+        summary += "\n\n### ⚠️ Flow Coverage Warnings\n| Flow Name | Message |\n|-----------|---------|\n"
+        for warning in flow_warnings:
+            summary += f"| `{warning.name}` | {warning.message} |\n"
+
+    # --- Append Top 10 Apex Classes with <90% Coverage ---
+    coverage_data = [item for item in deploy_result.code_coverage
+                     if item.coverage_pct is not None and item.coverage_pct < 90]
+    coverage_data.sort(key=lambda x: x.coverage_pct)
+    if coverage_data:
+        summary += "\n\n### 🧪 Top 10 Apex Classes with <90% Code Coverage\n| Class | Coverage % | Uncovered Lines |\n|-------|-------------|------------------|\n"
+        for item in coverage_data[:10]:
+            summary += f"| `{item.name}` | {item.coverage_pct}% | {item.num_locations_not_covered} |\n"
+
+    # --- Append Top 10 Flows with <90% Coverage ---
+    flow_data = [flow for flow in deploy_result.flow_coverage
+                 if flow.coverage_pct is not None and flow.coverage_pct < 90]
+    flow_data.sort(key=lambda x: x.coverage_pct)
+    if flow_data:
+        summary += "\n\n### 🔁 Top 10 Flows with <90% Coverage\n| Flow Name | Type | Coverage % | Uncovered Elements |\n|-----------|------|-------------|---------------------|\n"
+        for flow in flow_data[:10]:
+            summary += f"| `{flow.flow_name}` | {flow.process_type} | {flow.coverage_pct}% | {flow.num_elements_not_covered} |\n"
+
+    # --- Append Top 10 Slowest Test Methods ---
+    slow_methods = [test_item for test_item in deploy_result.test_successes
+                    if test_item.name and test_item.method_name]
+    slow_methods.sort(key=lambda x: x.time, reverse=True)
+    if slow_methods:
+        summary += "\n\n### 🐢 Top 10 Slowest Test Methods\n| Class | Method | Time (ms) |\n|--------|--------|------------|\n"
+        for test_item in slow_methods[:10]:
+            summary += f"| `{test_item.name}` | `{test_item.method_name}` | {test_item.time} |\n"
+
+    return summary
+
+
+def run_record(deploy_result, commit_id, run_id):
+    """Compact description of one run, stored in the marker and shown in the history"""
+    return {
+        "run": run_id or "",
+        "commit": (commit_id or "")[:7],
+        "passed": bool(deploy_result.passed),
+        "name": deploy_result.name or "",
+        "deployment": deploy_result.id or "",
+        "time": datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M"),
+    }
+
+
+def history_row(record):
+    return (f"| {record.get('run', '')} | `{record.get('commit', '')}` | {'✅' if record.get('passed') else '❌'} | "
+            f"{record.get('name', '')} | {record.get('deployment', '')} | {record.get('time', '')} |")
+
+
+def read_history(body):
+    """(record of the run shown in body, history rows of earlier runs)"""
+    match = SUMMARY_MARKER.search(body or "")
+    try:
+        record = json.loads(match.group(1)) if match else None
+    except json.JSONDecodeError:
+        record = None
+    rows = []
+    if HISTORY_START in (body or "") and HISTORY_END in body:
+        section = body.split(HISTORY_START, 1)[1].split(HISTORY_END, 1)[0]
+        rows = [line for line in section.splitlines() if line.startswith("| ") and not line.startswith("| Run Id")]
+    return record, rows
+
+
+def summary_body(summary, record, previous_body=None):
+    """Marker, current summary and a collapsed history of the runs previous_body already held"""
+    rows = []
+    previous, previous_rows = read_history(previous_body)
+    if previous and (previous.get("run"), previous.get("commit")) != (record["run"], record["commit"]):
+        rows.append(history_row(previous))
+    rows = (rows + previous_rows)[:HISTORY_LIMIT]
+
+    body = f"<!-- deployment-summary {json.dumps(record)} -->\n{summary}"
+    if rows:
+        # Plain table cells, so prDeployPreProcessor's **Label:** patterns only match the current run
+        body += (f"\n\n<details><summary>🕘 Earlier runs ({len(rows)})</summary>\n\n{HISTORY_START}\n"
+                 "| Run Id | Commit | Status | Name | Deployment | Time (UTC) |\n"
+                 "|--------|--------|--------|------|------------|------------|\n"
+                 + "\n".join(rows) + f"\n{HISTORY_END}\n\n</details>\n")
+    return body
+
+
+def find_summary_review(owner, repo, pr_number, session=None):
+    """(database id, body) of the newest bot review carrying the summary marker, or (None, None).
+
+    One GraphQL call over the last 100 reviews; a summary older than that is
+    left alone and a new one is created.
+    """
+    response = (session or requests).post(graphql_url, headers={"Authorization": f"Bearer {github_token}"}, json={
+        "query": FIND_SUMMARY_QUERY, "variables": {"owner": owner, "name": repo, "number": int(pr_number)}})
+    if response.status_code != 200 or response.json().get("errors"):
+        return None, None
+    pull_request = (response.json().get("data") or {}).get("repository", {}).get("pullRequest") or {}
+    for review in reversed(pull_request.get("reviews", {}).get("nodes", [])):
+        if (review.get("author") or {}).get("login") in (BOT_LOGIN, "github-actions") \
+                and SUMMARY_MARKER.search(review.get("body") or ""):
+            return review["databaseId"], review["body"]
+    return None, None
+
+
+def submit_summary(pr_number, commit_id, deploy_result, artifact_url=None, artifact_id=None, run_id=None,
+                   repository=None, session=None, log=print):
+    """Cache the deployment metadata and post the summary review on one PR.
+
+    deploy_result is only read, so one parsed result can serve several PRs.
+    In 'edit' mode the existing summary review is updated with one call and
+    keeps a collapsed history of earlier runs; a review is only created when
+    there is none. Returns a dict with 'ok', the HTTP status and 'error' when
+    the review was not submitted.
+    """
+    owner, repo = (repository or github_repository).split("/")
+    with phaseProfile.span("render"):
+        summary = build_summary(deploy_result, artifact_url, artifact_id, run_id)
+        record = run_record(deploy_result, commit_id, run_id)
+
+    # --- Cache the deployment metadata so the deploy job can skip the reviews API ---
+    write_record(pr_number, commit_id, {
+        "BYPASS_DEPLOYMENT": str(deploy_result.name == "NothingToDeploy").lower(),
+        "RUN_ID":            run_id,
+        "DEPLOYMENT_ID":     deploy_result.id,
+        "ARTIFACT_URL":      artifact_url,
+        "ARTIFACT_ID":       artifact_id
+    }, passed=deploy_result.passed)
+
+    headers = {
+        "Authorization": f"Bearer {github_token}",
+        "Accept":        "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+    review_url = f"{api_url}/repos/{owner}/{repo}/pulls/{pr_number}/reviews"
+
+    body = summary_body(summary, record)
+    if SUMMARY_MODE == "edit":
+        with phaseProfile.span("fetch"):
+            review_id, previous_body = find_summary_review(owner, repo, pr_number, session)
+        with phaseProfile.span("render"):
+            body = summary_body(summary, record, previous_body)
+        if review_id:
+            log(f"{YELLOW_TEXT}📝 Updating summary review {review_id} in place…{RESET}")
+            with phaseProfile.span("submit"):
+                response = (session or requests).put(f"{review_url}/{review_id}", headers=headers, json={"body": body})
+            if response.status_code == 200:
+                log(f"{GREEN_TEXT}✅ Review updated successfully!{RESET}")
+                return {"pr": pr_number, "commit": commit_id, "ok": True, "status": response.status_code, "error": None}
+            log(f"{YELLOW_TEXT}⚠️ Could not update review {review_id} ({response.status_code}), creating a new one{RESET}")
+
+    # ────────────────────────────────────────────────────────────────────────────────
+    # Build review payload WITHOUT any inline comments:
+    review_payload = {
+        "commit_id": commit_id,
+        "body":      body,
+        "event":     "COMMENT"
+    }
+
+    # Call the Create‐Review endpoint:
+    log(f"{YELLOW_TEXT}📤 Submitting a single, large review comment…{RESET}")
+    with phaseProfile.span("submit"):
+        response = (session or requests).post(review_url, headers=headers, json=review_payload)
+
+    if response.status_code in (200, 201):
+        log(f"{GREEN_TEXT}✅ Review submitted successfully!{RESET}")
+        return {"pr": pr_number, "commit": commit_id, "ok": True, "status": response.status_code, "error": None}
+
+    log(f"{RED_TEXT}❌ Failed to submit review: {response.status_code}{RESET}")
+    log(f"Review body: {len(body)} characters, commit {commit_id}")
+    log(f"Response: {devopsLog.excerpt(response.text)}")
+    return {"pr": pr_number, "commit": commit_id, "ok": False, "status": response.status_code,
+            "error": f"HTTP {response.status_code}"}
+
+
+def load_result(path):
+    """Parse a deployment result file; prints the problem and returns None when it cannot be read"""
+    try:
+        deploy_result = deploymentResult.load(path)
+    except FileNotFoundError:
+        print(f"{CYAN_BG}{RED_TEXT}Error: File {path} not found.{RESET}")
+        return None
+    except json.JSONDecodeError:
+        print(f"{CYAN_BG}{RED_TEXT}Error: Invalid JSON in {path}.{RESET}")
+        return None
+    except deploymentResult.DeploymentResultError as e:
+        print(f"{CYAN_BG}{RED_TEXT}Error: Unexpected structure in {path}: {e}{RESET}")
+        return None
+    return deploy_result
+
+
+def main():
+    pr_number    = os.environ.get('PR_NUMBER')
+    commit_id    = os.environ.get('COMMIT_ID')
+    artifact_url = os.environ.get('ARTIFACT_URL')
+    artifact_id  = os.environ.get('ARTIFACT_ID')
+    run_id       = os.environ.get('RUN_ID')
+
+    print(f"GitHub Repository: {github_repository}")
+    print(f"GitHub Token: {'set' if github_token else 'not set'}")
+    print(f"PR Number: {pr_number}")
+    print(f"commit_id: {commit_id}")
+    print(f"Artifact URL: {artifact_url}")
+    print(f"RUN Id: {run_id}")
+
+    deployment_result_file = "deploymentResult.json"
+    with phaseProfile.span("load"):
+        deploy_result = load_result(deployment_result_file)
+    if deploy_result is None:
+        sys.exit(1)
+    print("✅ Deployment result loaded.")
+    print(deploy_result.summary_line())
+
+    result = submit_summary(pr_number, commit_id, deploy_result, artifact_url, artifact_id, run_id)
+    sys.exit(0 if result["ok"] and deploy_result.passed else 1)
+
+
+if __name__ == "__main__":
+    main()
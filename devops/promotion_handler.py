@@ -2,12 +2,39 @@ import os
 import json
 import requests
 import sys
+import re
 import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import apiTrace
+import devopsLog
+import phaseProfile
+
+MAX_PARALLEL = int(os.environ.get("PROMOTION_MAX_PARALLEL", 4))
+# Set by GitHub Actions; overridable to point the bot at a local stand-in
+API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL", f"{API_URL}/graphql")
+
+# "recreate" closes and reopens the promotion PR, "update" refreshes the open one in place
+PROMOTION_MODES = ("recreate", "update", "batch", "flush", "chain")
+ADDITIONAL_PRS_HEADER = "### ➕ Additional Promoted PRs"
+
+# "batch" coalesces source PRs into one promotion PR until the window expires or the cap is hit
+BATCH_WINDOW_MINUTES = float(os.environ.get("PROMOTION_BATCH_WINDOW_MINUTES", 30))
+BATCH_MAX_PRS = int(os.environ.get("PROMOTION_BATCH_MAX_PRS", 10))
+BATCH_STATE_PATTERN = re.compile(r"<!-- promotion-batch: (\{.*?\}) -->")
+
+# "chain" promotes every hop of a declared pipeline, e.g. PROMOTION_CHAIN="feature/x>develop>uat>main"
+DRY_RUN = os.environ.get("PROMOTION_DRY_RUN", "false").lower() == "true"
+
+_sessions = {}
+step_timings = []
 
 def fail(message, response=None):
     print(f"❌ {message}")
     if response is not None:
-        print(response.text)
+        print(devopsLog.excerpt(response.text))
     sys.exit(1)
 
 def get_headers(token):
@@ -16,29 +43,160 @@ def get_headers(token):
         "Accept": "application/vnd.github+json"
     }
 
-def find_existing_promotion_pr(repo, head, base, gh_pat):
-    """Check if a promotion PR already exists for this head->base combination"""
-    url = f"https://api.github.com/repos/{repo}/pulls"
-    params = {
-        "head": f"{repo.split('/')[0]}:{head}",  # owner:branch_name
-        "base": base,
-        "state": "open"
-    }
-    
-    response = requests.get(url, headers=get_headers(gh_pat), params=params)
-    
+def get_session(token):
+    """Pooled session per token so every call reuses the same TLS connections"""
+    if token not in _sessions:
+        session = requests.Session()
+        session.headers.update(get_headers(token))
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_PARALLEL)
+        session.mount("https://", adapter)
+        _sessions[token] = session
+    return _sessions[token]
+
+@contextmanager
+def timed(step):
+    """Record the wall time of a step for the latency breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        step_timings.append((step, time.perf_counter() - start))
+
+def report_timings(total):
+    """Print the per-step latency breakdown and add it to the job summary"""
+    rows = [f"| {step} | {seconds * 1000:.0f} |" for step, seconds in step_timings]
+    table = "| Step | Latency (ms) |\n|------|--------------|\n" + "\n".join(rows) + f"\n| **Total** | **{total * 1000:.0f}** |\n"
+    print("\n⏱️ Promotion latency breakdown")
+    print(table)
+
+    summary_file = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_file:
+        with open(summary_file, "a") as f:
+            f.write("### ⏱️ Promotion latency breakdown\n\n" + table + "\n")
+
+def run_graphql(query, variables, gh_pat, action):
+    """Run a GraphQL query/mutation and return its data, failing the job on errors"""
+    response = get_session(gh_pat).post(GRAPHQL_URL, json={"query": query, "variables": variables})
     if response.status_code != 200:
-        print(f"⚠️ Warning: Could not search for existing PRs: {response.status_code}")
-        return None
-    
-    prs = response.json()
-    if prs:
-        existing_pr = prs[0]  # Get the first matching PR
-        pr_number = existing_pr.get("number")
-        print(f"ℹ️ Found existing promotion PR #{pr_number} for {head} → {base}")
-        return pr_number
-    
-    return None
+        fail(f"Failed to {action}", response)
+
+    data = response.json()
+    if data.get("errors") or not data.get("data"):
+        fail(f"Failed to {action}: {data.get('errors')}")
+    return data["data"]
+
+def fetch_promotion_state(repo, source_branch, promo_branch, base_branch, gh_pat):
+    """Read the source SHA, promo ref and existing promotion PR in one GraphQL round trip"""
+    owner, name = repo.split("/")
+    query = """
+    query PromotionState($owner: String!, $name: String!, $source: String!, $promo: String!, $promoName: String!, $base: String!) {
+      rateLimit { cost remaining }
+      repository(owner: $owner, name: $name) {
+        source: ref(qualifiedName: $source) { target { oid } }
+        promo: ref(qualifiedName: $promo) { target { oid } }
+        pullRequests(headRefName: $promoName, baseRefName: $base, states: OPEN, first: 1) {
+          nodes { number body }
+        }
+      }
+    }
+    """
+    variables = {
+        "owner": owner,
+        "name": name,
+        "source": f"refs/heads/{source_branch}",
+        "promo": f"refs/heads/{promo_branch}",
+        "promoName": promo_branch,
+        "base": base_branch
+    }
+    repository = run_graphql(query, variables, gh_pat, "read promotion state")["repository"]
+    if not repository or not repository["source"]:
+        fail(f"Failed to get source branch {source_branch}")
+
+    prs = repository["pullRequests"]["nodes"]
+    state = {
+        "source_sha": repository["source"]["target"]["oid"],
+        "promo_sha": repository["promo"]["target"]["oid"] if repository["promo"] else None,
+        "existing_pr": prs[0]["number"] if prs else None,
+        "existing_pr_body": prs[0]["body"] if prs else None
+    }
+    print(f"ℹ️ Source branch {source_branch} SHA: {state['source_sha']}")
+    if state["existing_pr"]:
+        print(f"ℹ️ Found existing promotion PR #{state['existing_pr']} for {promo_branch} → {base_branch}")
+    return state
+
+def set_promotion_ref(repo, promo_branch, source_sha, promo_sha, gh_pat, fast_forward_first=False):
+    """Point the promotion branch at source_sha with a single call, using the known ref state
+
+    With fast_forward_first the ref is only force-updated when a fast-forward is rejected.
+    """
+    session = get_session(gh_pat)
+    if promo_sha == source_sha:
+        print(f"ℹ️ Promotion branch {promo_branch} already at {source_sha}")
+        return
+
+    if promo_sha:
+        ref_url = f"{API_URL}/repos/{repo}/git/refs/heads/{promo_branch}"
+        if fast_forward_first:
+            response = session.patch(ref_url, json={"sha": source_sha, "force": False})
+            if response.status_code == 200:
+                print(f"✅ Fast-forwarded promotion branch: {promo_branch}")
+                return
+            print(f"ℹ️ Fast-forward of {promo_branch} rejected ({response.status_code}), forcing update")
+
+        response = session.patch(ref_url, json={"sha": source_sha, "force": True})
+        if response.status_code == 200:
+            print(f"✅ Updated existing promotion branch: {promo_branch}")
+            return
+        fail(f"Failed to update promotion branch {promo_branch}", response)
+
+    response = session.post(
+        f"{API_URL}/repos/{repo}/git/refs",
+        json={"ref": f"refs/heads/{promo_branch}", "sha": source_sha}
+    )
+    if response.status_code == 201:
+        print(f"✅ Created promotion branch: {promo_branch}")
+    else:
+        fail(f"Failed to create promotion branch {promo_branch}", response)
+
+def append_source_pr(body, repo, source_pr):
+    """Add source_pr to the 'Additional Promoted PRs' section of a promotion PR body"""
+    body = body or ""
+    entry = f"- [PR #{source_pr}](https://github.com/{repo}/pull/{source_pr})"
+    if f"PR #{source_pr}]" in body:
+        return body
+
+    if ADDITIONAL_PRS_HEADER in body:
+        head, _, rest = body.partition(ADDITIONAL_PRS_HEADER)
+        section, separator, tail = rest.partition("\n\n---")
+        return f"{head}{ADDITIONAL_PRS_HEADER}{section.rstrip()}\n{entry}{separator}{tail}"
+
+    # New section goes above the footer generated by create_new_promotion_pr
+    head, separator, tail = body.rpartition("\n---\n")
+    if not separator:
+        return f"{body.rstrip()}\n\n{ADDITIONAL_PRS_HEADER}\n{entry}\n"
+    return f"{head.rstrip()}\n\n{ADDITIONAL_PRS_HEADER}\n{entry}\n{separator}{tail}"
+
+def update_promotion_pr_body(repo, pr_number, body, source_pr, gh_pat):
+    """Record the newly promoted source PR on the existing promotion PR"""
+    new_body = append_source_pr(body, repo, source_pr)
+    if new_body == body:
+        print(f"ℹ️ PR #{source_pr} already listed on promotion PR #{pr_number}")
+        return
+
+    response = get_session(gh_pat).patch(
+        f"{API_URL}/repos/{repo}/pulls/{pr_number}",
+        json={"body": new_body}
+    )
+    if response.status_code == 200:
+        print(f"✅ Added PR #{source_pr} to promotion PR #{pr_number}")
+    else:
+        fail(f"Failed to update promotion PR #{pr_number}", response)
+
+def write_output(name, value):
+    output_file = os.environ.get("GITHUB_OUTPUT")
+    if output_file:
+        with open(output_file, "a") as f:
+            f.write(f"{name}={value}\n")
 
 def close_pr(repo, pr_number, gh_pat, reason="Closed by Auto Promotion Bot"):
     """Close a PR with a comment"""
@@ -54,18 +212,16 @@ _Managed by Auto Promotion Bot_
 """
 
     # Add comment
-    response = requests.post(
-        f"https://api.github.com/repos/{repo}/issues/{pr_number}/comments",
-        headers=get_headers(gh_pat),
+    response = get_session(gh_pat).post(
+        f"{API_URL}/repos/{repo}/issues/{pr_number}/comments",
         json={"body": comment_body}
     )
     if response.status_code != 201:
         print(f"⚠️ Warning: Could not comment on PR #{pr_number}")
     
     # Close the PR
-    response = requests.patch(
-        f"https://api.github.com/repos/{repo}/pulls/{pr_number}",
-        headers=get_headers(gh_pat),
+    response = get_session(gh_pat).patch(
+        f"{API_URL}/repos/{repo}/pulls/{pr_number}",
         json={"state": "closed"}
     )
     
@@ -74,73 +230,27 @@ _Managed by Auto Promotion Bot_
     else:
         print(f"⚠️ Warning: Could not close PR #{pr_number}: {response.status_code}")
 
-def delete_branch(repo, branch_name, gh_pat):
-    """Delete a branch from the repository"""
-    response = requests.delete(
-        f"https://api.github.com/repos/{repo}/git/refs/heads/{branch_name}",
-        headers=get_headers(gh_pat)
-    )
-    
-    if response.status_code == 204:
-        print(f"✅ Deleted branch: {branch_name}")
-    elif response.status_code == 422:
-        print(f"ℹ️ Branch {branch_name} does not exist or already deleted")
-    else:
-        print(f"⚠️ Warning: Could not delete branch {branch_name}: {response.status_code}")
+def create_new_promotion_pr(repo, head, base, source_pr, gh_pat, source_branch=None, output=True):
+    """Create a new promotion PR
 
-def create_promotion_branch(repo, source_branch, promo_branch, gh_pat):
-    """Create or recreate the promotion branch from the source branch"""
-    
-    # First, get the latest commit SHA from the source branch
-    response = requests.get(
-        f"https://api.github.com/repos/{repo}/git/refs/heads/{source_branch}",
-        headers=get_headers(gh_pat)
-    )
-    
-    if response.status_code != 200:
-        fail(f"Failed to get source branch {source_branch}", response)
-    
-    source_sha = response.json()["object"]["sha"]
-    print(f"ℹ️ Source branch {source_branch} SHA: {source_sha}")
-    
-    # Try to update existing branch first (in case it exists)
-    update_response = requests.patch(
-        f"https://api.github.com/repos/{repo}/git/refs/heads/{promo_branch}",
-        headers=get_headers(gh_pat),
-        json={"sha": source_sha}
-    )
-    
-    if update_response.status_code == 200:
-        print(f"✅ Updated existing promotion branch: {promo_branch}")
-        return
+    source_pr may be None for chain hops that promote the tip of source_branch.
+    """
     
-    # If update failed, create new branch
-    create_response = requests.post(
-        f"https://api.github.com/repos/{repo}/git/refs",
-        headers=get_headers(gh_pat),
-        json={
-            "ref": f"refs/heads/{promo_branch}",
-            "sha": source_sha
-        }
-    )
-    
-    if create_response.status_code == 201:
-        print(f"✅ Created promotion branch: {promo_branch}")
+    if source_pr:
+        origin = f"[PR #{source_pr}](https://github.com/{repo}/pull/{source_pr})"
+        original = f"- **Original PR:** #{source_pr}\n"
     else:
-        fail(f"Failed to create promotion branch {promo_branch}", create_response)
+        origin = f"`{source_branch}`"
+        original = ""
 
-def create_new_promotion_pr(repo, head, base, source_pr, gh_pat):
-    """Create a new promotion PR"""
-    
     body = f"""## 🚀 Auto Promotion PR
 
-This pull request was created automatically to promote changes from [PR #{source_pr}](https://github.com/{repo}/pull/{source_pr}) into the `{base}` branch.
+This pull request was created automatically to promote changes from {origin} into the `{base}` branch.
 
 ### 🔁 Promotion Details
 - **Source Branch:** `{head}`
 - **Target Branch:** `{base}`
-- **Original PR:** #{source_pr}
-
+{original}
 ---
 
 _This PR was generated by the **Auto Promotion Workflow**._
@@ -153,8 +263,8 @@ _This PR was generated by the **Auto Promotion Workflow**._
         "body": body
     }
 
-    url = f"https://api.github.com/repos/{repo}/pulls"
-    response = requests.post(url, headers=get_headers(gh_pat), json=payload)
+    url = f"{API_URL}/repos/{repo}/pulls"
+    response = get_session(gh_pat).post(url, json=payload)
 
     if response.status_code != 201:
         fail("Failed to create promotion PR", response)
@@ -162,59 +272,511 @@ _This PR was generated by the **Auto Promotion Workflow**._
     pr_number = response.json().get("number")
     print(f"✅ Created new promotion PR #{pr_number}")
 
-    with open(os.environ["GITHUB_OUTPUT"], "a") as f:
-        f.write(f"new_pr_number={pr_number}\n")
+    if output:
+        write_output("new_pr_number", pr_number)
 
     return pr_number
 
-def main_promotion_flow(repo, promo_branch, base_branch, original_pr, source_branch, gh_pat):
-    """Main promotion flow: Close original PR, close existing promotion PR, create new PR"""
+def main_promotion_flow(repo, promo_branch, base_branch, original_pr, source_branch, gh_pat, mode="recreate"):
+    """Main promotion flow: Close original PR, close existing promotion PR, create new PR
+
+    Independent steps run concurrently (bounded by PROMOTION_MAX_PARALLEL) and all
+    reads are batched into a single GraphQL query. In "update" mode an open promotion
+    PR is kept: its branch is moved and the source PR is appended to its body, so the
+    validation already run on it is not thrown away.
+    """
     
     print(f"🚀 Starting promotion flow for PR #{original_pr}")
-    
-    # Step 1: Close original PR
-    print("\n📋 Step 1: Closing original PR")
-    close_pr(repo, original_pr, gh_pat, 
-             f"This PR has been promoted to [{promo_branch}](https://github.com/{repo}/tree/{promo_branch}). A new promotion PR will be created.")
-    
-    # Step 2: Check and close existing promotion PR if it exists
-    print("\n📋 Step 2: Checking for existing promotion PR")
-    existing_pr_number = find_existing_promotion_pr(repo, promo_branch, base_branch, gh_pat)
-    
-    if existing_pr_number:
-        print(f"Found existing promotion PR #{existing_pr_number} - closing it")
-        close_pr(repo, existing_pr_number, gh_pat, 
-                 f"Closing to recreate with latest changes from PR #{original_pr}")
-        
-        # Delete the old promotion branch to ensure clean state
-        delete_branch(repo, promo_branch, gh_pat)
+    flow_start = time.perf_counter()
+    step_timings.clear()
+
+    if mode == "update":
+        # Runs alongside the state read, so it cannot yet say whether a promotion PR is open
+        next_step = "An open promotion PR is updated in place; a new one is only created if none is open."
     else:
-        print("No existing promotion PR found")
-    
-    # Step 3: Create/recreate the promotion branch from source
-    print("\n📋 Step 3: Creating promotion branch")
-    create_promotion_branch(repo, source_branch, promo_branch, gh_pat)
-    
-    # Step 4: Create new promotion PR
-    print("\n📋 Step 4: Creating new promotion PR")
-    promotion_pr_number = create_new_promotion_pr(repo, promo_branch, base_branch, original_pr, gh_pat)
+        next_step = "A new promotion PR will be created."
+
+    def close_original():
+        with timed("Close original PR"):
+            close_pr(repo, original_pr, gh_pat,
+                     f"This PR has been promoted to [{promo_branch}](https://github.com/{repo}/tree/{promo_branch}). {next_step}")
+
+    def read_state():
+        with timed("Read promotion state (GraphQL)"):
+            return fetch_promotion_state(repo, source_branch, promo_branch, base_branch, gh_pat)
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL) as pool:
+        # Step 1: Close original PR while reading source SHA, promo ref and existing PR
+        print("\n📋 Step 1: Closing original PR and reading promotion state")
+        close_original_future = pool.submit(close_original)
+        state = pool.submit(read_state).result()
+        existing_pr_number = state["existing_pr"]
+
+        if existing_pr_number and mode == "update":
+            # Step 2: Refresh the open promotion PR in place
+            print(f"\n📋 Step 2: Updating promotion PR #{existing_pr_number} in place")
+
+            def update_ref_in_place():
+                with timed("Update promotion branch"):
+                    set_promotion_ref(repo, promo_branch, state["source_sha"], state["promo_sha"], gh_pat,
+                                      fast_forward_first=True)
+
+            def update_body():
+                with timed("Update promotion PR body"):
+                    update_promotion_pr_body(repo, existing_pr_number, state["existing_pr_body"], original_pr, gh_pat)
+
+            for future in [pool.submit(update_ref_in_place), pool.submit(update_body)]:
+                future.result()
+            close_original_future.result()
+            write_output("new_pr_number", existing_pr_number)
+
+            print(f"\n🎉 Promotion completed successfully!")
+            print(f"   Original PR #{original_pr}: ✅ Closed")
+            print(f"   Promotion PR #{existing_pr_number}: ✅ Updated in place")
+            report_timings(time.perf_counter() - flow_start)
+            return existing_pr_number
+
+        # Step 2: Close existing promotion PR and move the promotion branch in parallel
+        print("\n📋 Step 2: Closing existing promotion PR and updating promotion branch")
+        futures = []
+        if existing_pr_number:
+            def close_existing():
+                with timed("Close existing promotion PR"):
+                    close_pr(repo, existing_pr_number, gh_pat,
+                             f"Closing to recreate with latest changes from PR #{original_pr}")
+            futures.append(pool.submit(close_existing))
+        else:
+            print("No existing promotion PR found")
+
+        def update_ref():
+            with timed("Update promotion branch"):
+                set_promotion_ref(repo, promo_branch, state["source_sha"], state["promo_sha"], gh_pat)
+        futures.append(pool.submit(update_ref))
+
+        for future in futures:
+            future.result()
+
+        # Step 3: Create new promotion PR once the old one is closed and the ref is in place
+        print("\n📋 Step 3: Creating new promotion PR")
+        with timed("Create promotion PR"):
+            promotion_pr_number = create_new_promotion_pr(repo, promo_branch, base_branch, original_pr, gh_pat)
+
+        close_original_future.result()
     
     print(f"\n🎉 Promotion completed successfully!")
     print(f"   Original PR #{original_pr}: ✅ Closed")
     if existing_pr_number:
         print(f"   Old promotion PR #{existing_pr_number}: ✅ Closed")
     print(f"   New promotion PR #{promotion_pr_number}: ✅ Created")
+
+    report_timings(time.perf_counter() - flow_start)
     
     return promotion_pr_number
 
+def batch_branch_prefix(base_branch):
+    return f"promotions/batch-to-{base_branch}"
+
+def parse_batch_state(body):
+    """Return the machine-readable batch state stored in a promotion PR body, or None"""
+    match = BATCH_STATE_PATTERN.search(body or "")
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+def batch_expired(state, now=None):
+    now = now or datetime.now(timezone.utc)
+    opened_at = datetime.fromisoformat(state["opened_at"])
+    return (now - opened_at).total_seconds() >= BATCH_WINDOW_MINUTES * 60
+
+def render_batch_body(repo, head, base, state):
+    """Promotion PR body listing every source PR in the batch, with the state as a hidden marker"""
+    rows = "\n".join(
+        f"| [#{entry['pr']}](https://github.com/{repo}/pull/{entry['pr']}) | `{entry['branch']}` | `{entry['sha'][:7]}` |"
+        for entry in state["prs"]
+    )
+    status = "🔒 Sealed, ready for validation" if state["sealed"] else \
+        f"📥 Collecting (window {BATCH_WINDOW_MINUTES:g} min, max {BATCH_MAX_PRS} PRs)"
+    return f"""## 🚀 Auto Promotion Batch
+
+This pull request promotes a batch of {len(state['prs'])} PR(s) into the `{base}` branch.
+
+### 🔁 Promotion Details
+- **Source Branch:** `{head}`
+- **Target Branch:** `{base}`
+- **Batch Opened:** {state['opened_at']}
+- **Status:** {status}
+
+### 📦 Included PRs
+| PR | Branch | Commit |
+|----|--------|--------|
+{rows}
+
+---
+
+_This PR was generated by the **Auto Promotion Workflow**._
+
+<!-- promotion-batch: {json.dumps(state, separators=(",", ":"))} -->
+"""
+
+def fetch_batch_state(repo, source_branch, base_branch, gh_pat):
+    """Read the source SHA and the open batch promotion PRs for base_branch in one query"""
+    owner, name = repo.split("/")
+    query = """
+    query BatchState($owner: String!, $name: String!, $source: String!, $base: String!) {
+      rateLimit { cost remaining }
+      repository(owner: $owner, name: $name) {
+        source: ref(qualifiedName: $source) { target { oid } }
+        pullRequests(baseRefName: $base, states: OPEN, first: 100, orderBy: {field: CREATED_AT, direction: DESC}) {
+          nodes { id number body headRefName }
+        }
+      }
+    }
+    """
+    repository = run_graphql(query, {
+        "owner": owner,
+        "name": name,
+        "source": f"refs/heads/{source_branch}",
+        "base": base_branch
+    }, gh_pat, "read batch state")["repository"]
+
+    batches = []
+    for pr in repository["pullRequests"]["nodes"]:
+        if not pr["headRefName"].startswith(batch_branch_prefix(base_branch)):
+            continue
+        state = parse_batch_state(pr["body"])
+        if state is not None:
+            batches.append({**pr, "state": state})
+
+    return {
+        "source_sha": repository["source"]["target"]["oid"] if repository["source"] else None,
+        "batches": batches
+    }
+
+def save_batch(repo, batch, base_branch, gh_pat):
+    """Rewrite the batch PR body; sealed batches are also marked ready for review"""
+    response = get_session(gh_pat).patch(
+        f"{API_URL}/repos/{repo}/pulls/{batch['number']}",
+        json={"body": render_batch_body(repo, batch["headRefName"], base_branch, batch["state"])}
+    )
+    if response.status_code != 200:
+        fail(f"Failed to update batch promotion PR #{batch['number']}", response)
+
+    if batch["state"]["sealed"]:
+        run_graphql("""
+        mutation Ready($id: ID!) {
+          markPullRequestReadyForReview(input: {pullRequestId: $id}) { clientMutationId }
+        }
+        """, {"id": batch["id"]}, gh_pat, f"mark batch PR #{batch['number']} ready for review")
+        print(f"🔒 Sealed batch promotion PR #{batch['number']} with {len(batch['state']['prs'])} PR(s)")
+
+def merge_into_batch(repo, batch_branch, source_sha, source_pr, gh_pat):
+    """Merge the source commit into the batch branch"""
+    response = get_session(gh_pat).post(
+        f"{API_URL}/repos/{repo}/merges",
+        json={"base": batch_branch, "head": source_sha,
+              "commit_message": f"Batch promotion: merge PR #{source_pr} ({source_sha[:7]})"}
+    )
+    if response.status_code == 201:
+        print(f"✅ Merged PR #{source_pr} into {batch_branch}")
+    elif response.status_code == 204:
+        print(f"ℹ️ {batch_branch} already contains PR #{source_pr}")
+    else:
+        fail(f"Failed to merge PR #{source_pr} into {batch_branch}", response)
+
+def open_batch(repo, base_branch, source_branch, source_sha, source_pr, gh_pat):
+    """Create a new batch branch and draft promotion PR starting with source_pr"""
+    now = datetime.now(timezone.utc)
+    batch_branch = f"{batch_branch_prefix(base_branch)}-{now.strftime('%Y%m%d%H%M%S')}-{source_pr}"
+    state = {
+        "opened_at": now.isoformat(timespec="seconds"),
+        "sealed": BATCH_MAX_PRS <= 1,
+        "prs": [{"pr": int(source_pr), "branch": source_branch, "sha": source_sha}]
+    }
+
+    set_promotion_ref(repo, batch_branch, source_sha, None, gh_pat)
+    response = get_session(gh_pat).post(
+        f"{API_URL}/repos/{repo}/pulls",
+        json={
+            "title": f"🚀 Promotion batch → `{base_branch}` ({now.strftime('%Y-%m-%d %H:%M')} UTC)",
+            "head": batch_branch,
+            "base": base_branch,
+            "body": render_batch_body(repo, batch_branch, base_branch, state),
+            "draft": not state["sealed"]
+        }
+    )
+    if response.status_code != 201:
+        fail("Failed to create batch promotion PR", response)
+
+    pr_number = response.json().get("number")
+    print(f"✅ Opened batch promotion PR #{pr_number} on {batch_branch}")
+    return pr_number
+
+def batch_promotion_flow(repo, base_branch, original_pr, source_branch, gh_pat):
+    """Add the source PR to the open batch for base_branch, opening a new batch when needed.
+
+    Batches collect PRs as drafts for PROMOTION_BATCH_WINDOW_MINUTES or up to
+    PROMOTION_BATCH_MAX_PRS, then are sealed and marked ready for review so
+    validation runs once per batch instead of once per merge.
+    """
+    print(f"🚀 Starting batch promotion for PR #{original_pr}")
+    flow_start = time.perf_counter()
+    step_timings.clear()
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL) as pool:
+        print("\n📋 Step 1: Closing original PR and reading batch state")
+
+        def close_original():
+            with timed("Close original PR"):
+                close_pr(repo, original_pr, gh_pat,
+                         f"This PR has been queued for a batch promotion into `{base_branch}`.")
+
+        def read_state():
+            with timed("Read batch state (GraphQL)"):
+                return fetch_batch_state(repo, source_branch, base_branch, gh_pat)
+
+        close_original_future = pool.submit(close_original)
+        state = pool.submit(read_state).result()
+        if not state["source_sha"]:
+            fail(f"Failed to get source branch {source_branch}")
+
+        open_batches = [b for b in state["batches"] if not b["state"]["sealed"]]
+        current = None
+        print("\n📋 Step 2: Selecting batch")
+        expired = []
+        for batch in open_batches:
+            if batch_expired(batch["state"]) or len(batch["state"]["prs"]) >= BATCH_MAX_PRS:
+                batch["state"]["sealed"] = True
+                expired.append(batch)
+            elif current is None:
+                current = batch
+
+        futures = [pool.submit(save_batch, repo, batch, base_branch, gh_pat) for batch in expired]
+
+        if current is None:
+            with timed("Open batch"):
+                batch_pr_number = open_batch(repo, base_branch, source_branch, state["source_sha"], original_pr, gh_pat)
+        else:
+            batch_pr_number = current["number"]
+            batch_state = current["state"]
+            if any(entry["pr"] == int(original_pr) for entry in batch_state["prs"]):
+                print(f"ℹ️ PR #{original_pr} is already part of batch #{batch_pr_number}")
+            else:
+                with timed("Merge into batch"):
+                    merge_into_batch(repo, current["headRefName"], state["source_sha"], original_pr, gh_pat)
+                batch_state["prs"].append({"pr": int(original_pr), "branch": source_branch, "sha": state["source_sha"]})
+                batch_state["sealed"] = len(batch_state["prs"]) >= BATCH_MAX_PRS
+                with timed("Update batch PR"):
+                    save_batch(repo, current, base_branch, gh_pat)
+
+        for future in futures:
+            future.result()
+        close_original_future.result()
+
+    write_output("new_pr_number", batch_pr_number)
+    print(f"\n🎉 PR #{original_pr} is part of batch promotion PR #{batch_pr_number}")
+    report_timings(time.perf_counter() - flow_start)
+    return batch_pr_number
+
+def flush_batches(repo, base_branch, gh_pat):
+    """Seal open batches whose window has expired; meant for a scheduled run"""
+    state = fetch_batch_state(repo, base_branch, base_branch, gh_pat)
+    expired = [b for b in state["batches"] if not b["state"]["sealed"] and batch_expired(b["state"])]
+    if not expired:
+        print(f"ℹ️ No expired batch promotions for {base_branch}")
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL) as pool:
+        for future in [pool.submit(save_batch, repo, dict(b, state={**b["state"], "sealed": True}), base_branch, gh_pat)
+                       for b in expired]:
+            future.result()
+    write_output("sealed_pr_numbers", json.dumps([b["number"] for b in expired]))
+    return [b["number"] for b in expired]
+
+def promotion_branch_name(source_branch, base_branch):
+    """Same naming as the auto-promote workflow: promotions/<safe source>-to-<base>"""
+    safe_source = re.sub(r"[^a-zA-Z0-9._-]", "-", source_branch)
+    return f"promotions/{safe_source}-to-{base_branch}"
+
+def parse_chain(chain):
+    """Split a declared pipeline ("a>b>c" or "a,b,c") into (source, base) hops"""
+    stages = [stage.strip() for stage in re.split(r"[>,]", chain or "") if stage.strip()]
+    if len(stages) < 2:
+        fail(f"PROMOTION_CHAIN needs at least two stages, got '{chain}'")
+    if len(set(stages)) != len(stages):
+        fail(f"PROMOTION_CHAIN repeats a stage: '{chain}'")
+    return list(zip(stages, stages[1:]))
+
+def plan_promotion_chain(repo, hops, gh_pat, mode="recreate"):
+    """Build the dry-run plan of ref and PR actions for every hop from one GraphQL query"""
+    owner, name = repo.split("/")
+    fields = []
+    variables = {"owner": owner, "name": name}
+    for index, (source, base) in enumerate(hops):
+        promo = promotion_branch_name(source, base)
+        variables.update({f"source{index}": f"refs/heads/{source}", f"promo{index}": f"refs/heads/{promo}",
+                          f"promoName{index}": promo, f"base{index}": base})
+        fields.append(f"""
+        source{index}: ref(qualifiedName: $source{index}) {{ target {{ oid }} }}
+        promo{index}: ref(qualifiedName: $promo{index}) {{ target {{ oid }} }}
+        prs{index}: pullRequests(headRefName: $promoName{index}, baseRefName: $base{index}, states: OPEN, first: 1) {{
+          nodes {{ number }}
+        }}""")
+
+    declarations = ", ".join(
+        ["$owner: String!", "$name: String!"] +
+        [f"${key}: String!" for key in variables if key not in ("owner", "name")]
+    )
+    query = f"""
+    query PromotionChain({declarations}) {{
+      rateLimit {{ cost remaining }}
+      repository(owner: $owner, name: $name) {{{"".join(fields)}
+      }}
+    }}
+    """
+    repository = run_graphql(query, variables, gh_pat, "read promotion chain state")["repository"]
+
+    plan = []
+    for index, (source, base) in enumerate(hops):
+        source_ref = repository[f"source{index}"]
+        if not source_ref:
+            fail(f"Failed to get source branch {source}")
+        promo_ref = repository[f"promo{index}"]
+        prs = repository[f"prs{index}"]["nodes"]
+
+        source_sha = source_ref["target"]["oid"]
+        promo_sha = promo_ref["target"]["oid"] if promo_ref else None
+        existing_pr = prs[0]["number"] if prs else None
+
+        if promo_sha is None:
+            ref_action = "create"
+        elif promo_sha == source_sha:
+            ref_action = "none"
+        else:
+            ref_action = "update"
+
+        if existing_pr is None:
+            pr_action = "create"
+        elif mode == "update" or ref_action == "none":
+            pr_action = "keep"
+        else:
+            pr_action = "recreate"
+
+        plan.append({
+            "source": source,
+            "base": base,
+            "promo_branch": promotion_branch_name(source, base),
+            "source_sha": source_sha,
+            "promo_sha": promo_sha,
+            "ref_action": ref_action,
+            "existing_pr": existing_pr,
+            "pr_action": pr_action
+        })
+    return plan
+
+def print_plan(plan):
+    """Print the chain plan and add it to the job summary"""
+    rows = []
+    for hop in plan:
+        pr = f"{hop['pr_action']} #{hop['existing_pr']}" if hop["existing_pr"] else hop["pr_action"]
+        ref = f"{hop['ref_action']} (`{(hop['promo_sha'] or '-')[:7]}` → `{hop['source_sha'][:7]}`)"
+        rows.append(f"| `{hop['source']}` → `{hop['base']}` | `{hop['promo_branch']}` | {ref} | {pr} |")
+    table = "| Hop | Promotion Branch | Ref | PR |\n|-----|------------------|-----|----|\n" + "\n".join(rows) + "\n"
+    print("\n🗺️ Promotion chain plan")
+    print(table)
+
+    summary_file = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary_file:
+        with open(summary_file, "a") as f:
+            f.write("### 🗺️ Promotion chain plan\n\n" + table + "\n")
+
+def execute_hop(repo, hop, original_pr, gh_pat):
+    """Apply one hop of the plan; returns the promotion PR number"""
+    label = f"{hop['source']} → {hop['base']}"
+    with timed(f"Hop {label}"):
+        if hop["pr_action"] == "recreate":
+            close_pr(repo, hop["existing_pr"], gh_pat,
+                     f"Closing to recreate with the latest `{hop['source']}` ({hop['source_sha'][:7]})")
+
+        if hop["ref_action"] != "none":
+            set_promotion_ref(repo, hop["promo_branch"], hop["source_sha"], hop["promo_sha"], gh_pat,
+                              fast_forward_first=hop["pr_action"] == "keep")
+
+        if hop["pr_action"] == "keep":
+            print(f"ℹ️ Keeping promotion PR #{hop['existing_pr']} for {label}")
+            return hop["existing_pr"]
+
+        # Only the first hop carries the PR that triggered the promotion
+        return create_new_promotion_pr(repo, hop["promo_branch"], hop["base"], original_pr, gh_pat,
+                                       source_branch=hop["source"], output=False)
+
+def chain_promotion_flow(repo, chain, original_pr, gh_pat, mode="recreate", dry_run=False):
+    """Plan every hop of the pipeline, then run the hops concurrently"""
+    hops = parse_chain(chain)
+    print(f"🚀 Starting chain promotion: {' → '.join([hops[0][0]] + [base for _, base in hops])}")
+    flow_start = time.perf_counter()
+    step_timings.clear()
+
+    with timed("Plan chain (GraphQL)"):
+        plan = plan_promotion_chain(repo, hops, gh_pat, mode)
+    print_plan(plan)
+    write_output("chain_plan", json.dumps(plan, separators=(",", ":")))
+
+    if dry_run:
+        print("ℹ️ Dry run, no changes made")
+        report_timings(time.perf_counter() - flow_start)
+        return plan
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL) as pool:
+        futures = []
+        if original_pr:
+            def close_original():
+                with timed("Close original PR"):
+                    close_pr(repo, original_pr, gh_pat,
+                             f"This PR has been promoted through `{chain}`.")
+            futures.append(pool.submit(close_original))
+
+        # Hops touch different branches and PRs, so they are independent of each other
+        hop_futures = [pool.submit(execute_hop, repo, hop, original_pr if index == 0 else None, gh_pat)
+                       for index, hop in enumerate(plan)]
+        for hop, future in zip(plan, hop_futures):
+            hop["pr_number"] = future.result()
+        for future in futures:
+            future.result()
+
+    write_output("chain_pr_numbers", json.dumps([hop["pr_number"] for hop in plan]))
+    print(f"\n🎉 Chain promotion completed successfully!")
+    for hop in plan:
+        print(f"   {hop['source']} → {hop['base']}: PR #{hop['pr_number']}")
+    report_timings(time.perf_counter() - flow_start)
+    return plan
+
 if __name__ == "__main__":
+    apiTrace.install()
+    phaseProfile.install()
     try:
         repo = os.environ["REPO"]
-        promo_branch = os.environ["PROMO_BRANCH"]
+        gh_pat = os.environ["GH_PAT"]
+        mode = os.environ.get("PROMOTION_MODE", "recreate").lower()
+
+        if mode not in PROMOTION_MODES:
+            fail(f"Unknown PROMOTION_MODE '{mode}'. Expected one of: {', '.join(PROMOTION_MODES)}")
+
+        if mode == "chain":
+            # PROMOTION_CHAIN_PR_MODE=update keeps open hop PRs instead of recreating them
+            chain_promotion_flow(repo, os.environ["PROMOTION_CHAIN"], os.environ.get("SOURCE_PR"), gh_pat,
+                                 os.environ.get("PROMOTION_CHAIN_PR_MODE", "recreate").lower(), DRY_RUN)
+            sys.exit(0)
+
         base_branch = os.environ["BASE_BRANCH"]
+
+        if mode == "flush":
+            flush_batches(repo, base_branch, gh_pat)
+            sys.exit(0)
+
+        promo_branch = os.environ["PROMO_BRANCH"]
         original_pr = os.environ["SOURCE_PR"]
         source_branch = os.environ.get("FEATURE_BRANCH")
-        gh_pat = os.environ["GH_PAT"]
 
         # If FEATURE_BRANCH is not provided, try to extract from PROMO_BRANCH
         if not source_branch:
@@ -227,7 +789,10 @@ if __name__ == "__main__":
                 fail("Could not determine source branch. Please provide FEATURE_BRANCH environment variable.")
 
         # Run the main promotion flow
-        main_promotion_flow(repo, promo_branch, base_branch, original_pr, source_branch, gh_pat)
+        if mode == "batch":
+            batch_promotion_flow(repo, base_branch, original_pr, source_branch, gh_pat)
+        else:
+            main_promotion_flow(repo, promo_branch, base_branch, original_pr, source_branch, gh_pat, mode)
 
     except KeyError as e:
         fail(f"Missing environment variable: {e}")
\ No newline at end of file
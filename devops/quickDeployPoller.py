@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import requests
+import apiTrace
+import phaseProfile
+
+GREEN_TEXT = '\033[32m'
+YELLOW_TEXT = '\033[33m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+CYAN_BG = '\033[46m'
+
+deployment_result_file = "deploymentResult.json"
+
+# Adaptive backoff: poll fast while the deploy is moving, back off while it is idle
+MIN_INTERVAL = float(os.environ.get('QUICK_DEPLOY_MIN_INTERVAL', 2))
+MAX_INTERVAL = float(os.environ.get('QUICK_DEPLOY_MAX_INTERVAL', 30))
+BACKOFF_FACTOR = 1.5
+DEADLINE_SECONDS = float(os.environ.get('QUICK_DEPLOY_TIMEOUT', 3600))
+API_VERSION = os.environ.get('SF_API_VERSION', '63.0')
+CANCEL_WAIT_SECONDS = float(os.environ.get('QUICK_DEPLOY_CANCEL_WAIT', 120))
+REQUEST_TIMEOUT = 30
+
+FINAL_STATUSES = {"Succeeded", "SucceededPartial", "Failed", "Canceled"}
+# The session token is invalid or lacks access; retrying until the deadline cannot fix that
+AUTH_ERRORS = {401, 403}
+
+
+def get_org_credentials():
+    """Return (instance_url, access_token) from the environment or the authenticated sf CLI, or None"""
+    instance_url = os.environ.get('SF_INSTANCE_URL')
+    access_token = os.environ.get('SF_ACCESS_TOKEN')
+    if instance_url and access_token:
+        return instance_url.rstrip('/'), access_token
+
+    try:
+        output = subprocess.run(["sf", "org", "display", "--json"], capture_output=True, text=True)
+        org = json.loads(output.stdout)["result"]
+        return org["instanceUrl"].rstrip('/'), org["accessToken"]
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, AttributeError):
+        print(f"{RED_TEXT}❌ Could not read org credentials from 'sf org display'{RESET}")
+        return None
+
+
+def next_interval(interval, progressed):
+    """Reset to the minimum interval on progress, otherwise back off up to the maximum"""
+    if progressed:
+        return MIN_INTERVAL
+    return min(interval * BACKOFF_FACTOR, MAX_INTERVAL)
+
+
+def progress_of(deploy_result):
+    """Tuple that changes whenever the deployment makes progress"""
+    return (
+        deploy_result.get("status"),
+        deploy_result.get("numberComponentsDeployed", 0),
+        deploy_result.get("numberTestsCompleted", 0),
+        deploy_result.get("numberComponentErrors", 0),
+        deploy_result.get("numberTestErrors", 0),
+    )
+
+
+def report_progress(deploy_result, elapsed):
+    print(
+        f"[{elapsed:6.0f}s] {deploy_result.get('status', 'Unknown')}: "
+        f"components {deploy_result.get('numberComponentsDeployed', 0)}/{deploy_result.get('numberComponentsTotal', 0)} "
+        f"(errors {deploy_result.get('numberComponentErrors', 0)}), "
+        f"tests {deploy_result.get('numberTestsCompleted', 0)}/{deploy_result.get('numberTestsTotal', 0)} "
+        f"(errors {deploy_result.get('numberTestErrors', 0)})"
+    )
+
+
+def deploy_request_url(instance_url, job_id):
+    return f"{instance_url}/services/data/v{API_VERSION}/metadata/deployRequest/{job_id}"
+
+
+def new_session(access_token):
+    session = requests.Session()
+    session.headers.update({"Authorization": f"Bearer {access_token}", "Accept": "application/json"})
+    return session
+
+
+def poll_deploy(job_id, instance_url, access_token, clock=time.monotonic, sleep=time.sleep):
+    """Poll a deploy request until it finishes, fails fast or hits the deadline.
+
+    Returns (deploy_result, outcome) where outcome is one of 'done', 'failed_fast',
+    'timeout' or 'unauthorized'.
+    """
+    session = new_session(access_token)
+    url = deploy_request_url(instance_url, job_id)
+
+    start = clock()
+    interval = MIN_INTERVAL
+    last_progress = None
+    deploy_result = {"id": job_id}
+
+    while True:
+        elapsed = clock() - start
+        if elapsed > DEADLINE_SECONDS:
+            print(f"{RED_TEXT}❌ Deadline of {DEADLINE_SECONDS:.0f}s reached while waiting for {job_id}{RESET}")
+            return deploy_result, "timeout"
+
+        try:
+            response = session.get(url, params={"includeDetails": "true"}, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            response = None
+            print(f"{YELLOW_TEXT}⚠️ Status request failed: {type(e).__name__}{RESET}")
+
+        if response is None:
+            # Transient network errors only slow the poller down
+            interval = next_interval(interval, False)
+        elif response.status_code in AUTH_ERRORS:
+            print(f"{RED_TEXT}❌ Status request rejected ({response.status_code}), check the org credentials{RESET}")
+            return deploy_result, "unauthorized"
+        elif response.status_code == 200:
+            deploy_result = response.json().get("deployResult", {})
+            progress = progress_of(deploy_result)
+            report_progress(deploy_result, elapsed)
+
+            if deploy_result.get("done") or deploy_result.get("status") in FINAL_STATUSES:
+                return deploy_result, "done"
+
+            if deploy_result.get("numberComponentErrors", 0) > 0:
+                print(f"{RED_TEXT}❌ Component error reported, not waiting for the rest of the deployment{RESET}")
+                return deploy_result, "failed_fast"
+
+            interval = next_interval(interval, progress != last_progress)
+            last_progress = progress
+        else:
+            # Transient API errors only slow the poller down
+            print(f"{YELLOW_TEXT}⚠️ Status request failed: {response.status_code}{RESET}")
+            interval = next_interval(interval, False)
+
+        sleep(min(interval, max(DEADLINE_SECONDS - (clock() - start), 0)))
+
+
+def cancel_deploy(job_id, instance_url, access_token, clock=time.monotonic, sleep=time.sleep):
+    """Cancel a running deploy request and wait up to CANCEL_WAIT_SECONDS for it to stop.
+
+    A deploy that keeps running holds the org's deploy queue, so the fallback
+    full deploy would only start once it finished. Returns True once the
+    request reports a final status.
+    """
+    session = new_session(access_token)
+    url = deploy_request_url(instance_url, job_id)
+    try:
+        response = session.patch(url, json={"deployResult": {"status": "Canceling"}}, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"{YELLOW_TEXT}⚠️ Could not cancel {job_id}: {type(e).__name__}{RESET}")
+        return False
+    if response.status_code not in (200, 202):
+        print(f"{YELLOW_TEXT}⚠️ Could not cancel {job_id}: {response.status_code}{RESET}")
+        return False
+    print(f"{YELLOW_TEXT}🛑 Cancel requested for {job_id}{RESET}")
+
+    start = clock()
+    interval = MIN_INTERVAL
+    while clock() - start <= CANCEL_WAIT_SECONDS:
+        try:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException:
+            response = None
+        if response is not None and response.status_code == 200:
+            status = response.json().get("deployResult", {}).get("status")
+            if status in FINAL_STATUSES:
+                print(f"{YELLOW_TEXT}🛑 {job_id} stopped: {status}{RESET}")
+                return True
+        sleep(interval)
+        interval = next_interval(interval, False)
+    print(f"{YELLOW_TEXT}⚠️ {job_id} still running {CANCEL_WAIT_SECONDS:.0f}s after the cancel request{RESET}")
+    return False
+
+
+def write_result(deploy_result, outcome):
+    """Write deploymentResult.json in the 'sf project deploy --json' shape and QUICK_DEPLOY_STATUS"""
+    success = outcome == "done" and bool(deploy_result.get("success"))
+    with open(deployment_result_file, "w") as f:
+        json.dump({"status": 0 if success else 1, "result": deploy_result}, f, indent=2)
+
+    env_file = os.getenv('GITHUB_ENV')
+    if env_file:
+        with open(env_file, "a") as f:
+            f.write(f"QUICK_DEPLOY_STATUS={str(success).lower()}\n")
+    return success
+
+
+def main():
+    apiTrace.install()
+    phaseProfile.install()
+    job_id = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('QUICK_DEPLOY_JOB_ID')
+    if not job_id:
+        print(f"{CYAN_BG}{RED_TEXT}Usage: python quickDeployPoller.py <deploy job id>{RESET}")
+        sys.exit(1)
+
+    credentials = get_org_credentials()
+    if credentials is None:
+        # Same as a rejected session: report a failed quick deploy so the workflow falls back to a full deploy
+        write_result({"id": job_id}, "unauthorized")
+        print(f"{RED_TEXT}❌ Quick deploy {job_id} could not be tracked (unauthorized){RESET}")
+        return
+    instance_url, access_token = credentials
+    print(f"{YELLOW_TEXT}⏳ Polling deploy {job_id} (deadline {DEADLINE_SECONDS:.0f}s){RESET}")
+
+    with phaseProfile.span("fetch"):
+        deploy_result, outcome = poll_deploy(job_id, instance_url, access_token)
+    if outcome in ("failed_fast", "timeout"):
+        # Free the deploy queue before the workflow falls back to a full deploy
+        cancel_deploy(job_id, instance_url, access_token)
+    success = write_result(deploy_result, outcome)
+
+    if success:
+        print(f"{GREEN_TEXT}✅ Quick deploy {job_id} succeeded{RESET}")
+    else:
+        print(f"{RED_TEXT}❌ Quick deploy {job_id} did not succeed ({outcome}){RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import os
 import json
 import requests
 import datetime
+import deploymentResult
 
 GREEN_TEXT = '\033[32m'
 YELLOW_TEXT = '\033[33m'
@@ -20,7 +21,7 @@ env_file = os.getenv('GITHUB_ENV')  # Get the path of the runner file
 
 
 print(f"GitHub Repository: {github_repository}")
-print(f"GitHub Token: {github_token}")
+print(f"GitHub Token: {'set' if github_token else 'not set'}")
 print(f"PR Number: {pr_number}")
 print(f"commit_id: {commit_id}")
 print(f"Artifact URL: {artifact_url}")
@@ -30,20 +31,19 @@ owner, repo = github_repository.split("/")
 deployment_result_file = "deploymentResult.json"
 
 try:
-    with open(deployment_result_file, "r") as file:
-        deploy_result = json.load(file)
-        print("✅ Deployment result loaded.")
-        print(json.dumps(deploy_result, indent=2))
+    deploy_result = deploymentResult.load(deployment_result_file)
+    print("✅ Deployment result loaded.")
+    print(deploy_result.summary_line())
 except FileNotFoundError:
     print(f"{CYAN_BG}{RED_TEXT}Error: File {deployment_result_file} not found.{RESET}")
     exit(1)
 except json.JSONDecodeError:
     print(f"{CYAN_BG}{RED_TEXT}Error: Invalid JSON in {deployment_result_file}.{RESET}")
     exit(1)
+except deploymentResult.DeploymentResultError as e:
+    print(f"{CYAN_BG}{RED_TEXT}Error: Unexpected structure in {deployment_result_file}: {e}{RESET}")
+    exit(1)
 
-result = deploy_result.get("result", {})
-success = result.get("success", 'false')
+success = str(deploy_result.success).lower()
 with open(env_file, "a") as f:
     f.write(f"QUICK_DEPLOY_STATUS={success}\n")
-
-
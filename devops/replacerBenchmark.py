@@ -0,0 +1,398 @@
+"""Scale benchmark for environmentReplacer.py on synthetic metadata trees.
+
+Generates changed-sources/force-app/main/default trees (10 to 20k files by
+default, with multi-MB profiles) and one environment YAML per XPath
+complexity:
+
+- simple: one direct path per named credential and remote site setting
+- mixed: simple plus custom metadata predicates with ${VARIABLE} placeholders
+- heavy: mixed plus field permission predicates and starts-with() in every profile
+
+Each (size, complexity, mode) runs environmentReplacer.py as a subprocess on
+a fresh copy of the tree, in place and with --zip, and records wall time,
+throughput, peak RSS and the load/render/write phase timings reported by
+phaseProfile.py. The fastest of --repeat runs is kept, small trees are
+otherwise dominated by interpreter start-up noise. Throughput (files/s, MB/s)
+counts the files the mode reads: the files named in the YAML in place, the
+whole tree for --zip. The two modes' numbers are therefore not comparable with
+each other, only with the same key in the baseline.
+
+    python devops/replacerBenchmark.py                             # full matrix, compared to the baseline
+    python devops/replacerBenchmark.py --sizes 10 1000 --complexity heavy --modes zip
+    python devops/replacerBenchmark.py --update-baseline           # after an intended change
+
+The exit code is 1 when a run fails, or when throughput drops or peak RSS
+grows by more than --tolerance compared to the stored baseline. Throughput is
+scaled by a fixed lxml workload timed on both machines, so a baseline
+recorded on one runner can be checked on another. Runs shorter than
+--min-seconds in both the baseline and this run are mostly interpreter
+start-up, so their throughput is reported but not checked.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+import yaml
+from lxml import etree
+
+DEVOPS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(DEVOPS_DIR, "replacerBenchmarkBaseline.json")
+SOURCE_DIR = "changed-sources"
+DEFAULT_ROOT = os.path.join(SOURCE_DIR, "force-app", "main", "default")
+ENVIRONMENT = "bench"
+SECRET_VARIABLE = "BENCH_ENDPOINT_SECRET"
+
+SIZES = [10, 1000, 5000, 20000]
+COMPLEXITIES = ["simple", "mixed", "heavy"]
+MODES = ["inplace", "zip"]
+PROFILE_MB = 3.0
+FILES_PER_PROFILE = 2000
+PROFILE_XPATHS = 25
+TOLERANCE = 0.4
+MIN_GATED_SECONDS = 1.0
+REPEAT = 3
+
+NS = "http://soap.sforce.com/2006/04/metadata"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+GREEN_TEXT = '\033[32m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+
+def metadata(root, body):
+    return f'{XML_HEADER}<{root} xmlns="{NS}">\n{body}</{root}>\n'
+
+
+def profile_xml(target_mb, rng):
+    """A profile of about target_mb with field, object and user permissions"""
+    field = ("    <fieldPermissions>\n        <editable>{editable}</editable>\n"
+             "        <field>{object}.Field_{n}__c</field>\n        <readable>true</readable>\n    </fieldPermissions>\n")
+    parts, size, n = [], 0, 0
+    while size < target_mb * 1024 * 1024:
+        part = field.format(editable=str(rng.random() < 0.5).lower(), object=f"Object_{n % 200}__c", n=n)
+        parts.append(part)
+        size += len(part)
+        n += 1
+    parts += [f"    <userPermissions>\n        <enabled>true</enabled>\n        <name>{name}</name>\n    </userPermissions>\n"
+              for name in ("ApiEnabled", "ApiUserOnly", "ViewSetup", "ModifyAllData")]
+    parts.append("    <custom>true</custom>\n    <userLicense>Salesforce</userLicense>\n")
+    return metadata("Profile", "".join(parts)), n
+
+
+def generate_tree(root, files, profile_mb, seed=1):
+    """Write a synthetic tree of about `files` files below root/changed-sources; returns its inventory"""
+    rng = random.Random(seed)
+    base = os.path.join(root, DEFAULT_ROOT)
+    inventory = {"profiles": [], "named_credentials": [], "remote_sites": [], "custom_metadata": [], "files": 0, "bytes": 0}
+
+    def write(relative, content):
+        path = os.path.join(base, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+        inventory["files"] += 1
+        inventory["bytes"] += len(content.encode())
+
+    profiles = max(1, files // FILES_PER_PROFILE)
+    credentials = max(1, files // 50)
+    sites = max(1, files // 50)
+    records = max(1, files // 10)
+    flows = max(0, files // 20)
+    remaining = max(0, files - profiles - credentials - sites - records - flows)
+
+    for i in range(profiles):
+        content, fields = profile_xml(profile_mb, rng)
+        write(f"profiles/Bench_Profile_{i}.profile-meta.xml", content)
+        inventory["profiles"].append((f"profiles/Bench_Profile_{i}.profile-meta.xml", fields))
+    for i in range(credentials):
+        write(f"namedCredentials/Bench_{i}.namedCredential-meta.xml", metadata(
+            "NamedCredential", f"    <endpoint>https://dev-{i}.example.com/api</endpoint>\n    <label>Bench {i}</label>\n"
+                               "    <principalType>NamedUser</principalType>\n    <protocol>NoAuthentication</protocol>\n"))
+        inventory["named_credentials"].append(f"namedCredentials/Bench_{i}.namedCredential-meta.xml")
+    for i in range(sites):
+        write(f"remoteSiteSettings/Bench_{i}.remoteSite-meta.xml", metadata(
+            "RemoteSiteSetting", f"    <disableProtocolSecurity>false</disableProtocolSecurity>\n"
+                                 f"    <isActive>true</isActive>\n    <url>https://dev-{i}.example.com</url>\n"))
+        inventory["remote_sites"].append(f"remoteSiteSettings/Bench_{i}.remoteSite-meta.xml")
+    for i in range(records):
+        values = "".join(f'    <values>\n        <field>Field_{k}__c</field>\n'
+                         f'        <value xsi:type="xsd:string">value {i}-{k}</value>\n    </values>\n' for k in range(6))
+        values += ('    <values>\n        <field>Endpoint__c</field>\n'
+                   f'        <value xsi:type="xsd:string">https://dev-{i}.example.com</value>\n    </values>\n')
+        write(f"customMetadata/Bench_Setting.Record_{i}.md-meta.xml",
+              f'{XML_HEADER}<CustomMetadata xmlns="{NS}" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+              f'xmlns:xsd="http://www.w3.org/2001/XMLSchema">\n    <label>Record {i}</label>\n'
+              f'    <protected>false</protected>\n{values}</CustomMetadata>\n')
+        inventory["custom_metadata"].append(f"customMetadata/Bench_Setting.Record_{i}.md-meta.xml")
+    for i in range(flows):
+        nodes = "".join(f"    <assignments>\n        <name>Step_{k}</name>\n        <label>Step {k}</label>\n"
+                        f"        <locationX>{k * 10}</locationX>\n        <locationY>{k * 20}</locationY>\n"
+                        "    </assignments>\n" for k in range(rng.randint(50, 300)))
+        write(f"flows/Bench_Flow_{i}.flow-meta.xml", metadata("Flow", nodes))
+    for i in range(remaining):
+        if i % 2:
+            write(f"classes/BenchClass{i}.cls", f"public with sharing class BenchClass{i} {{\n"
+                  + "".join(f"    public Integer method{k}() {{ return {k}; }}\n" for k in range(rng.randint(5, 60)))
+                  + "}\n")
+        else:
+            write(f"objects/Object_{i % 200}__c/fields/Field_{i}__c.field-meta.xml", metadata(
+                "CustomField", f"    <fullName>Field_{i}__c</fullName>\n    <label>Field {i}</label>\n"
+                               "    <type>Text</type>\n    <length>255</length>\n"))
+    return inventory
+
+
+def environment_config(inventory, complexity):
+    """xpath_replacements of one complexity level for the inventory"""
+    replacements = []
+    for path in inventory["named_credentials"]:
+        replacements.append({"file": path, "xpath": "//ns:endpoint", "value": "https://uat.example.com/api"})
+    for path in inventory["remote_sites"]:
+        replacements.append({"file": path, "xpath": "//ns:url", "value": "https://uat.example.com"})
+    if complexity in ("mixed", "heavy"):
+        for path in inventory["custom_metadata"]:
+            replacements.append({"file": path, "xpath": "//ns:values[ns:field='Endpoint__c']/ns:value",
+                                 "value": f"https://${{{SECRET_VARIABLE}}}.example.com"})
+    if complexity == "heavy":
+        for path, fields in inventory["profiles"]:
+            for k in range(PROFILE_XPATHS):
+                n = (k * 7919) % fields
+                replacements.append({"file": path, "value": "false",
+                                     "xpath": f"//ns:fieldPermissions[ns:field='Object_{n % 200}__c.Field_{n}__c']/ns:editable"})
+            replacements.append({"file": path, "value": "false",
+                                 "xpath": "//ns:userPermissions[starts-with(ns:name, 'Api')]/ns:enabled"})
+    return {"xpath_replacements": replacements}
+
+
+def write_config(root, config):
+    os.makedirs(os.path.join(root, "environments"), exist_ok=True)
+    with open(os.path.join(root, "environments", f"{ENVIRONMENT}.yml"), "w") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+
+
+def read_bytes(root, files):
+    return sum(os.path.getsize(os.path.join(root, DEFAULT_ROOT, path)) for path in files)
+
+
+def calibrate(rounds=40):
+    """Seconds of a fixed parse/XPath/serialise workload, the best of a few rounds"""
+    document = metadata("Profile", "".join(f"    <fieldPermissions><editable>true</editable><field>F_{n}</field>"
+                                           "</fieldPermissions>\n" for n in range(20000))).encode()
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        tree = etree.fromstring(document)
+        for element in tree.xpath("//ns:fieldPermissions[ns:field='F_19999']/ns:editable", namespaces={"ns": NS}):
+            element.text = "false"
+        etree.tostring(tree, encoding="UTF-8", xml_declaration=True, pretty_print=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4)
+
+
+def run_replacer(work_dir, mode, timeout):
+    """Run environmentReplacer.py once; returns (exit_code, wall_seconds, peak_rss_mb, phases)"""
+    command = [sys.executable, os.path.join(DEVOPS_DIR, "environmentReplacer.py"), ENVIRONMENT]
+    if mode == "zip":
+        command += ["--zip", "delta-package.zip"]
+    env = dict(os.environ, DEVOPS_PROFILE="spans", PROFILE_DIR=os.path.join(work_dir, ".devops-profile"),
+               GITHUB_STEP_SUMMARY="", PYTHONUNBUFFERED="1")
+    env[SECRET_VARIABLE] = "uat-secret-host"
+    with open(os.path.join(work_dir, "environmentReplacer.log"), "w") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        deadline = start + timeout
+        while True:
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() > deadline:
+                process.kill()
+                pid, status, usage = os.wait4(process.pid, 0)
+                break
+            time.sleep(0.01)
+        wall = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak_rss_mb = usage.ru_maxrss / (1024 * 1024 if platform.system() == "Darwin" else 1024)
+    try:
+        with open(os.path.join(work_dir, ".devops-profile", "environmentReplacer.json")) as f:
+            phases = {name: stats["total_s"] for name, stats in json.load(f)["spans"].items()}
+    except (OSError, json.JSONDecodeError, KeyError):
+        phases = {}
+    return os.waitstatus_to_exitcode(status), wall, peak_rss_mb, phases
+
+
+def run_benchmark(sizes, complexities, modes, profile_mb=PROFILE_MB, repeat=REPEAT, timeout=1800, keep=False):
+    results = []
+    root = tempfile.mkdtemp(prefix="replacer-bench-")
+    try:
+        for size in sizes:
+            template = os.path.join(root, f"tree-{size}")
+            inventory = generate_tree(template, size, profile_mb)
+            print(f"Tree of {inventory['files']} file(s), {inventory['bytes'] / 1024 / 1024:.1f} MB "
+                  f"({len(inventory['profiles'])} profile(s) of {profile_mb} MB)", flush=True)
+            for complexity in complexities:
+                config = environment_config(inventory, complexity)
+                configured = sorted({entry["file"] for entry in config["xpath_replacements"]})
+                for mode in modes:
+                    read_files = configured if mode == "inplace" else None
+                    read_mb = (read_bytes(template, read_files) if read_files is not None else inventory["bytes"]) / 1024 / 1024
+                    file_count = len(read_files) if read_files is not None else inventory["files"]
+
+                    print(f"▶ {size} files, {complexity}, {mode} ...", flush=True)
+                    runs = []
+                    for attempt in range(max(1, repeat)):
+                        # In place rewrites the tree, so every run starts from the template
+                        work_dir = os.path.join(root, f"{size}-{complexity}-{mode}-{attempt}")
+                        shutil.copytree(template, work_dir)
+                        write_config(work_dir, config)
+                        runs.append(run_replacer(work_dir, mode, timeout))
+                        if not keep:
+                            shutil.rmtree(work_dir, ignore_errors=True)
+                    failed = [run for run in runs if run[0] != 0]
+                    exit_code, wall, peak_rss_mb, phases = failed[0] if failed else min(runs, key=lambda run: run[1])
+                    results.append({
+                        "key": f"{size}-{complexity}-{mode}", "size": size, "complexity": complexity, "mode": mode,
+                        "exit_code": exit_code, "tree_files": inventory["files"],
+                        "tree_mb": round(inventory["bytes"] / 1024 / 1024, 2),
+                        "xpaths": len(config["xpath_replacements"]), "files_read": file_count,
+                        "mb_read": round(read_mb, 2), "wall_seconds": round(wall, 3),
+                        "files_per_s": round(file_count / wall, 1) if wall else 0.0,
+                        "mb_per_s": round(read_mb / wall, 2) if wall else 0.0,
+                        "peak_rss_mb": round(peak_rss_mb, 1),
+                        "phases": {name: round(seconds, 3) for name, seconds in phases.items()}, "runs": len(runs),
+                    })
+            if not keep:
+                shutil.rmtree(template, ignore_errors=True)
+    finally:
+        if keep:
+            print(f"Working directories kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def throughput_gated(result, base, min_seconds=MIN_GATED_SECONDS):
+    """Throughput is only checked once the baseline or this run takes min_seconds"""
+    return max(result["wall_seconds"], base["wall_seconds"]) >= min_seconds
+
+
+def compare(results, calibration_s, baseline, tolerance, min_seconds=MIN_GATED_SECONDS):
+    """Regressions against the baseline, as messages"""
+    expected = {result["key"]: result for result in baseline.get("results", [])}
+    # A slower machine needs more time for the calibration workload and is allowed a lower throughput
+    speed = baseline["calibration_s"] / calibration_s if baseline.get("calibration_s") and calibration_s else 1.0
+    regressions = []
+    for result in results:
+        if result["exit_code"] != 0:
+            regressions.append(f"{result['key']}: exit code {result['exit_code']}")
+            continue
+        base = expected.get(result["key"])
+        if not base:
+            continue
+        floor = base["files_per_s"] * speed * (1 - tolerance)
+        if throughput_gated(result, base, min_seconds) and result["files_per_s"] < floor:
+            regressions.append(f"{result['key']}: {result['files_per_s']} files/s, baseline "
+                               f"{base['files_per_s']} (x{speed:.2f} machine speed) allows {floor:.1f}")
+        ceiling = base["peak_rss_mb"] * (1 + tolerance)
+        if result["peak_rss_mb"] > ceiling:
+            regressions.append(f"{result['key']}: peak RSS {result['peak_rss_mb']} MB, baseline "
+                               f"{base['peak_rss_mb']} MB allows {ceiling:.1f}")
+    return regressions
+
+
+def print_report(results, baseline, min_seconds=MIN_GATED_SECONDS):
+    expected = {result["key"]: result for result in (baseline or {}).get("results", [])}
+    print()
+    print(f"{'Run':<22}{'Exit':>5}{'Read':>8}{'MB':>8}{'Wall (s)':>10}{'Files/s':>10}{'MB/s':>8}{'RSS (MB)':>10}"
+          f"{'Base files/s':>14}  Phases (s)")
+    for r in results:
+        base = expected.get(r["key"], {}).get("files_per_s", "-")
+        if r["key"] in expected and not throughput_gated(r, expected[r["key"]], min_seconds):
+            base = f"({base})"
+        phases = ", ".join(f"{name} {seconds:.2f}" for name, seconds in r["phases"].items())
+        print(f"{r['key']:<22}{r['exit_code']:>5}{r['files_read']:>8}{r['mb_read']:>8.1f}{r['wall_seconds']:>10.2f}"
+              f"{r['files_per_s']:>10.1f}{r['mb_per_s']:>8.2f}{r['peak_rss_mb']:>10.1f}{base:>14}  {phases}")
+    print(f"Read: files read (the configured files in place, the whole tree with --zip), the basis of files/s and MB/s. "
+          f"(base): under {min_seconds:g}s, throughput not checked.")
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=DEVOPS_DIR, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark environmentReplacer.py on synthetic metadata trees")
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="files per tree")
+    parser.add_argument("--complexity", nargs="+", default=COMPLEXITIES, choices=COMPLEXITIES)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--profile-mb", type=float, default=PROFILE_MB, help="size of each synthetic profile")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs per combination, the fastest is kept")
+    parser.add_argument("--timeout", type=float, default=1800, help="per-run timeout in seconds")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed throughput drop and peak RSS growth, as a fraction")
+    parser.add_argument("--min-seconds", type=float, default=MIN_GATED_SECONDS,
+                        help="check throughput only for runs taking at least this long")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--history", help="append results to a JSON-lines history file")
+    parser.add_argument("--keep", action="store_true", help="keep working directories and replacer logs")
+    args = parser.parse_args()
+
+    calibration_s = calibrate()
+    results = run_benchmark(args.sizes, args.complexity, args.modes, args.profile_mb, args.repeat, args.timeout,
+                            args.keep)
+    # Timed before and after the runs, so a burst of load on a shared runner does not set the machine speed
+    calibration_s = min(calibration_s, calibrate())
+    print(f"Calibration workload: {calibration_s}s")
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        baseline = None
+    print_report(results, baseline, args.min_seconds)
+
+    record = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "revision": git_revision(),
+              "python": platform.python_version(), "calibration_s": calibration_s, "profile_mb": args.profile_mb,
+              "repeat": args.repeat, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(record, f, indent=2)
+    if args.history:
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(record, f, indent=2)
+            f.write("\n")
+        print(f"{GREEN_TEXT}✅ Baseline written to {args.baseline}{RESET}")
+        return
+
+    regressions = compare(results, calibration_s, baseline or {}, args.tolerance, args.min_seconds)
+    if regressions:
+        print(f"{RED_TEXT}❌ {len(regressions)} regression(s):{RESET}")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}, run with --update-baseline to store one")
+    print(f"{GREEN_TEXT}✅ No regressions{RESET}")
+
+
+if __name__ == "__main__":
+    main()
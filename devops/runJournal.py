@@ -0,0 +1,82 @@
+"""Checkpoints for bots that post to a PR, so a retried job resumes instead of starting over.
+
+A journal belongs to one script, PR number and head commit and lives in
+$RUN_JOURNAL_DIR/<script>-<pr>-<head>.json (default .run-journal/, persisted
+with actions/cache). It records:
+
+- node IDs already deleted, so they are not looked up or deleted again
+- finished steps and values they produced (e.g. the PR node ID)
+- what each posting step published: a digest of the content and the node ID
+
+A posting step whose digest matches the journal is skipped. If the content
+changed since (a different scan of the same head), the caller replaces the
+earlier post. Set RUN_JOURNAL=false to run without checkpoints.
+"""
+import os
+import json
+import hashlib
+
+JOURNAL_DIR = os.environ.get('RUN_JOURNAL_DIR', ".run-journal")
+JOURNAL_VERSION = 1
+ENABLED = os.environ.get('RUN_JOURNAL', "true").lower() != "false"
+
+
+def content_digest(*parts):
+    """Stable digest of JSON-serialisable content"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class RunJournal:
+    def __init__(self, script, pr_number, head_sha, directory=JOURNAL_DIR):
+        # Without a PR and head commit a journal could be resumed by an unrelated run
+        self.enabled = ENABLED and bool(pr_number and head_sha)
+        self.path = os.path.join(directory, f"{script}-{pr_number}-{head_sha}.json")
+        self.data = {"version": JOURNAL_VERSION, "values": {}, "deleted": [], "posted": {}}
+        self.resumed = False
+        if self.enabled:
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+                if data.get("version") == JOURNAL_VERSION:
+                    self.data = data
+                    self.resumed = True
+            except (OSError, json.JSONDecodeError):
+                pass
+
+    def save(self):
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Replace rather than rewrite, so an abort mid-write leaves the previous checkpoint
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def get(self, key, default=None):
+        return self.data["values"].get(key, default)
+
+    def set(self, key, value):
+        self.data["values"][key] = value
+        self.save()
+
+    def is_deleted(self, node_id):
+        return node_id in self.data["deleted"]
+
+    def mark_deleted(self, node_id):
+        self.data["deleted"].append(node_id)
+        self.save()
+
+    def posted(self, step):
+        """{'digest', 'id'} of what the step published, or None"""
+        return self.data["posted"].get(step)
+
+    def record_post(self, step, digest, node_id):
+        self.data["posted"][step] = {"digest": digest, "id": node_id}
+        self.save()
+
+    def forget_post(self, step):
+        self.data["posted"].pop(step, None)
+        self.save()
+
+    def posted_ids(self):
+        return {record["id"] for record in self.data["posted"].values()}
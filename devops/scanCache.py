@@ -0,0 +1,244 @@
+"""Per-file code-analyzer results cached by git blob SHA.
+
+A file whose content, analyzer configuration and analyzer version did not
+change since an earlier run does not need to be scanned again. Entries live under
+$SCAN_CACHE_DIR/<config hash>/<blob sha>.json (default .scan-cache/, persisted
+with actions/cache) and hold the file's violations without its path, so a
+renamed or copied file reuses them as well.
+
+    python devops/scanCache.py plan --targets scan-targets.txt --misses scan-misses.txt
+    sf code-analyzer run --target <each miss> ... --output-file apexScanResults.partial.json
+    python devops/scanCache.py merge --targets scan-targets.txt --results apexScanResults.partial.json
+
+`merge` stores the new results and writes apexScanResults.json for every
+target, in the code-analyzer JSON shape pmdCommentor.py reads.
+
+Only engines whose findings depend on a single file (pmd, eslint, flow, regex)
+may be cached this way; cross-file engines such as cpd or sfge must not.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+
+from scanResults import READERS, detect_format, ScanResultsError
+import phaseProfile
+
+CACHE_DIR = os.environ.get('SCAN_CACHE_DIR', ".scan-cache")
+CONFIG_FILES = ["devops/code-analyzer.yml", "devops/masterRuleset.xml"]
+MAX_AGE_DAYS = 30
+
+GREEN_TEXT = '\033[32m'
+YELLOW_TEXT = '\033[33m'
+RED_TEXT = '\033[31m'
+RESET = '\033[0m'
+
+
+def config_hash(config_files=CONFIG_FILES, salt=""):
+    """Hash of the analyzer configuration; any change starts a fresh cache namespace"""
+    digest = hashlib.sha256(salt.encode("utf-8"))
+    for path in config_files:
+        digest.update(path.encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()[:16]
+
+
+def analyzer_version():
+    """Installed code-analyzer plugin version(s) from `sf plugins --json`, so an upgrade starts a fresh namespace.
+
+    SCAN_ANALYZER_VERSION overrides the lookup. When sf cannot be asked the
+    version is 'unknown', which never shares a namespace with a known one.
+    """
+    override = os.environ.get('SCAN_ANALYZER_VERSION')
+    if override:
+        return override
+    try:
+        output = subprocess.run(["sf", "plugins", "--json"], capture_output=True, text=True, timeout=120).stdout
+        plugins = json.loads(output)
+    except (OSError, subprocess.SubprocessError, json.JSONDecodeError):
+        plugins = None
+    if isinstance(plugins, dict):
+        plugins = plugins.get("result", [])
+    versions = sorted(f"{plugin.get('name')}@{plugin.get('version')}" for plugin in plugins or []
+                      if isinstance(plugin, dict) and "code-analyzer" in str(plugin.get("name")))
+    if not versions:
+        print(f"{YELLOW_TEXT}⚠️ Could not read the code-analyzer version, using a separate cache namespace{RESET}")
+        return "unknown"
+    return ",".join(versions)
+
+
+def blob_shas(paths):
+    """{path: git blob SHA of the working tree content}, hashed with one git process"""
+    if not paths:
+        return {}
+    output = subprocess.run(["git", "hash-object", "--stdin-paths"], input="\n".join(paths) + "\n",
+                            capture_output=True, text=True, check=True)
+    return dict(zip(paths, output.stdout.split()))
+
+
+def entry_path(namespace, blob_sha, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, namespace, f"{blob_sha}.json")
+
+
+def read_entry(namespace, blob_sha, cache_dir=CACHE_DIR):
+    """Cached violations of a blob, or None on a miss"""
+    path = entry_path(namespace, blob_sha, cache_dir)
+    try:
+        with open(path) as f:
+            violations = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    os.utime(path)  # keep entries that are still in use out of prune()
+    return violations
+
+
+def write_entry(namespace, blob_sha, violations, cache_dir=CACHE_DIR):
+    os.makedirs(os.path.join(cache_dir, namespace), exist_ok=True)
+    with open(entry_path(namespace, blob_sha, cache_dir), "w") as f:
+        json.dump(violations, f)
+
+
+def prune(cache_dir=CACHE_DIR, max_age_days=MAX_AGE_DAYS):
+    """Remove entries not used for max_age_days, including old configuration namespaces"""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def read_targets(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def repo_relative(file_path, run_dir=""):
+    """Violation paths are absolute or relative to the run directory; make them relative to the repo root"""
+    if not os.path.isabs(file_path) and run_dir:
+        file_path = os.path.join(run_dir, file_path)
+    return os.path.relpath(file_path) if os.path.isabs(file_path) else os.path.normpath(file_path)
+
+
+def split_by_file(violations, run_dir=""):
+    """{repo relative path: [violation with the primary file replaced by None]}"""
+    by_file = {}
+    for violation in violations:
+        locations = violation.get("locations", [])
+        primary_index = violation.get("primaryLocationIndex", 0)
+        if primary_index >= len(locations):
+            continue
+        primary_file = locations[primary_index].get("file", "")
+        path = repo_relative(primary_file, run_dir)
+        stored = dict(violation)
+        stored["locations"] = [{**loc, "file": None} if loc.get("file") == primary_file else loc
+                               for loc in locations]
+        by_file.setdefault(path, []).append(stored)
+    return by_file
+
+
+def with_path(violations, path):
+    return [{**v, "locations": [{**loc, "file": path} if loc.get("file") is None else loc
+                                for loc in v.get("locations", [])]}
+            for v in violations]
+
+
+def plan(targets, namespace, cache_dir=CACHE_DIR):
+    """Split targets into (hits, misses) by looking up each blob SHA"""
+    shas = blob_shas(targets)
+    hits, misses = [], []
+    for path in targets:
+        if os.path.isfile(os.path.join(cache_dir, namespace, f"{shas[path]}.json")):
+            hits.append(path)
+        else:
+            misses.append(path)
+    return hits, misses
+
+
+def merge(targets, scanned, results_path, namespace, cache_dir=CACHE_DIR):
+    """Store the results of the scanned files per blob and return every target's violations.
+
+    Returns (violations, cached_files). Scanned files without findings are stored
+    too, so they count as hits next time.
+    """
+    shas = blob_shas(targets)
+    fresh = {}
+    if scanned:
+        with open(results_path) as f:
+            data = json.load(f)
+        fmt = detect_format(results_path, data)
+        fresh = split_by_file(READERS[fmt](data), data.get("runDir", "") if fmt == "json" else "")
+
+    scanned = set(scanned)
+    merged = []
+    cached_files = 0
+    for path in targets:
+        if path in scanned:
+            violations = fresh.get(os.path.normpath(path), [])
+            write_entry(namespace, shas[path], violations, cache_dir)
+        else:
+            violations = read_entry(namespace, shas[path], cache_dir)
+            if violations is None:
+                print(f"{YELLOW_TEXT}⚠️ {path} was neither scanned nor cached{RESET}")
+                continue
+            cached_files += 1
+        merged.extend(with_path(violations, path))
+    return merged, cached_files
+
+
+def main():
+    phaseProfile.install()
+    parser = argparse.ArgumentParser(description="Blob SHA keyed cache for code-analyzer results")
+    parser.add_argument("command", choices=["plan", "merge"])
+    parser.add_argument("--targets", default="scan-targets.txt", help="files of the PR to analyse, one per line")
+    parser.add_argument("--misses", default="scan-misses.txt",
+                        help="files that need a scan (written by plan, read by merge)")
+    parser.add_argument("--results", default="apexScanResults.partial.json", help="merge: results of scanning the misses")
+    parser.add_argument("--output", default="apexScanResults.json", help="merge: combined results")
+    parser.add_argument("--config", action="append", dest="config_files",
+                        help=f"analyzer configuration file to hash (repeatable, default: {', '.join(CONFIG_FILES)})")
+    parser.add_argument("--salt", default=os.environ.get('SCAN_CACHE_SALT', ""),
+                        help="extra cache key input, e.g. the rule selector and analyzer version")
+    args = parser.parse_args()
+
+    version = analyzer_version()
+    print(f"Analyzer: {version}")
+    namespace = config_hash(args.config_files or CONFIG_FILES, f"{args.salt}|{version}")
+    try:
+        targets = read_targets(args.targets)
+    except OSError as e:
+        print(f"{RED_TEXT}❌ Could not read targets: {e}{RESET}")
+        sys.exit(1)
+
+    if args.command == "plan":
+        hits, misses = plan(targets, namespace)
+        with open(args.misses, "w") as f:
+            f.write("".join(f"{path}\n" for path in misses))
+        print(f"{GREEN_TEXT}✅ Scan cache {namespace}: {len(hits)} hit(s), {len(misses)} file(s) to scan{RESET}")
+        return
+
+    scanned = read_targets(args.misses) if os.path.exists(args.misses) else []
+    try:
+        violations, cached_files = merge(targets, scanned, args.results, namespace)
+    except (OSError, json.JSONDecodeError, ScanResultsError) as e:
+        print(f"{RED_TEXT}❌ Could not merge scan results: {e}{RESET}")
+        sys.exit(1)
+    with open(args.output, "w") as f:
+        json.dump({"runDir": os.getcwd(), "violationCounts": {"total": len(violations)}, "violations": violations}, f)
+    removed = prune()
+    print(f"{GREEN_TEXT}✅ {len(violations)} violation(s) for {len(targets)} file(s) written to {args.output} "
+          f"({cached_files} file(s) from cache, {removed} stale entr{'y' if removed == 1 else 'ies'} pruned){RESET}")
+
+
+if __name__ == "__main__":
+    main()
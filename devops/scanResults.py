@@ -0,0 +1,156 @@
+"""Readers for static analysis result files consumed by pmdCommentor.py.
+
+Each reader is a generator that yields violations in the code-analyzer JSON
+shape (rule, engine, severity, message, resources, primaryLocationIndex,
+locations[].file/startLine/startColumn), so the commentor only deals with one
+format. Supported inputs:
+
+- code-analyzer JSON (`sf code-analyzer run --output-file x.json`)
+- SARIF 2.1.0 (`--output-file x.sarif`, or any SARIF producing tool)
+
+load_violations() reads several files in parallel (one per engine job, for
+example) and merges them into one deduplicated stream.
+"""
+import os
+import json
+import glob
+from urllib.parse import unquote, urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_PARALLEL = int(os.environ.get('SCAN_RESULTS_MAX_PARALLEL', 4))
+
+# SARIF levels mapped onto code-analyzer severities (1 = critical ... 5 = info)
+SARIF_LEVEL_SEVERITY = {"error": 2, "warning": 3, "note": 4, "none": 5}
+
+
+class ScanResultsError(ValueError):
+    """Raised when a result file is neither code-analyzer JSON nor SARIF"""
+
+
+def read_code_analyzer_json(data):
+    violations = data.get("violations")
+    if not isinstance(violations, list):
+        raise ScanResultsError("code-analyzer JSON must contain a 'violations' list")
+    for violation in violations:
+        if isinstance(violation, dict):
+            yield violation
+
+
+def _sarif_uri(artifact_location, base_uris):
+    uri = artifact_location.get("uri", "")
+    base = base_uris.get(artifact_location.get("uriBaseId"), "")
+    if base and not urlparse(uri).scheme:
+        uri = base.rstrip("/") + "/" + uri
+    if uri.startswith("file:"):
+        uri = urlparse(uri).path
+    return unquote(uri)
+
+
+def _sarif_location(location, base_uris):
+    physical = location.get("physicalLocation", {})
+    region = physical.get("region", {})
+    return {
+        "file": _sarif_uri(physical.get("artifactLocation", {}), base_uris),
+        "startLine": region.get("startLine"),
+        "startColumn": region.get("startColumn"),
+        "endLine": region.get("endLine"),
+        "endColumn": region.get("endColumn"),
+    }
+
+
+def read_sarif(data):
+    runs = data.get("runs")
+    if not isinstance(runs, list):
+        raise ScanResultsError("SARIF log must contain a 'runs' list")
+    for run in runs:
+        driver = run.get("tool", {}).get("driver", {})
+        engine = driver.get("name", "Unknown Engine")
+        rules = driver.get("rules", [])
+        rules_by_id = {rule.get("id"): rule for rule in rules}
+        base_uris = {key: value.get("uri", "") for key, value in run.get("originalUriBaseIds", {}).items()}
+
+        for result in run.get("results", []):
+            rule_index = result.get("ruleIndex")
+            rule = rules[rule_index] if isinstance(rule_index, int) and rule_index < len(rules) else \
+                rules_by_id.get(result.get("ruleId"), {})
+            properties = {**rule.get("properties", {}), **result.get("properties", {})}
+            level = result.get("level") or rule.get("defaultConfiguration", {}).get("level", "warning")
+            help_uri = rule.get("helpUri")
+
+            yield {
+                "rule": result.get("ruleId") or rule.get("id", "Unknown Rule"),
+                "engine": properties.get("engine", engine),
+                "severity": properties.get("severity", SARIF_LEVEL_SEVERITY.get(level, 3)),
+                "tags": properties.get("tags", []),
+                "message": result.get("message", {}).get("text", "No message provided"),
+                "resources": [help_uri] if help_uri else [],
+                "primaryLocationIndex": 0,
+                "locations": [_sarif_location(location, base_uris) for location in result.get("locations", [])],
+            }
+
+
+READERS = {
+    "json": read_code_analyzer_json,
+    "sarif": read_sarif,
+}
+
+
+def detect_format(path, data):
+    """'sarif' for SARIF logs (by extension or content), 'json' for code-analyzer output"""
+    if path.endswith(".sarif") or ("runs" in data and "violations" not in data):
+        return "sarif"
+    return "json"
+
+
+def read_file(path):
+    """Parse one result file and return (path, format, violations)"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ScanResultsError(f"{path}: top level must be a JSON object")
+    fmt = detect_format(path, data)
+    return path, fmt, list(READERS[fmt](data))
+
+
+def expand_paths(patterns):
+    """Expand globs, keeping literal paths that do not exist so the caller can report them"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def violation_key(violation):
+    locations = violation.get("locations", [])
+    primary_index = violation.get("primaryLocationIndex", 0)
+    loc = locations[primary_index] if primary_index < len(locations) else {}
+    return (
+        violation.get("rule"),
+        os.path.normpath(loc.get("file", "")).split("changed-sources/")[-1].lstrip("/"),
+        loc.get("startLine"),
+        loc.get("startColumn"),
+        violation.get("message"),
+    )
+
+
+def load_violations(paths, max_parallel=MAX_PARALLEL):
+    """Read every result file in parallel and merge them into one deduplicated violation list.
+
+    Returns (violations, per_file) where per_file maps each path to (format, count)
+    and the violations keep file order. Duplicates, e.g. the same finding reported
+    by a JSON and a SARIF export of one run, are dropped.
+    """
+    violations = []
+    per_file = {}
+    seen = set()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(paths)))) as pool:
+        for path, fmt, file_violations in pool.map(read_file, paths):
+            per_file[path] = (fmt, len(file_violations))
+            for violation in file_violations:
+                key = violation_key(violation)
+                if key in seen:
+                    continue
+                seen.add(key)
+                violations.append(violation)
+    return violations, per_file